@@ -473,12 +473,12 @@ copy_sa_bench() {
 	echo ">>> Copying sa-bench to ${frontend_pod}:/tmp/sa-bench/..."
 
 	if $DRY_RUN; then
-		echo "[DRY RUN] kubectl cp sa-bench/{bench.sh,benchmark_serving.py,backend_request_func.py,benchmark_utils.py}"
+		echo "[DRY RUN] kubectl cp sa-bench/{bench.sh,benchmark_serving.py,backend_request_func.py,benchmark_utils.py,sharded_load.py,streaming_metrics.py,live_metrics.py,steady_state.py,dataset_cache.py,sse_parser.py,token_timeline.py,trace_replay.py,arrival_schedule.py,multi_turn.py,capacity_search.py,phase_timing.py}"
 		return
 	fi
 
 	kubectl exec -n "$NAMESPACE" "$frontend_pod" -- mkdir -p /tmp/sa-bench /tmp/results
-	for f in bench.sh benchmark_serving.py backend_request_func.py benchmark_utils.py; do
+	for f in bench.sh benchmark_serving.py backend_request_func.py benchmark_utils.py sharded_load.py streaming_metrics.py live_metrics.py steady_state.py dataset_cache.py sse_parser.py token_timeline.py trace_replay.py arrival_schedule.py multi_turn.py capacity_search.py phase_timing.py; do
 		kubectl cp "${SA_BENCH_DIR}/${f}" "${NAMESPACE}/${frontend_pod}:/tmp/sa-bench/${f}"
 	done
 	kubectl exec -n "$NAMESPACE" "$frontend_pod" -- chmod +x /tmp/sa-bench/bench.sh
@@ -670,6 +670,9 @@ copyback_results() {
 
 	echo ">>> Copying results to ${local_dir}/ ..."
 
+	# Test config alongside the result, for scripts/results-db.py
+	cp "$CONFIG" "${local_dir}/config.yaml"
+
 	kubectl cp "${NAMESPACE}/${frontend_pod}:${pod_result_path}" \
 		"${local_dir}/result.json" 2>/dev/null ||
 		echo "  WARNING: could not copy result.json (${pod_result_path})"
@@ -730,6 +733,7 @@ Artifacts in this directory
   result.json             — raw sa-bench output
   run.log                 — benchmark stdout/stderr from the frontend pod
   summary.txt             — this file
+  config.yaml             — the test config this run used
   timings.txt             — UTC event log (RUN_START, DEPLOY_*, DISTRIBUTE_*, WORKERS_READY, BENCH_*)
   pod-placement.tsv       — pod / role / node / gpu_indices / start_time at benchmark time
   distribute-launcher.log — full kubectl --timestamps log of the model-distribute launcher pod
@@ -802,5 +806,13 @@ if ! $SKIP_STATS && ! $DRY_RUN; then
 	fi
 fi
 
+if ! $DRY_RUN && [[ -f "${LOCAL_DIR}/result.json" ]]; then
+	echo ""
+	echo ">>> Recording run in results DB..."
+	python3 "${SCRIPT_DIR}/scripts/results-db.py" ingest "$LOCAL_DIR" ||
+		echo ">>> WARNING: results DB ingest failed (benchmark itself succeeded)" >&2
+	echo "    Compare: python3 ${SCRIPT_DIR}/scripts/results-db.py compare"
+fi
+
 echo ""
 echo "Done. Artifacts: ${LOCAL_DIR}"
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+SQLite store of sa-bench results and cross-run regression comparison.
+
+  ingest   For each results/<test-name>_<UTC-timestamp>/ dir (default: all
+           with a result.json), read result.json and the test config
+           (config.yaml copied there by run-test.sh, else the
+           tests/**/conc-*.yaml with the same name) and upsert one row into
+           results/results.db: recipe metadata, headline throughput and
+           latency, the InferenceX reference of the config at the time and
+           95% confidence intervals of the run's median TTFT / TPOT.
+  compare  Per recipe (sku, precision, spec_method, isl, osl, recipe,
+           concurrency): the latest run against the InferenceX reference and
+           against the previous --baseline-runs runs, with regressions
+           flagged. This replaces hand-editing aks_* fields in the configs.
+
+Confidence intervals (95%):
+  - Median TTFT / TPOT of one run: distribution-free order-statistic interval
+    over the run's successful requests (ranks n/2 -+ 1.96 sqrt(n) / 2).
+    A latency regression is a median more than --threshold % above the
+    previous run's with the two intervals not overlapping.
+  - Throughput is one number per run, so its interval comes from the spread
+    of the baseline runs: the prediction interval for one more run,
+    mean -+ t(n-1) * s * sqrt(1 + 1/n), from two baseline runs up. A
+    throughput regression is the latest run below that interval (or, with
+    one baseline run, below it) by more than --threshold %.
+  - Against InferenceX, the latest run keeps run-test.sh's PASS band
+    (within 5% of inferencex_tput_per_gpu).
+
+Usage:
+  python3 examples/inferenceX/aks/scripts/results-db.py ingest [RESULT_DIR ...]
+  python3 examples/inferenceX/aks/scripts/results-db.py compare \\
+      [--baseline-runs 5] [--threshold 3] [--json out.json] [--fail-on-regression]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import mean, stdev
+
+AKS_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_ROOT = AKS_ROOT / "results"
+TESTS_ROOT = AKS_ROOT / "tests"
+DB_PATH = RESULTS_ROOT / "results.db"
+
+# Same band as run-test.sh's PASS verdict.
+REFERENCE_BAND_PCT = 5.0
+DEFAULT_BASELINE_RUNS = 5
+DEFAULT_THRESHOLD_PCT = 3.0
+Z_95 = 1.96
+# Two-sided 95% Student t quantiles for 1..30 degrees of freedom.
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]  # fmt: skip
+
+KEY_FIELDS = ["sku", "precision", "spec_method", "isl", "osl", "recipe", "concurrency"]
+CONFIG_FIELDS = [
+    "name",
+    "recipe",
+    "values_file",
+    "sku",
+    "precision",
+    "spec_method",
+    "isl",
+    "osl",
+    "concurrency",
+    "total_gpus",
+    "prefill_workers",
+    "prefill_gpus_each",
+    "decode_workers",
+    "decode_gpus_each",
+    "inferencex_date",
+    "inferencex_tput_per_gpu",
+    "inferencex_output_tput_per_gpu",
+    "inferencex_median_tpot_ms",
+    "inferencex_median_ttft_ms",
+]
+RESULT_FIELDS = [
+    "completed",
+    "duration",
+    "total_token_throughput",
+    "output_throughput",
+    "request_throughput",
+    "median_ttft_ms",
+    "p99_ttft_ms",
+    "median_tpot_ms",
+    "p99_tpot_ms",
+    "median_itl_ms",
+    "p99_itl_ms",
+    "median_e2el_ms",
+    "p99_e2el_ms",
+]
+DERIVED_FIELDS = [
+    "tok_per_s_per_gpu",
+    "output_tok_per_s_per_gpu",
+    "median_ttft_ci_low",
+    "median_ttft_ci_high",
+    "median_tpot_ci_low",
+    "median_tpot_ci_high",
+]
+COLUMNS = [
+    "run_id",
+    "timestamp",
+    *CONFIG_FIELDS,
+    *RESULT_FIELDS,
+    *DERIVED_FIELDS,
+    "ingested",
+]
+
+
+def open_db(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, "
+        f"{', '.join(COLUMNS[1:])})"
+    )
+    return db
+
+
+def parse_config(path: Path) -> dict:
+    """Flat `key: value` test config (the subset of YAML the configs use)."""
+    config = {}
+    for line in path.read_text().splitlines():
+        m = re.match(r"^([A-Za-z_][\w-]*):\s*(.*?)\s*(?:#.*)?$", line)
+        if not m:
+            continue
+        key, value = m.groups()
+        try:
+            config[key] = int(value)
+        except ValueError:
+            try:
+                config[key] = float(value)
+            except ValueError:
+                config[key] = value
+    return config
+
+
+def find_config(run_dir: Path, name: str) -> Path | None:
+    copied = run_dir / "config.yaml"
+    if copied.exists():
+        return copied
+    matches = [
+        p
+        for p in sorted(TESTS_ROOT.glob("**/conc-*.yaml"))
+        if parse_config(p).get("name") == name
+    ]
+    if len(matches) > 1:
+        print(f"  {run_dir.name}: {len(matches)} configs named {name}, skipping")
+        return None
+    return matches[0] if matches else None
+
+
+def run_timestamp(run_id: str) -> str:
+    m = re.search(r"_(\d{8}T\d{6}Z)$", run_id)
+    if not m:
+        return ""
+    ts = datetime.strptime(m.group(1), "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def median_ci(values: list[float]) -> tuple[float | None, float | None]:
+    """Distribution-free 95% CI of the median (order statistics)."""
+    n = len(values)
+    if n < 2:
+        return None, None
+    vs = sorted(values)
+    half_width = Z_95 * math.sqrt(n) / 2
+    low = max(1, math.floor(n / 2 - half_width))
+    high = min(n, math.ceil(1 + n / 2 + half_width))
+    return vs[low - 1], vs[high - 1]
+
+
+def request_latencies(result: dict) -> tuple[list[float], list[float]]:
+    """Per successful request TTFT and TPOT in ms (TPOT needs itls)."""
+    ttfts = result.get("ttfts") or []
+    errors = result.get("errors") or [""] * len(ttfts)
+    itls = result.get("itls") or []
+    output_lens = result.get("output_lens") or []
+    ok = [i for i, error in enumerate(errors) if not error]
+    ttft_ms = [ttfts[i] * 1000 for i in ok]
+    tpot_ms = []
+    if itls and output_lens:
+        # latency - ttft = sum of the ITLs, as in calculate_metrics().
+        tpot_ms = [
+            sum(itls[i]) / (output_lens[i] - 1) * 1000 for i in ok if output_lens[i] > 1
+        ]
+    return ttft_ms, tpot_ms
+
+
+def ingest_run(db: sqlite3.Connection, run_dir: Path) -> bool:
+    result_path = run_dir / "result.json"
+    if not result_path.exists():
+        print(f"  {run_dir.name}: no result.json, skipping")
+        return False
+    result = json.loads(result_path.read_text())
+    name = run_dir.name.rsplit("_", 1)[0]
+    config_path = find_config(run_dir, name)
+    if config_path is None:
+        print(f"  {run_dir.name}: no test config found, skipping")
+        return False
+    config = parse_config(config_path)
+
+    row = {"run_id": run_dir.name, "timestamp": run_timestamp(run_dir.name)}
+    row.update({f: config.get(f) for f in CONFIG_FIELDS})
+    row.update({f: result.get(f) for f in RESULT_FIELDS})
+    gpus = config.get("total_gpus") or 0
+    if gpus and result.get("total_token_throughput"):
+        row["tok_per_s_per_gpu"] = result["total_token_throughput"] / gpus
+        row["output_tok_per_s_per_gpu"] = result["output_throughput"] / gpus
+    ttft_ms, tpot_ms = request_latencies(result)
+    row["median_ttft_ci_low"], row["median_ttft_ci_high"] = median_ci(ttft_ms)
+    row["median_tpot_ci_low"], row["median_tpot_ci_high"] = median_ci(tpot_ms)
+    row["ingested"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    columns = [c for c in COLUMNS if c in row]
+    db.execute(
+        f"INSERT OR REPLACE INTO runs ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        [row[c] for c in columns],
+    )
+    print(f"  {run_dir.name}: {row['recipe']} conc={row['concurrency']}")
+    return True
+
+
+def prediction_interval(values: list[float]) -> tuple[float, float] | None:
+    """95% interval for one more run drawn like values (needs two)."""
+    n = len(values)
+    if n < 2:
+        return None
+    t = T_95[n - 2] if n - 1 <= len(T_95) else Z_95
+    half_width = t * stdev(values) * math.sqrt(1 + 1 / n)
+    return mean(values) - half_width, mean(values) + half_width
+
+
+def pct_delta(value: float | None, base: float | None) -> float | None:
+    if value is None or not base:
+        return None
+    return (value / base - 1) * 100
+
+
+def compare_recipe(runs: list[sqlite3.Row], baseline_runs: int, threshold: float):
+    """Latest run vs reference and vs the previous runs of one recipe."""
+    latest, previous = runs[-1], runs[:-1][-baseline_runs:]
+    flags = []
+    row = {f: latest[f] for f in KEY_FIELDS}
+    row.update(
+        {
+            "run_id": latest["run_id"],
+            "runs": len(runs),
+            "tok_per_s_per_gpu": latest["tok_per_s_per_gpu"],
+            "median_ttft_ms": latest["median_ttft_ms"],
+            "median_tpot_ms": latest["median_tpot_ms"],
+        }
+    )
+
+    reference = latest["inferencex_tput_per_gpu"]
+    row["pct_of_inferencex"] = None
+    if reference and latest["tok_per_s_per_gpu"]:
+        pct = latest["tok_per_s_per_gpu"] / reference * 100
+        row["pct_of_inferencex"] = pct
+        if abs(pct - 100) > REFERENCE_BAND_PCT:
+            flags.append("GAP vs InferenceX")
+
+    tputs = [r["tok_per_s_per_gpu"] for r in previous if r["tok_per_s_per_gpu"]]
+    row["baseline_tok_per_s_per_gpu"] = mean(tputs) if tputs else None
+    row["tput_delta_pct"] = pct_delta(
+        latest["tok_per_s_per_gpu"], row["baseline_tok_per_s_per_gpu"]
+    )
+    interval = prediction_interval(tputs)
+    row["tput_interval"] = list(interval) if interval else None
+    if row["tput_delta_pct"] is not None and row["tput_delta_pct"] < -threshold:
+        low = interval[0] if interval else min(tputs)
+        if latest["tok_per_s_per_gpu"] < low:
+            flags.append("REGRESSION throughput")
+
+    if previous:
+        before = previous[-1]
+        for metric in ("ttft", "tpot"):
+            delta = pct_delta(
+                latest[f"median_{metric}_ms"], before[f"median_{metric}_ms"]
+            )
+            row[f"{metric}_delta_pct"] = delta
+            low = latest[f"median_{metric}_ci_low"]
+            before_high = before[f"median_{metric}_ci_high"]
+            if (
+                delta is not None
+                and delta > threshold
+                and low is not None
+                and before_high is not None
+                and low > before_high
+            ):
+                flags.append(f"REGRESSION {metric}")
+    row["flags"] = flags
+    return row
+
+
+def fmt(v, spec=".1f"):
+    return "-" if v is None else format(v, spec)
+
+
+def render_md(rows: list[dict]) -> str:
+    lines = [
+        "| recipe | conc | runs | tok/s/GPU | % InferenceX | vs baseline (95% PI) "
+        "| TTFT med ms (Δ%) | TPOT med ms (Δ%) | flags |",
+        "|---|---:|---:|---:|---:|---|---:|---:|---|",
+    ]
+    for r in rows:
+        interval = r["tput_interval"]
+        baseline = "-"
+        if r["tput_delta_pct"] is not None:
+            baseline = f"{r['tput_delta_pct']:+.1f}%"
+            if interval:
+                baseline += f" [{interval[0]:.0f}, {interval[1]:.0f}]"
+        lines.append(
+            f"| {r['recipe']} | {r['concurrency']} | {r['runs']} "
+            f"| {fmt(r['tok_per_s_per_gpu'], '.0f')} | {fmt(r['pct_of_inferencex'])} "
+            f"| {baseline} "
+            f"| {fmt(r['median_ttft_ms'])} ({fmt(r.get('ttft_delta_pct'), '+.1f')}) "
+            f"| {fmt(r['median_tpot_ms'], '.2f')} ({fmt(r.get('tpot_delta_pct'), '+.1f')}) "
+            f"| {', '.join(r['flags']) or 'ok'} |"
+        )
+    return "\n".join(lines)
+
+
+def cmd_ingest(args) -> int:
+    dirs = [Path(p) for p in args.run_dirs] or sorted(
+        p.parent for p in RESULTS_ROOT.glob("*/result.json")
+    )
+    db = open_db(args.db)
+    print(f"Ingesting {len(dirs)} runs into {args.db}...")
+    ingested = sum(ingest_run(db, d) for d in dirs)
+    db.commit()
+    print(f"Ingested {ingested} runs")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    db = open_db(args.db)
+    runs = db.execute(
+        f"SELECT * FROM runs ORDER BY {', '.join(KEY_FIELDS)}, timestamp, run_id"
+    ).fetchall()
+    by_recipe: dict[tuple, list[sqlite3.Row]] = {}
+    for r in runs:
+        by_recipe.setdefault(tuple(r[f] for f in KEY_FIELDS), []).append(r)
+    rows = [
+        compare_recipe(recipe_runs, args.baseline_runs, args.threshold)
+        for recipe_runs in by_recipe.values()
+    ]
+    print(render_md(rows))
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+        print(f"Wrote {args.json}")
+    regressions = [
+        r for r in rows if any(f.startswith("REGRESSION") for f in r["flags"])
+    ]
+    print(f"{len(rows)} recipes, {len(regressions)} with regressions")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Add or refresh runs in the store.")
+    ingest.add_argument(
+        "run_dirs",
+        nargs="*",
+        help="results/<test-name>_<timestamp> dirs (default: all under results/).",
+    )
+    compare = sub.add_parser("compare", help="Latest run per recipe vs reference.")
+    compare.add_argument(
+        "--baseline-runs",
+        type=int,
+        default=DEFAULT_BASELINE_RUNS,
+        help="Previous runs per recipe to compare the latest one against.",
+    )
+    compare.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD_PCT,
+        help="Minimum change in %% before a significant change is a regression.",
+    )
+    compare.add_argument("--json", help="Also write the comparison to this file.")
+    compare.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 if any recipe regressed.",
+    )
+    args = parser.parse_args()
+    handler = cmd_ingest if args.command == "ingest" else cmd_compare
+    sys.exit(handler(args))
+
+
+if __name__ == "__main__":
+    main()
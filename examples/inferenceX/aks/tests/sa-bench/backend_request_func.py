@@ -7,15 +7,68 @@ import os
 import sys
 import time
 import traceback
+import uuid
+from array import array
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 
 import aiohttp
 import huggingface_hub.constants
+import numpy as np
+from phase_timing import (
+    REQUEST_ID_HEADER,
+    SERVER_TIMING_HEADER,
+    chunk_timings,
+    parse_server_timing,
+)
+from sse_parser import loads, parse_sse_line, sse_payload
 from tqdm.asyncio import tqdm
 from transformers import AutoTokenizer, PreTrainedTokenizer, PreTrainedTokenizerFast
 
 AIOHTTP_TIMEOUT = aiohttp.ClientTimeout(total=6 * 60 * 60)
 
+# Shared-session connection pool defaults (see create_client_session).
+DEFAULT_KEEPALIVE_TIMEOUT = 60.0
+DEFAULT_DNS_CACHE_TTL = 300
+
+NS_PER_SECOND = 1e9
+
+
+def create_client_session(
+    pool_size: int = 0,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+) -> aiohttp.ClientSession:
+    """Create the ClientSession shared by every request of a benchmark run.
+
+    Reusing one session keeps TCP connections alive between requests, so the
+    connection setup no longer lands inside the measured TTFT. pool_size caps
+    the open connections (0 = unlimited); it should be at least the benchmark
+    concurrency, otherwise requests queue for a connection on the client.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, trust_env=True, timeout=AIOHTTP_TIMEOUT
+    )
+
+
+@asynccontextmanager
+async def _session_scope(session: aiohttp.ClientSession | None):
+    # Use the shared session when given, else a throwaway one per request.
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession(
+        trust_env=True, timeout=AIOHTTP_TIMEOUT
+    ) as new_session:
+        yield new_session
+
 
 @dataclass
 class RequestFuncInput:
@@ -30,6 +83,10 @@ class RequestFuncInput:
     extra_body: dict | None = None
     multi_modal_content: dict | None = None
     ignore_eos: bool = False
+    # Keep RequestFuncOutput.token_times_ns after deriving itl from it.
+    keep_token_times: bool = False
+    # Send an x-request-id and collect server phase timings (phase_timing.py).
+    phase_timing: bool = False
 
 
 @dataclass
@@ -40,22 +97,44 @@ class RequestFuncOutput:
     # output_tokens: int = 0
     output_tokens: int | None = None
     ttft: float = 0.0  # Time to first token
-    itl: list[float] = field(default_factory=list)  # List of inter-token latencies
+    # Inter-token latencies (s), derived from token_times_ns at the end.
+    itl: array = field(default_factory=lambda: array("d"))
     tpot: float = 0.0  # avg next-token latencies
     prompt_len: int = 0
     error: str = ""
+    # time.perf_counter() when the request was sent / completed (set by the
+    # benchmark loop, not the backend functions).
+    start_time: float = 0.0
+    end_time: float = 0.0
+    # time.perf_counter_ns() (monotonic) at each streamed token chunk; 8 bytes
+    # per token instead of a float object per ITL. Emptied once itl is derived
+    # unless RequestFuncInput.keep_token_times.
+    token_times_ns: array = field(default_factory=lambda: array("q"))
+    # Seconds the send was late against its scheduled arrival time (set by
+    # the benchmark loop, see arrival_schedule.py).
+    schedule_lag: float = 0.0
+    # With RequestFuncInput.phase_timing: the x-request-id sent (or echoed by
+    # the server) and the server's phase durations in ms.
+    request_id: str = ""
+    server_timings: dict[str, float] = field(default_factory=dict)
+
+
+def _finish_token_times(output: RequestFuncOutput, keep: bool) -> None:
+    times = np.frombuffer(output.token_times_ns, dtype=np.int64)
+    output.itl = array("d", (np.diff(times) / NS_PER_SECOND).tobytes())
+    if not keep:
+        output.token_times_ns = array("q")
 
 
 async def async_request_tgi(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
     api_url = request_func_input.api_url
     assert api_url.endswith("generate_stream")
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         params = {
             "best_of": request_func_input.best_of,
             "max_new_tokens": request_func_input.output_len,
@@ -72,8 +151,7 @@ async def async_request_tgi(
         output = RequestFuncOutput()
         output.prompt_len = request_func_input.prompt_len
 
-        ttft = 0.0
-        st = time.perf_counter()
+        st = time.perf_counter_ns()
         most_recent_timestamp = st
         try:
             async with session.post(url=api_url, json=payload) as response:
@@ -91,19 +169,15 @@ async def async_request_tgi(
                         chunk = chunk_bytes.removeprefix("data:")
 
                         data = json.loads(chunk)
-                        timestamp = time.perf_counter()
+                        timestamp = time.perf_counter_ns()
                         # First token
-                        if ttft == 0.0:
-                            ttft = time.perf_counter() - st
-                            output.ttft = ttft
-
-                        # Decoding phase
-                        else:
-                            output.itl.append(timestamp - most_recent_timestamp)
+                        if not output.token_times_ns:
+                            output.ttft = (timestamp - st) / NS_PER_SECOND
 
+                        output.token_times_ns.append(timestamp)
                         most_recent_timestamp = timestamp
 
-                    output.latency = most_recent_timestamp - st
+                    output.latency = (most_recent_timestamp - st) / NS_PER_SECOND
                     output.success = True
                     output.generated_text = data["generated_text"]
                 else:
@@ -113,6 +187,7 @@ async def async_request_tgi(
             output.success = False
             exc_info = sys.exc_info()
             output.error = "".join(traceback.format_exception(*exc_info))
+        _finish_token_times(output, request_func_input.keep_token_times)
 
         if pbar:
             pbar.update(1)
@@ -122,13 +197,12 @@ async def async_request_tgi(
 async def async_request_trt_llm(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
     api_url = request_func_input.api_url
     assert api_url.endswith("generate_stream")
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         assert request_func_input.best_of == 1
         payload = {
             "accumulate_tokens": True,
@@ -143,8 +217,7 @@ async def async_request_trt_llm(
         output = RequestFuncOutput()
         output.prompt_len = request_func_input.prompt_len
 
-        ttft = 0.0
-        st = time.perf_counter()
+        st = time.perf_counter_ns()
         most_recent_timestamp = st
         try:
             async with session.post(url=api_url, json=payload) as response:
@@ -158,19 +231,15 @@ async def async_request_trt_llm(
 
                         data = json.loads(chunk)
                         output.generated_text += data["text_output"]
-                        timestamp = time.perf_counter()
+                        timestamp = time.perf_counter_ns()
                         # First token
-                        if ttft == 0.0:
-                            ttft = timestamp - st
-                            output.ttft = ttft
-
-                        # Decoding phase
-                        else:
-                            output.itl.append(timestamp - most_recent_timestamp)
+                        if not output.token_times_ns:
+                            output.ttft = (timestamp - st) / NS_PER_SECOND
 
+                        output.token_times_ns.append(timestamp)
                         most_recent_timestamp = timestamp
 
-                    output.latency = most_recent_timestamp - st
+                    output.latency = (most_recent_timestamp - st) / NS_PER_SECOND
                     output.success = True
 
                 else:
@@ -180,6 +249,7 @@ async def async_request_trt_llm(
             output.success = False
             exc_info = sys.exc_info()
             output.error = "".join(traceback.format_exception(*exc_info))
+        _finish_token_times(output, request_func_input.keep_token_times)
 
         if pbar:
             pbar.update(1)
@@ -189,10 +259,9 @@ async def async_request_trt_llm(
 async def async_request_deepspeed_mii(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         assert request_func_input.best_of == 1
 
         payload = {
@@ -235,15 +304,14 @@ async def async_request_deepspeed_mii(
 async def async_request_openai_completions(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
     api_url = request_func_input.api_url
     assert api_url.endswith(
         ("completions", "profile")
     ), "OpenAI Completions API URL must end with 'completions' or 'profile'."
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         payload = {
             "model": request_func_input.model_name
             if request_func_input.model_name
@@ -267,8 +335,8 @@ async def async_request_openai_completions(
         output = RequestFuncOutput()
         output.prompt_len = request_func_input.prompt_len
 
-        generated_text = ""
-        st = time.perf_counter()
+        text_parts: list[str] = []
+        st = time.perf_counter_ns()
         most_recent_timestamp = st
         try:
             async with session.post(
@@ -281,32 +349,28 @@ async def async_request_openai_completions(
                         if not chunk_bytes:
                             continue
 
-                        chunk = chunk_bytes.decode("utf-8").removeprefix("data: ")
-                        if chunk != "[DONE]":
-                            data = json.loads(chunk)
+                        parsed = parse_sse_line(chunk_bytes)
+                        if parsed is not None:
+                            has_choice, text, completion_tokens = parsed
 
                             # NOTE: Some completion API might have a last
                             # usage summary response without a token so we
                             # want to check a token was generated
-                            if choices := data.get("choices"):
+                            if has_choice:
                                 # Note that text could be empty here
                                 # e.g. for special tokens
-                                text = choices[0].get("text")
-                                timestamp = time.perf_counter()
+                                timestamp = time.perf_counter_ns()
                                 # First token
                                 if not first_chunk_received:
                                     first_chunk_received = True
-                                    ttft = time.perf_counter() - st
-                                    output.ttft = ttft
-
-                                # Decoding phase
-                                else:
-                                    output.itl.append(timestamp - most_recent_timestamp)
+                                    output.ttft = (timestamp - st) / NS_PER_SECOND
 
+                                output.token_times_ns.append(timestamp)
                                 most_recent_timestamp = timestamp
-                                generated_text += text or ""
-                            elif usage := data.get("usage"):
-                                output.output_tokens = usage.get("completion_tokens")
+                                if text:
+                                    text_parts.append(text)
+                            elif completion_tokens is not None:
+                                output.output_tokens = completion_tokens
                     if first_chunk_received:
                         output.success = True
                     else:
@@ -315,8 +379,8 @@ async def async_request_openai_completions(
                             "Never received a valid chunk to calculate TTFT."
                             "This response will be marked as failed!"
                         )
-                    output.generated_text = generated_text
-                    output.latency = most_recent_timestamp - st
+                    output.generated_text = "".join(text_parts)
+                    output.latency = (most_recent_timestamp - st) / NS_PER_SECOND
                 else:
                     output.error = response.reason or ""
                     output.success = False
@@ -324,6 +388,7 @@ async def async_request_openai_completions(
             output.success = False
             exc_info = sys.exc_info()
             output.error = "".join(traceback.format_exception(*exc_info))
+        _finish_token_times(output, request_func_input.keep_token_times)
 
     if pbar:
         pbar.update(1)
@@ -333,15 +398,14 @@ async def async_request_openai_completions(
 async def async_request_dynamo_completions(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
     api_url = request_func_input.api_url
     assert api_url.endswith(
         ("completions", "profile")
     ), "OpenAI Completions API URL must end with 'completions' or 'profile'."
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         payload = {
             "model": request_func_input.model_name
             if request_func_input.model_name
@@ -364,14 +428,24 @@ async def async_request_dynamo_completions(
 
         output = RequestFuncOutput()
         output.prompt_len = request_func_input.prompt_len
+        phase_timing = request_func_input.phase_timing
+        if phase_timing:
+            output.request_id = uuid.uuid4().hex
+            headers[REQUEST_ID_HEADER] = output.request_id
 
-        generated_text = ""
-        st = time.perf_counter()
+        text_parts: list[str] = []
+        st = time.perf_counter_ns()
         most_recent_timestamp = st
         try:
             async with session.post(
                 url=api_url, json=payload, headers=headers
             ) as response:
+                if phase_timing:
+                    output.request_id = response.headers.get(
+                        REQUEST_ID_HEADER, output.request_id
+                    )
+                    if server_timing := response.headers.get(SERVER_TIMING_HEADER):
+                        output.server_timings.update(parse_server_timing(server_timing))
                 if response.status == 200:
                     first_chunk_received = False
                     async for chunk_bytes in response.content:
@@ -379,38 +453,37 @@ async def async_request_dynamo_completions(
                         if not chunk_bytes:
                             continue
 
-                        chunk = chunk_bytes.decode("utf-8")
+                        # Full decode only for the chunks carrying timings.
+                        if phase_timing and b'"timing"' in chunk_bytes:
+                            payload_bytes = sse_payload(chunk_bytes)
+                            if payload_bytes is not None:
+                                output.server_timings.update(
+                                    chunk_timings(loads(payload_bytes))
+                                )
 
-                        # Skip SSE event/comment lines (not data)
-                        if chunk.startswith("event:") or chunk.startswith(":"):
-                            continue
-
-                        chunk = chunk.removeprefix("data: ")
-                        if chunk != "[DONE]":
-                            data = json.loads(chunk)
+                        # SSE event/comment lines (not data) parse to None.
+                        parsed = parse_sse_line(chunk_bytes)
+                        if parsed is not None:
+                            has_choice, text, completion_tokens = parsed
 
                             # NOTE: Some completion API might have a last
                             # usage summary response without a token so we
                             # want to check a token was generated
-                            if choices := data.get("choices"):
+                            if has_choice:
                                 # Note that text could be empty here
                                 # e.g. for special tokens
-                                text = choices[0].get("text")
-                                timestamp = time.perf_counter()
+                                timestamp = time.perf_counter_ns()
                                 # First token
                                 if not first_chunk_received:
                                     first_chunk_received = True
-                                    ttft = time.perf_counter() - st
-                                    output.ttft = ttft
-
-                                # Decoding phase
-                                else:
-                                    output.itl.append(timestamp - most_recent_timestamp)
+                                    output.ttft = (timestamp - st) / NS_PER_SECOND
 
+                                output.token_times_ns.append(timestamp)
                                 most_recent_timestamp = timestamp
-                                generated_text += text or ""
-                            if usage := data.get("usage"):
-                                output.output_tokens = usage.get("completion_tokens")
+                                if text:
+                                    text_parts.append(text)
+                            if completion_tokens is not None:
+                                output.output_tokens = completion_tokens
                     if first_chunk_received:
                         output.success = True
                     else:
@@ -419,8 +492,8 @@ async def async_request_dynamo_completions(
                             "Never received a valid chunk to calculate TTFT."
                             "This response will be marked as failed!"
                         )
-                    output.generated_text = generated_text
-                    output.latency = most_recent_timestamp - st
+                    output.generated_text = "".join(text_parts)
+                    output.latency = (most_recent_timestamp - st) / NS_PER_SECOND
                 else:
                     output.error = response.reason or ""
                     output.success = False
@@ -428,6 +501,7 @@ async def async_request_dynamo_completions(
             output.success = False
             exc_info = sys.exc_info()
             output.error = "".join(traceback.format_exception(*exc_info))
+        _finish_token_times(output, request_func_input.keep_token_times)
 
     if pbar:
         pbar.update(1)
@@ -437,15 +511,14 @@ async def async_request_dynamo_completions(
 async def async_request_openai_chat_completions(
     request_func_input: RequestFuncInput,
     pbar: tqdm | None = None,
+    session: aiohttp.ClientSession | None = None,
 ) -> RequestFuncOutput:
     api_url = request_func_input.api_url
     assert api_url.endswith(
         "chat/completions"
     ), "OpenAI Chat Completions API URL must end with 'chat/completions'."
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=AIOHTTP_TIMEOUT
-    ) as session:
+    async with _session_scope(session) as session:
         content = [{"type": "text", "text": request_func_input.prompt}]
         if request_func_input.multi_modal_content:
             content.append(request_func_input.multi_modal_content)
@@ -475,9 +548,8 @@ async def async_request_openai_chat_completions(
         output = RequestFuncOutput()
         output.prompt_len = request_func_input.prompt_len
 
-        generated_text = ""
-        ttft = 0.0
-        st = time.perf_counter()
+        text_parts: list[str] = []
+        st = time.perf_counter_ns()
         most_recent_timestamp = st
         try:
             async with session.post(
@@ -489,31 +561,27 @@ async def async_request_openai_chat_completions(
                         if not chunk_bytes:
                             continue
 
-                        chunk = chunk_bytes.decode("utf-8").removeprefix("data: ")
-                        if chunk != "[DONE]":
-                            timestamp = time.perf_counter()
-                            data = json.loads(chunk)
+                        timestamp = time.perf_counter_ns()
+                        parsed = parse_sse_line(chunk_bytes, chat=True)
+                        if parsed is not None:
+                            has_choice, content, completion_tokens = parsed
 
-                            if choices := data.get("choices"):
-                                content = choices[0]["delta"].get("content")
+                            if has_choice:
                                 # First token
-                                if ttft == 0.0:
-                                    ttft = timestamp - st
-                                    output.ttft = ttft
-
-                                # Decoding phase
-                                else:
-                                    output.itl.append(timestamp - most_recent_timestamp)
+                                if not output.token_times_ns:
+                                    output.ttft = (timestamp - st) / NS_PER_SECOND
 
-                                generated_text += content or ""
-                            elif usage := data.get("usage"):
-                                output.output_tokens = usage.get("completion_tokens")
+                                output.token_times_ns.append(timestamp)
+                                if content:
+                                    text_parts.append(content)
+                            elif completion_tokens is not None:
+                                output.output_tokens = completion_tokens
 
                             most_recent_timestamp = timestamp
 
-                    output.generated_text = generated_text
+                    output.generated_text = "".join(text_parts)
                     output.success = True
-                    output.latency = most_recent_timestamp - st
+                    output.latency = (most_recent_timestamp - st) / NS_PER_SECOND
                 else:
                     output.error = response.reason or ""
                     output.success = False
@@ -521,6 +589,7 @@ async def async_request_openai_chat_completions(
             output.success = False
             exc_info = sys.exc_info()
             output.error = "".join(traceback.format_exception(*exc_info))
+        _finish_token_times(output, request_func_input.keep_token_times)
 
     if pbar:
         pbar.update(1)
@@ -25,12 +25,23 @@ PORT=$(echo "$ENDPOINT" | sed 's|http://||' | cut -d: -f2 | cut -d/ -f1)
 
 # MODEL_PATH="/model/"  # Use the argument instead
 WORK_DIR="$(dirname "$0")"
+# Load generator processes for the main run (see benchmark_serving.py --num-workers)
+NUM_WORKERS=${SA_BENCH_NUM_WORKERS:-1}
+# Sampled prompts are cached here and reused by later runs with the same args
+DATASET_CACHE_DIR=${SA_BENCH_DATASET_CACHE_DIR:-/tmp/sa-bench/dataset-cache}
+# Optional Prometheus pushgateway for live per-window metrics of the main run
+LIVE_METRICS_ARGS=()
+if [ -n "${SA_BENCH_PUSHGATEWAY:-}" ]; then
+	LIVE_METRICS_ARGS=(--live-metrics-pushgateway "$SA_BENCH_PUSHGATEWAY")
+fi
+# Server phase timings and request IDs (default: on for disaggregated runs)
+PHASE_TIMING_ARGS=()
+if [ "${SA_BENCH_PHASE_TIMING:-$IS_DISAGGREGATED}" = "true" ]; then
+	PHASE_TIMING_ARGS=(--phase-timing)
+fi
 
 echo "SA-Bench Config: endpoint=${ENDPOINT}; isl=${ISL}; osl=${OSL}; concurrencies=${CONCURRENCIES}; req_rate=${REQ_RATE}; model=${MODEL_NAME}"
 
-# Parse concurrency list
-IFS='x' read -r -a CONCURRENCY_LIST <<<"$CONCURRENCIES"
-
 # Quick curl to verify endpoint is working
 echo "Verifying endpoint..."
 curl -s "${ENDPOINT}/v1/chat/completions" \
@@ -49,56 +60,38 @@ ulimit -n 65536
 result_dir="/tmp/results/sa-bench_isl_${ISL}_osl_${OSL}"
 mkdir -p "$result_dir"
 
-for concurrency in "${CONCURRENCY_LIST[@]}"; do
-
-	num_warmup_prompts=$((concurrency * 2))
-	python3 -u "${WORK_DIR}/benchmark_serving.py" \
-		--model "${MODEL_NAME}" --tokenizer "${MODEL_PATH}" \
-		--host "$HOST" --port "$PORT" \
-		--backend "dynamo" --endpoint /v1/completions \
-		--disable-tqdm \
-		--dataset-name random \
-		--num-prompts "$num_warmup_prompts" \
-		--random-input-len "$ISL" \
-		--random-output-len "$OSL" \
-		--random-range-ratio 0.8 \
-		--ignore-eos \
-		--request-rate 250 \
-		--percentile-metrics ttft,tpot,itl,e2el \
-		--max-concurrency "$concurrency"
-
-	num_prompts=$((concurrency * 10))
-
-	# Generate result filename based on mode
-	if [ "$IS_DISAGGREGATED" = "true" ]; then
-		result_filename="results_concurrency_${concurrency}_gpus_${TOTAL_GPUS}_ctx_${PREFILL_GPUS}_gen_${DECODE_GPUS}.json"
-	else
-		result_filename="results_concurrency_${concurrency}_gpus_${TOTAL_GPUS}.json"
-	fi
-
-	echo "Running benchmark with concurrency: $concurrency"
-	echo "$(date '+%Y-%m-%d %H:%M:%S')"
-
-	python3 -u "${WORK_DIR}/benchmark_serving.py" \
-		--model "${MODEL_NAME}" --tokenizer "${MODEL_PATH}" \
-		--host "$HOST" --port "$PORT" \
-		--backend "dynamo" --endpoint /v1/completions \
-		--disable-tqdm \
-		--dataset-name random \
-		--num-prompts "$num_prompts" \
-		--random-input-len "$ISL" \
-		--random-output-len "$OSL" \
-		--random-range-ratio 0.8 \
-		--ignore-eos \
-		--request-rate "${REQ_RATE}" \
-		--percentile-metrics ttft,tpot,itl,e2el \
-		--max-concurrency "$concurrency" \
-		--use-chat-template \
-		--save-result --result-dir "$result_dir" --result-filename "$result_filename"
-
-	echo "$(date '+%Y-%m-%d %H:%M:%S')"
-	echo "Completed benchmark with concurrency: $concurrency"
-	echo "-----------------------------------------"
-done
+# Result filename per level; benchmark_serving.py fills in {concurrency}
+if [ "$IS_DISAGGREGATED" = "true" ]; then
+	result_filename="results_concurrency_{concurrency}_gpus_${TOTAL_GPUS}_ctx_${PREFILL_GPUS}_gen_${DECODE_GPUS}.json"
+else
+	result_filename="results_concurrency_{concurrency}_gpus_${TOTAL_GPUS}.json"
+fi
+
+# One process for all levels: tokenizer, prompts and connection pool are set up
+# once; each level runs a warm-up (2x concurrency prompts at 250 RPS) and the
+# measured run (10x concurrency prompts at REQ_RATE).
+python3 -u "${WORK_DIR}/benchmark_serving.py" \
+	--model "${MODEL_NAME}" --tokenizer "${MODEL_PATH}" \
+	--host "$HOST" --port "$PORT" \
+	--backend "dynamo" --endpoint /v1/completions \
+	--disable-tqdm \
+	--dataset-name random \
+	--random-input-len "$ISL" \
+	--random-output-len "$OSL" \
+	--random-range-ratio 0.8 \
+	--ignore-eos \
+	--dataset-cache-dir "$DATASET_CACHE_DIR" \
+	--concurrency-sweep "$CONCURRENCIES" \
+	--sweep-warmup-multiplier 2 --sweep-warmup-request-rate 250 \
+	--sweep-prompts-multiplier 10 \
+	--request-rate "${REQ_RATE}" \
+	--percentile-metrics ttft,tpot,itl,e2el \
+	--num-workers "$NUM_WORKERS" \
+	--steady-state \
+	--live-metrics-file "${result_dir}/${result_filename%.json}.live.jsonl" \
+	"${LIVE_METRICS_ARGS[@]}" \
+	"${PHASE_TIMING_ARGS[@]}" \
+	--use-chat-template \
+	--save-result --result-dir "$result_dir" --result-filename "$result_filename"
 
 echo "SA-Bench complete. Results in $result_dir"
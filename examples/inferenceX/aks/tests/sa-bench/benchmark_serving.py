@@ -33,21 +33,28 @@ import base64
 import gc
 import io
 import json
+import math
 import os
 import random
 import time
 import warnings
-from collections.abc import AsyncGenerator, Collection
+from array import array
+from collections.abc import Collection
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
+import aiohttp
 import numpy as np
 import pandas as pd
+from arrival_schedule import arrival_offsets, dispatch_schedule, schedule_metrics
 from backend_request_func import (
     ASYNC_REQUEST_FUNCS,
+    DEFAULT_DNS_CACHE_TTL,
+    DEFAULT_KEEPALIVE_TIMEOUT,
     RequestFuncInput,
     RequestFuncOutput,
+    create_client_session,
 )
 from datasets import load_dataset
 from PIL.Image import Image
@@ -65,8 +72,26 @@ except ImportError:
     from argparse import ArgumentParser as FlexibleArgumentParser
 
 from benchmark_utils import convert_to_pytorch_benchmark_format
+from capacity_search import (
+    DEFAULT_TOLERANCE,
+    SEARCH_MODES,
+    capacity_search,
+    parse_search_range,
+    probe_summary,
+)
+from dataset_cache import cached_requests
+from live_metrics import DEFAULT_INTERVAL_SECONDS, DEFAULT_PUSHGATEWAY_JOB, LiveMetrics
+from multi_turn import MultiTurnWorkload, sample_multi_turn_workload, turn_metrics
+from phase_timing import phase_metrics
+from sharded_load import run_sharded
+from steady_state import DEFAULT_THRESHOLD, steady_state_metrics
+from streaming_metrics import OnlineMetrics
+from token_timeline import save_token_timelines
+from trace_replay import TRACE_FORMATS, Trace, load_trace
 
 MILLISECONDS_TO_SECONDS_CONVERSION = 1000
+# Prompts per batched tokenizer call when sampling datasets.
+TOKENIZER_BATCH_SIZE = 256
 
 
 @dataclass
@@ -121,26 +146,29 @@ def sample_sharegpt_requests(
 
     # Filter out sequences that are too long or too short
     filtered_dataset: list[tuple[str, int, int]] = []
-    for i in range(len(dataset)):
+    for batch_start in range(0, len(dataset), TOKENIZER_BATCH_SIZE):
         if len(filtered_dataset) == num_requests:
             break
 
-        # Tokenize the prompts and completions.
-        prompt = dataset[i][0]
-        prompt_token_ids = tokenizer(prompt).input_ids
-        completion = dataset[i][1]
-        completion_token_ids = tokenizer(completion).input_ids
-        prompt_len = len(prompt_token_ids)
-        output_len = (
-            len(completion_token_ids) if fixed_output_len is None else fixed_output_len
-        )
-        if prompt_len < 4 or (fixed_output_len is None and output_len < 4):
-            # Prune too short sequences.
-            continue
-        if prompt_len > 1024 or prompt_len + output_len > 2048:
-            # Prune too long sequences.
-            continue
-        filtered_dataset.append((prompt, prompt_len, output_len, None))
+        # Tokenize the prompts and completions, one tokenizer call per batch.
+        batch = dataset[batch_start : batch_start + TOKENIZER_BATCH_SIZE]
+        prompt_lens = [len(ids) for ids in tokenizer([p for p, _ in batch]).input_ids]
+        if fixed_output_len is None:
+            output_lens = [
+                len(ids) for ids in tokenizer([c for _, c in batch]).input_ids
+            ]
+        else:
+            output_lens = [fixed_output_len] * len(batch)
+        for (prompt, _), prompt_len, output_len in zip(batch, prompt_lens, output_lens):
+            if len(filtered_dataset) == num_requests:
+                break
+            if prompt_len < 4 or (fixed_output_len is None and output_len < 4):
+                # Prune too short sequences.
+                continue
+            if prompt_len > 1024 or prompt_len + output_len > 2048:
+                # Prune too long sequences.
+                continue
+            filtered_dataset.append((prompt, prompt_len, output_len, None))
 
     return filtered_dataset
 
@@ -406,194 +434,257 @@ def sample_random_requests(
     )
     offsets = np.random.randint(0, tokenizer.vocab_size, size=num_prompts)
     input_requests = []
-    for i in range(num_prompts):
-        prompt = tokenizer.decode(
-            prefix_token_ids
-            + [
-                (offsets[i] + i + j) % tokenizer.vocab_size
-                for j in range(input_lens[i])
+    # Decode, re-encode and truncate prompts a batch at a time: the encode is a
+    # single (parallel) tokenizer call per batch instead of one per prompt.
+    for batch_start in range(0, num_prompts, TOKENIZER_BATCH_SIZE):
+        batch = range(batch_start, min(batch_start + TOKENIZER_BATCH_SIZE, num_prompts))
+        prompts = tokenizer.batch_decode(
+            [
+                prefix_token_ids
+                + (
+                    (offsets[i] + i + np.arange(input_lens[i])) % tokenizer.vocab_size
+                ).tolist()
+                for i in batch
             ]
         )
-        re_encoded_sequence = tokenizer.encode(prompt, add_special_tokens=False)[
-            : (prefix_len + input_lens[i])
-        ]
-        prompt = tokenizer.decode(re_encoded_sequence)
-        if use_chat_template:
-            prompt = tokenizer.apply_chat_template(
-                [{"role": "user", "content": prompt}],
-                add_generation_prompt=True,
-                tokenize=False,
+        re_encoded = tokenizer(prompts, add_special_tokens=False).input_ids
+        prompts = tokenizer.batch_decode(
+            [ids[: (prefix_len + input_lens[i])] for i, ids in zip(batch, re_encoded)]
+        )
+        for i, prompt in zip(batch, prompts):
+            if use_chat_template:
+                prompt = tokenizer.apply_chat_template(
+                    [{"role": "user", "content": prompt}],
+                    add_generation_prompt=True,
+                    tokenize=False,
+                )
+                input_lens[i] += chat_template_len
+
+            input_requests.append(
+                (prompt, int(prefix_len + input_lens[i]), int(output_lens[i]), None)
             )
-            input_lens[i] += chat_template_len
 
-        input_requests.append(
-            (prompt, int(prefix_len + input_lens[i]), int(output_lens[i]), None)
-        )
+    return input_requests
 
+
+def sample_trace_requests(
+    trace: Trace,
+    tokenizer: PreTrainedTokenizerBase,
+) -> list[tuple[str, int, int, None]]:
+    """Synthetic prompts with each trace request's input / output length."""
+    num_requests = len(trace.offsets)
+    offsets = np.random.randint(0, tokenizer.vocab_size, size=num_requests)
+    input_requests = []
+    # Same decode / re-encode / truncate batches as sample_random_requests.
+    for batch_start in range(0, num_requests, TOKENIZER_BATCH_SIZE):
+        batch = range(
+            batch_start, min(batch_start + TOKENIZER_BATCH_SIZE, num_requests)
+        )
+        prompts = tokenizer.batch_decode(
+            [
+                (
+                    (offsets[i] + np.arange(trace.input_lens[i])) % tokenizer.vocab_size
+                ).tolist()
+                for i in batch
+            ]
+        )
+        re_encoded = tokenizer(prompts, add_special_tokens=False).input_ids
+        prompts = tokenizer.batch_decode(
+            [ids[: trace.input_lens[i]] for i, ids in zip(batch, re_encoded)]
+        )
+        input_requests += [
+            (prompt, int(trace.input_lens[i]), int(trace.output_lens[i]), None)
+            for i, prompt in zip(batch, prompts)
+        ]
     return input_requests
 
 
-async def get_request(
-    input_requests: list[tuple[str, int, int]],
-    request_rate: float,
-    burstiness: float = 1.0,
-) -> AsyncGenerator[tuple[str, int, int], None]:
-    """
-    Asynchronously generates requests at a specified rate
-    with OPTIONAL burstiness.
-
-    Args:
-        input_requests:
-            A list of input requests, each represented as a tuple.
-        request_rate:
-            The rate at which requests are generated (requests/s).
-        burstiness (optional):
-            The burstiness factor of the request generation.
-            Only takes effect when request_rate is not inf.
-            Default value is 1, which follows a Poisson process.
-            Otherwise, the request intervals follow a gamma distribution.
-            A lower burstiness value (0 < burstiness < 1) results
-            in more bursty requests, while a higher burstiness value
-            (burstiness > 1) results in a more uniform arrival of requests.
-    """
-    input_requests = iter(input_requests)
+@dataclass
+class RequestColumns:
+    """Per-request results as one NumPy array per field (struct of arrays).
 
-    # Calculate scale parameter theta to maintain the desired request_rate.
-    assert (
-        burstiness > 0
-    ), f"A positive burstiness factor is expected, but given {burstiness}."
-    theta = 1.0 / (request_rate * burstiness)
+    Has the same fields as OnlineMetrics, so _columnar_metrics() serves
+    both; output_len is 0 and ttft / latency are 0.0 for failed requests.
+    """
 
-    for request in input_requests:
-        yield request
+    success: np.ndarray
+    prompt_len: np.ndarray
+    output_len: np.ndarray
+    ttft: np.ndarray
+    latency: np.ndarray
+
+    @classmethod
+    def from_outputs(
+        cls,
+        input_requests: list[tuple[str, int, int]],
+        outputs: list[RequestFuncOutput],
+        tokenizer: PreTrainedTokenizerBase,
+    ) -> "RequestColumns":
+        success = np.fromiter((o.success for o in outputs), bool, len(outputs))
+        output_len = np.fromiter(
+            (-1 if o.output_tokens is None else o.output_tokens for o in outputs),
+            np.int64,
+            len(outputs),
+        )
+        output_len[~success] = 0
+        missing = np.flatnonzero(output_len < 0)
+        if missing.size:
+            # We use the tokenizer to count the number of output tokens
+            # for some serving backends instead of looking at
+            # len(outputs[i].itl) since multiple output tokens may be
+            # bundled together
+            # Note : this may inflate the output token count slightly
+            token_ids = tokenizer(
+                [outputs[i].generated_text for i in missing],
+                add_special_tokens=False,
+            ).input_ids
+            output_len[missing] = [len(ids) for ids in token_ids]
+        return cls(
+            success=success,
+            prompt_len=np.fromiter(
+                (request[1] for request in input_requests), np.int64, len(outputs)
+            ),
+            output_len=output_len,
+            ttft=np.where(success, [o.ttft for o in outputs], 0.0),
+            latency=np.where(success, [o.latency for o in outputs], 0.0),
+        )
 
-        if request_rate == float("inf"):
-            # If the request rate is infinity, then we don't need to wait.
-            continue
 
-        # Sample the request interval from the gamma distribution.
-        # If burstiness is 1, it follows exponential distribution.
-        interval = np.random.gamma(shape=burstiness, scale=theta)
-        # The next request will be sent after the interval.
-        await asyncio.sleep(interval)
+def _summarize(values: np.ndarray, selected_percentiles: list[float]):
+    # (mean, std, median, percentiles) in ms, zeros when there are no samples.
+    if not values.size:
+        values = np.zeros(1)
+    values = values * 1000
+    # One partition pass for the median and all percentiles.
+    median, *percentiles = np.percentile(values, [50, *selected_percentiles])
+    return (
+        float(np.mean(values)),
+        float(np.std(values)),
+        float(median),
+        [(p, float(v)) for p, v in zip(selected_percentiles, percentiles)],
+    )
 
 
-def calculate_metrics(
-    input_requests: list[tuple[str, int, int]],
-    outputs: list[RequestFuncOutput],
+def _columnar_metrics(
+    columns: "RequestColumns | OnlineMetrics",
+    itl_ms: tuple[float, float, float, list[tuple[float, float]]],
     dur_s: float,
-    tokenizer: PreTrainedTokenizerBase,
-    selected_percentile_metrics: list[str],
     selected_percentiles: list[float],
     goodput_config_dict: dict[str, float],
-) -> tuple[BenchmarkMetrics, list[int]]:
-    actual_output_lens: list[int] = []
-    total_input = 0
-    completed = 0
-    good_completed = 0
-    itls: list[float] = []
-    tpots: list[float] = []
-    all_tpots: list[float] = []
-    ttfts: list[float] = []
-    e2els: list[float] = []
-    for i in range(len(outputs)):
-        if outputs[i].success:
-            output_len = outputs[i].output_tokens
-
-            if output_len is None:
-                # We use the tokenizer to count the number of output tokens
-                # for some serving backends instead of looking at
-                # len(outputs[i].itl) since multiple output tokens may be
-                # bundled together
-                # Note : this may inflate the output token count slightly
-                output_len = len(
-                    tokenizer(
-                        outputs[i].generated_text, add_special_tokens=False
-                    ).input_ids
-                )
-            actual_output_lens.append(output_len)
-            total_input += input_requests[i][1]
-            tpot = 0
-            if output_len > 1:
-                latency_minus_ttft = outputs[i].latency - outputs[i].ttft
-                tpot = latency_minus_ttft / (output_len - 1)
-                tpots.append(tpot)
-            # Note: if output_len <= 1, we regard tpot as 0 for goodput
-            all_tpots.append(tpot)
-            itls += outputs[i].itl
-            ttfts.append(outputs[i].ttft)
-            e2els.append(outputs[i].latency)
-            completed += 1
-        else:
-            actual_output_lens.append(0)
-
-    if goodput_config_dict:
-        valid_metrics = []
-        slo_values = []
-
-        if "ttft" in goodput_config_dict:
-            valid_metrics.append(ttfts)
-            slo_values.append(
-                goodput_config_dict["ttft"] / MILLISECONDS_TO_SECONDS_CONVERSION
-            )
-        if "tpot" in goodput_config_dict:
-            valid_metrics.append(all_tpots)
-            slo_values.append(
-                goodput_config_dict["tpot"] / MILLISECONDS_TO_SECONDS_CONVERSION
-            )
-        if "e2el" in goodput_config_dict:
-            valid_metrics.append(e2els)
-            slo_values.append(
-                goodput_config_dict["e2el"] / MILLISECONDS_TO_SECONDS_CONVERSION
-            )
+) -> tuple[BenchmarkMetrics, np.ndarray]:
+    # BenchmarkMetrics from per-request arrays; ITL statistics are computed
+    # by the caller (from samples or from a histogram).
+    ok = columns.success
+    output_lens = np.where(ok, columns.output_len, 0)
+    completed = int(ok.sum())
+    total_input = int(columns.prompt_len[ok].sum())
+    total_output = int(output_lens.sum())
+    ttfts = columns.ttft[ok]
+    e2els = columns.latency[ok]
+    multi_token = columns.output_len[ok] > 1
+    # Note: if output_len <= 1, we regard tpot as 0 for goodput
+    all_tpots = np.zeros(completed)
+    all_tpots[multi_token] = (e2els - ttfts)[multi_token] / (
+        columns.output_len[ok][multi_token] - 1
+    )
+    tpots = all_tpots[multi_token]
 
-        for req_metric in zip(*valid_metrics):
-            is_good_req = all([s >= r for s, r in zip(slo_values, req_metric)])
-            if is_good_req:
-                good_completed += 1
+    good = np.ones(completed, dtype=bool)
+    for name, values in (("ttft", ttfts), ("tpot", all_tpots), ("e2el", e2els)):
+        if name in goodput_config_dict:
+            slo = goodput_config_dict[name] / MILLISECONDS_TO_SECONDS_CONVERSION
+            good &= values <= slo
+    good_completed = int(good.sum()) if goodput_config_dict else 0
 
     if completed == 0:
         warnings.warn(
             "All requests failed. This is likely due to a misconfiguration "
             "on the benchmark arguments.",
-            stacklevel=2,
+            stacklevel=3,
         )
+    mean_ttft, std_ttft, median_ttft, pct_ttft = _summarize(ttfts, selected_percentiles)
+    mean_tpot, std_tpot, median_tpot, pct_tpot = _summarize(tpots, selected_percentiles)
+    mean_e2el, std_e2el, median_e2el, pct_e2el = _summarize(e2els, selected_percentiles)
+    mean_itl, std_itl, median_itl, pct_itl = itl_ms
     metrics = BenchmarkMetrics(
         completed=completed,
         total_input=total_input,
-        total_output=sum(actual_output_lens),
+        total_output=total_output,
         request_throughput=completed / dur_s,
         request_goodput=good_completed / dur_s,
-        output_throughput=sum(actual_output_lens) / dur_s,
-        total_token_throughput=(total_input + sum(actual_output_lens)) / dur_s,
-        mean_ttft_ms=np.mean(ttfts or 0)
-        * 1000,  # ttfts is empty if streaming is not supported by backend
-        std_ttft_ms=np.std(ttfts or 0) * 1000,
-        median_ttft_ms=np.median(ttfts or 0) * 1000,
-        percentiles_ttft_ms=[
-            (p, np.percentile(ttfts or 0, p) * 1000) for p in selected_percentiles
-        ],
-        mean_tpot_ms=np.mean(tpots or 0) * 1000,
-        std_tpot_ms=np.std(tpots or 0) * 1000,
-        median_tpot_ms=np.median(tpots or 0) * 1000,
-        percentiles_tpot_ms=[
-            (p, np.percentile(tpots or 0, p) * 1000) for p in selected_percentiles
-        ],
-        mean_itl_ms=np.mean(itls or 0) * 1000,
-        std_itl_ms=np.std(itls or 0) * 1000,
-        median_itl_ms=np.median(itls or 0) * 1000,
-        percentiles_itl_ms=[
-            (p, np.percentile(itls or 0, p) * 1000) for p in selected_percentiles
-        ],
-        mean_e2el_ms=np.mean(e2els or 0) * 1000,
-        std_e2el_ms=np.std(e2els or 0) * 1000,
-        median_e2el_ms=np.median(e2els or 0) * 1000,
-        percentiles_e2el_ms=[
-            (p, np.percentile(e2els or 0, p) * 1000) for p in selected_percentiles
-        ],
+        output_throughput=total_output / dur_s,
+        total_token_throughput=(total_input + total_output) / dur_s,
+        mean_ttft_ms=mean_ttft,
+        std_ttft_ms=std_ttft,
+        median_ttft_ms=median_ttft,
+        percentiles_ttft_ms=pct_ttft,
+        mean_tpot_ms=mean_tpot,
+        std_tpot_ms=std_tpot,
+        median_tpot_ms=median_tpot,
+        percentiles_tpot_ms=pct_tpot,
+        mean_itl_ms=mean_itl,
+        std_itl_ms=std_itl,
+        median_itl_ms=median_itl,
+        percentiles_itl_ms=pct_itl,
+        mean_e2el_ms=mean_e2el,
+        std_e2el_ms=std_e2el,
+        median_e2el_ms=median_e2el,
+        percentiles_e2el_ms=pct_e2el,
+    )
+    return metrics, output_lens
+
+
+def calculate_metrics(
+    input_requests: list[tuple[str, int, int]],
+    outputs: list[RequestFuncOutput],
+    dur_s: float,
+    tokenizer: PreTrainedTokenizerBase,
+    selected_percentile_metrics: list[str],
+    selected_percentiles: list[float],
+    goodput_config_dict: dict[str, float],
+) -> tuple[BenchmarkMetrics, list[int]]:
+    columns = RequestColumns.from_outputs(input_requests, outputs, tokenizer)
+    # array.extend() from another array('d') is a memcpy, far cheaper than
+    # np.concatenate() wrapping each of 100k small arrays first.
+    itls = array("d")
+    for output, ok in zip(outputs, columns.success.tolist()):
+        if ok:
+            itls.extend(output.itl)
+    metrics, output_lens = _columnar_metrics(
+        columns,
+        _summarize(np.frombuffer(itls), selected_percentiles),
+        dur_s,
+        selected_percentiles,
+        goodput_config_dict,
     )
+    return metrics, output_lens.tolist()
+
+
+def calculate_online_metrics(
+    online: OnlineMetrics,
+    dur_s: float,
+    selected_percentiles: list[float],
+    goodput_config_dict: dict[str, float],
+) -> tuple[BenchmarkMetrics, list[int]]:
+    """calculate_metrics() for results aggregated with OnlineMetrics.
 
-    return metrics, actual_output_lens
+    TTFT, TPOT and E2EL are exact (one value per request); ITL statistics come
+    from the histogram (percentiles within its relative error).
+    """
+    itl = online.itl
+    metrics, output_lens = _columnar_metrics(
+        online,
+        (
+            itl.mean() * 1000,
+            itl.std() * 1000,
+            itl.percentile(50) * 1000,
+            [(p, itl.percentile(p) * 1000) for p in selected_percentiles],
+        ),
+        dur_s,
+        selected_percentiles,
+        goodput_config_dict,
+    )
+    return metrics, output_lens.tolist()
 
 
 async def benchmark(
@@ -616,54 +707,65 @@ async def benchmark(
     goodput_config_dict: dict[str, float],
     max_concurrency: int | None,
     lora_modules: list[str] | None,
+    connection_pool_size: int | None = None,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+    num_workers: int = 1,
+    streaming_metrics: bool = False,
+    store_text: bool = True,
+    live_metrics_path: str | None = None,
+    live_metrics_interval: float = DEFAULT_INTERVAL_SECONDS,
+    live_metrics_pushgateway: str | None = None,
+    live_metrics_job: str = DEFAULT_PUSHGATEWAY_JOB,
+    steady_state: bool = False,
+    steady_state_threshold: float = DEFAULT_THRESHOLD,
+    token_timeline_path: str | None = None,
+    trace_offsets: np.ndarray | None = None,
+    multi_turn: MultiTurnWorkload | None = None,
+    phase_timing: bool = False,
+    session: aiohttp.ClientSession | None = None,
 ):
     if backend in ASYNC_REQUEST_FUNCS:
         request_func = ASYNC_REQUEST_FUNCS[backend]
     else:
         raise ValueError(f"Unknown backend: {backend}")
+    if multi_turn is not None and num_workers > 1:
+        raise ValueError("Multi-turn sessions run in a single process.")
+    # Multi-turn prompts are built as the sessions progress, so input_requests
+    # is unused then.
+    num_requests = (
+        len(input_requests) if multi_turn is None else multi_turn.num_requests
+    )
 
-    print("Starting initial single prompt test run...")
-    test_prompt, test_prompt_len, test_output_len, test_mm_content = input_requests[0]
-    if backend != "openai-chat" and test_mm_content is not None:
-        # multi-modal benchmark is only available on OpenAI Chat backend.
-        raise ValueError(
-            "Multi-modal content is only supported on 'openai-chat' backend."
+    # One session for the whole run: connections are opened once and kept
+    # alive, so TCP setup is not measured as part of TTFT. The pool defaults to
+    # the request concurrency (unlimited when concurrency is unbounded). A
+    # caller-provided session (sweep / soak mode) stays open across runs.
+    if connection_pool_size is None:
+        connection_pool_size = max_concurrency or 0
+    owns_session = session is None
+    if owns_session:
+        session = create_client_session(
+            pool_size=connection_pool_size,
+            keepalive_timeout=keepalive_timeout,
+            dns_cache_ttl=dns_cache_ttl,
         )
-    test_input = RequestFuncInput(
-        model=model_id,
-        model_name=model_name,
-        prompt=test_prompt,
-        api_url=api_url,
-        prompt_len=test_prompt_len,
-        output_len=test_output_len,
-        logprobs=logprobs,
-        best_of=best_of,
-        multi_modal_content=test_mm_content,
-        ignore_eos=ignore_eos,
-    )
-
-    test_output = await request_func(request_func_input=test_input)
-    if not test_output.success:
-        raise ValueError(
-            "Initial test run failed - Please make sure benchmark arguments "
-            f"are correctly specified. Error: {test_output.error}"
-        )
-    else:
-        print("Initial test run completed. Starting main benchmark run...")
 
-    if lora_modules:
-        # For each input request, choose a LoRA module at random.
-        lora_modules = iter(
-            [random.choice(lora_modules) for _ in range(len(input_requests))]
+    try:
+        print("Starting initial single prompt test run...")
+        test_prompt, test_prompt_len, test_output_len, test_mm_content = (
+            input_requests[0] if multi_turn is None else multi_turn.first_request()
         )
-
-    if profile:
-        print("Starting profiler...")
-        profile_input = RequestFuncInput(
+        if backend != "openai-chat" and test_mm_content is not None:
+            # multi-modal benchmark is only available on OpenAI Chat backend.
+            raise ValueError(
+                "Multi-modal content is only supported on 'openai-chat' backend."
+            )
+        test_input = RequestFuncInput(
             model=model_id,
             model_name=model_name,
             prompt=test_prompt,
-            api_url=base_url + "/start_profile",
+            api_url=api_url,
             prompt_len=test_prompt_len,
             output_len=test_output_len,
             logprobs=logprobs,
@@ -671,90 +773,243 @@ async def benchmark(
             multi_modal_content=test_mm_content,
             ignore_eos=ignore_eos,
         )
-        profile_output = await request_func(request_func_input=profile_input)
-        if profile_output.success:
-            print("Profiler started")
 
-    if burstiness == 1.0:
-        distribution = "Poisson process"
-    else:
-        distribution = "Gamma distribution"
-
-    print(f"Traffic request rate: {request_rate}")
-    print(f"Burstiness factor: {burstiness} ({distribution})")
-    print(f"Maximum request concurrency: {max_concurrency}")
-
-    pbar = None if disable_tqdm else tqdm(total=len(input_requests))
-
-    # This can be used once the minimum Python version is 3.10 or higher,
-    # and it will simplify the code in limited_request_func.
-    #    semaphore = (asyncio.Semaphore(max_concurrency)
-    #                 if max_concurrency else contextlib.nullcontext())
-    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
-
-    async def limited_request_func(request_func_input, pbar):
-        if semaphore is None:
-            return await request_func(request_func_input=request_func_input, pbar=pbar)
-        async with semaphore:
-            return await request_func(request_func_input=request_func_input, pbar=pbar)
-
-    benchmark_start_time = time.perf_counter()
-    tasks: list[asyncio.Task] = []
-    async for request in get_request(input_requests, request_rate, burstiness):
-        prompt, prompt_len, output_len, mm_content = request
-        req_model_id, req_model_name = model_id, model_name
+        test_output = await request_func(request_func_input=test_input, session=session)
+        if not test_output.success:
+            raise ValueError(
+                "Initial test run failed - Please make sure benchmark arguments "
+                f"are correctly specified. Error: {test_output.error}"
+            )
+        else:
+            print("Initial test run completed. Starting main benchmark run...")
+
         if lora_modules:
-            req_lora_module = next(lora_modules)
-            req_model_id, req_model_name = req_lora_module, req_lora_module
+            # For each input request, choose a LoRA module at random.
+            lora_modules = iter(
+                [random.choice(lora_modules) for _ in range(num_requests)]
+            )
 
-        request_func_input = RequestFuncInput(
-            model=req_model_id,
-            model_name=req_model_name,
-            prompt=prompt,
-            api_url=api_url,
-            prompt_len=prompt_len,
-            output_len=output_len,
-            logprobs=logprobs,
-            best_of=best_of,
-            multi_modal_content=mm_content,
-            ignore_eos=ignore_eos,
-        )
-        tasks.append(
-            asyncio.create_task(
-                limited_request_func(request_func_input=request_func_input, pbar=pbar)
+        if profile:
+            print("Starting profiler...")
+            profile_input = RequestFuncInput(
+                model=model_id,
+                model_name=model_name,
+                prompt=test_prompt,
+                api_url=base_url + "/start_profile",
+                prompt_len=test_prompt_len,
+                output_len=test_output_len,
+                logprobs=logprobs,
+                best_of=best_of,
+                multi_modal_content=test_mm_content,
+                ignore_eos=ignore_eos,
             )
-        )
-    outputs: list[RequestFuncOutput] = await asyncio.gather(*tasks)
+            profile_output = await request_func(
+                request_func_input=profile_input, session=session
+            )
+            if profile_output.success:
+                print("Profiler started")
 
-    if profile:
-        print("Stopping profiler...")
-        profile_input = RequestFuncInput(
-            model=model_id,
-            prompt=test_prompt,
-            api_url=base_url + "/stop_profile",
-            prompt_len=test_prompt_len,
-            output_len=test_output_len,
-            logprobs=logprobs,
-            best_of=best_of,
-        )
-        profile_output = await request_func(request_func_input=profile_input)
-        if profile_output.success:
-            print("Profiler stopped")
+        if burstiness == 1.0:
+            distribution = "Poisson process"
+        else:
+            distribution = "Gamma distribution"
+
+        print(f"Traffic request rate: {request_rate}")
+        print(f"Burstiness factor: {burstiness} ({distribution})")
+        print(f"Maximum request concurrency: {max_concurrency}")
+        print(f"HTTP connection pool size: {connection_pool_size or 'unlimited'}")
+
+        pbar = None if disable_tqdm else tqdm(total=num_requests)
+
+        # This can be used once the minimum Python version is 3.10 or higher,
+        # and it will simplify the code in limited_request_func.
+        #    semaphore = (asyncio.Semaphore(max_concurrency)
+        #                 if max_concurrency else contextlib.nullcontext())
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        # Dropping generated text at completion requires counting its tokens then,
+        # so --no-store-text always uses the online aggregation.
+        online_metrics = None
+        if streaming_metrics or not store_text:
+            online_metrics = OnlineMetrics(
+                num_requests,
+                count_tokens=lambda text: len(
+                    tokenizer(text, add_special_tokens=False).input_ids
+                ),
+                store_text=store_text,
+            )
 
-    if pbar is not None:
-        pbar.close()
+        live_metrics = None
+        if live_metrics_path or live_metrics_pushgateway:
+            live_metrics = LiveMetrics(
+                path=live_metrics_path,
+                interval=live_metrics_interval,
+                percentiles=selected_percentiles,
+                pushgateway_url=live_metrics_pushgateway,
+                job=live_metrics_job,
+            )
 
-    benchmark_duration = time.perf_counter() - benchmark_start_time
+        async def send_request(request_func_input, pbar):
+            if live_metrics is not None:
+                live_metrics.started()
+            start_time = time.perf_counter()
+            output = await request_func(
+                request_func_input=request_func_input, pbar=pbar, session=session
+            )
+            output.start_time, output.end_time = start_time, time.perf_counter()
+            if live_metrics is not None:
+                live_metrics.finished(
+                    output.success, output.ttft, output.itl, output.output_tokens
+                )
+            return output
+
+        async def limited_request_func(request_func_input, pbar):
+            if semaphore is None:
+                return await send_request(request_func_input, pbar)
+            async with semaphore:
+                return await send_request(request_func_input, pbar)
+
+        def make_request_input(request):
+            prompt, prompt_len, output_len, mm_content = request
+            req_model_id, req_model_name = model_id, model_name
+            if lora_modules:
+                req_lora_module = next(lora_modules)
+                req_model_id, req_model_name = req_lora_module, req_lora_module
+
+            return RequestFuncInput(
+                model=req_model_id,
+                model_name=req_model_name,
+                prompt=prompt,
+                api_url=api_url,
+                prompt_len=prompt_len,
+                output_len=output_len,
+                logprobs=logprobs,
+                best_of=best_of,
+                multi_modal_content=mm_content,
+                ignore_eos=ignore_eos,
+                keep_token_times=token_timeline_path is not None,
+                phase_timing=phase_timing,
+            )
 
-    metrics, actual_output_lens = calculate_metrics(
-        input_requests=input_requests,
-        outputs=outputs,
-        dur_s=benchmark_duration,
-        tokenizer=tokenizer,
-        selected_percentile_metrics=selected_percentile_metrics,
-        selected_percentiles=selected_percentiles,
-        goodput_config_dict=goodput_config_dict,
-    )
+        # Send times are fixed up front (the trace's, else drawn from
+        # --request-rate / --burstiness) and dispatched on absolute deadlines.
+        offsets = trace_offsets
+        if multi_turn is not None:
+            # Session start times; later turns follow the responses.
+            offsets = multi_turn.offsets
+        elif offsets is None:
+            offsets = arrival_offsets(len(input_requests), request_rate, burstiness)
+
+        live_task = None
+        if live_metrics is not None:
+            live_task = asyncio.create_task(live_metrics.run())
+
+        if num_workers > 1:
+            print(f"Load generator worker processes: {num_workers}")
+            outputs, benchmark_start_time = await run_sharded(
+                backend=backend,
+                request_inputs=[make_request_input(r) for r in input_requests],
+                request_rate=request_rate,
+                burstiness=burstiness,
+                num_workers=num_workers,
+                max_concurrency=max_concurrency,
+                connection_pool_size=connection_pool_size,
+                keepalive_timeout=keepalive_timeout,
+                dns_cache_ttl=dns_cache_ttl,
+                pbar=pbar,
+                itl_histogram=online_metrics.itl if online_metrics else None,
+                live_metrics=live_metrics,
+                offsets=offsets,
+            )
+            if online_metrics is not None:
+                for index, output in enumerate(outputs):
+                    online_metrics.record(index, output)
+        else:
+
+            async def recorded_request_func(
+                index, request_func_input, pbar, schedule_lag
+            ):
+                output = await limited_request_func(request_func_input, pbar)
+                output.schedule_lag = schedule_lag
+                if online_metrics is not None:
+                    online_metrics.record(index, output)
+                return output
+
+            async def send_turn(index, request, schedule_lag):
+                output = await limited_request_func(make_request_input(request), pbar)
+                # The next turn needs the text even if recording drops it.
+                text = output.generated_text
+                output.schedule_lag = schedule_lag
+                if online_metrics is not None:
+                    online_metrics.record(index, output)
+                return output, text
+
+            benchmark_start_time = time.perf_counter()
+            if multi_turn is not None:
+                outputs = await multi_turn.run(send_turn, benchmark_start_time)
+            else:
+                tasks: list[asyncio.Task] = []
+                async for index, lag in dispatch_schedule(
+                    offsets, benchmark_start_time
+                ):
+                    request_func_input = make_request_input(input_requests[index])
+                    tasks.append(
+                        asyncio.create_task(
+                            recorded_request_func(index, request_func_input, pbar, lag)
+                        )
+                    )
+                outputs: list[RequestFuncOutput] = await asyncio.gather(*tasks)
+
+        if live_task is not None:
+            await live_metrics.stop()
+            await live_task
+
+        if profile:
+            print("Stopping profiler...")
+            profile_input = RequestFuncInput(
+                model=model_id,
+                prompt=test_prompt,
+                api_url=base_url + "/stop_profile",
+                prompt_len=test_prompt_len,
+                output_len=test_output_len,
+                logprobs=logprobs,
+                best_of=best_of,
+            )
+            profile_output = await request_func(
+                request_func_input=profile_input, session=session
+            )
+            if profile_output.success:
+                print("Profiler stopped")
+
+        if pbar is not None:
+            pbar.close()
+
+        benchmark_duration = time.perf_counter() - benchmark_start_time
+    finally:
+        if owns_session:
+            await session.close()
+
+    if multi_turn is not None:
+        # Per-turn prompt lengths, in output order, for calculate_metrics().
+        input_requests = [(None, o.prompt_len, None, None) for o in outputs]
+
+    if online_metrics is not None:
+        metrics, actual_output_lens = calculate_online_metrics(
+            online=online_metrics,
+            dur_s=benchmark_duration,
+            selected_percentiles=selected_percentiles,
+            goodput_config_dict=goodput_config_dict,
+        )
+    else:
+        metrics, actual_output_lens = calculate_metrics(
+            input_requests=input_requests,
+            outputs=outputs,
+            dur_s=benchmark_duration,
+            tokenizer=tokenizer,
+            selected_percentile_metrics=selected_percentile_metrics,
+            selected_percentiles=selected_percentiles,
+            goodput_config_dict=goodput_config_dict,
+        )
 
     print("{s:{c}^{n}}".format(s=" Serving Benchmark Result ", n=50, c="="))
     print("{:<40} {:<10}".format("Successful requests:", metrics.completed))
@@ -795,10 +1050,13 @@ async def benchmark(
         "input_lens": [output.prompt_len for output in outputs],
         "output_lens": actual_output_lens,
         "ttfts": [output.ttft for output in outputs],
-        "itls": [output.itl for output in outputs],
-        "generated_texts": [output.generated_text for output in outputs],
         "errors": [output.error for output in outputs],
     }
+    # Streaming mode keeps only the ITL histogram, not per-request ITL lists.
+    if online_metrics is None:
+        result["itls"] = [output.itl.tolist() for output in outputs]
+    if store_text:
+        result["generated_texts"] = [output.generated_text for output in outputs]
 
     def process_one_metric(
         # E.g., "ttft"
@@ -844,8 +1102,103 @@ async def benchmark(
     process_one_metric("itl", "ITL", "Inter-token Latency")
     process_one_metric("e2el", "E2EL", "End-to-end Latency")
 
+    if steady_state:
+        window = steady_state_metrics(
+            outputs=outputs,
+            output_lens=actual_output_lens,
+            benchmark_start_time=benchmark_start_time,
+            max_concurrency=max_concurrency,
+            selected_percentiles=selected_percentiles,
+            threshold=steady_state_threshold,
+        )
+        result["steady_state"] = window
+        print("{s:{c}^{n}}".format(s=" Steady State ", n=50, c="-"))
+        if window is None:
+            print("No steady-state window detected.")
+        else:
+            print(
+                "{:<40} {:.2f}-{:.2f}".format(
+                    "Window (s from start):", window["start_s"], window["end_s"]
+                )
+            )
+            print(
+                "{:<40} {:<10}".format(
+                    "Target concurrency:", window["target_concurrency"]
+                )
+            )
+            print("{:<40} {:<10}".format("Completed in window:", window["completed"]))
+            print(
+                "{:<40} {:<10.2f}".format(
+                    "Request throughput (req/s):", window["request_throughput"]
+                )
+            )
+            print(
+                "{:<40} {:<10.2f}".format(
+                    "Output token throughput (tok/s):", window["output_throughput"]
+                )
+            )
+            for name in ("ttft", "tpot", "e2el"):
+                print(
+                    "{:<40} {:<10.2f}".format(
+                        f"Median {name.upper()} (ms):", window[f"median_{name}_ms"]
+                    )
+                )
+
+    if phase_timing:
+        phases = phase_metrics(outputs, selected_percentiles)
+        result["server_phases"] = phases
+        result["request_ids"] = [output.request_id for output in outputs]
+        result["server_timings"] = [output.server_timings for output in outputs]
+        print("{s:{c}^{n}}".format(s=" Server Phases ", n=50, c="-"))
+        if len(phases) <= 1:
+            print("No server phase timings received.")
+        else:
+            for name, row in phases.items():
+                print(
+                    "{:<40} {:<10.2f}".format(f"Median {name} (ms):", row["median_ms"])
+                )
+
+    if multi_turn is not None:
+        turns = turn_metrics(outputs, multi_turn.num_turns, selected_percentiles)
+        result["turns"] = turns
+        print("{s:{c}^{n}}".format(s=" TTFT by Turn ", n=50, c="-"))
+        for row in turns:
+            print(
+                "{:<40} {:<10.2f}".format(
+                    f"Turn {row['turn'] + 1} median TTFT (ms):", row["median_ttft_ms"]
+                )
+            )
+
+    scheduled_outputs = outputs
+    if multi_turn is not None:
+        # Only first turns follow the arrival schedule.
+        scheduled_outputs = outputs[:: multi_turn.num_turns]
+    schedule_lags = [output.schedule_lag for output in scheduled_outputs]
+    schedule = schedule_metrics(
+        offsets, schedule_lags, [output.start_time for output in scheduled_outputs]
+    )
+    result.update(schedule)
+    result["schedule_lags"] = schedule_lags
+    print("{s:{c}^{n}}".format(s=" Arrival Schedule ", n=50, c="-"))
+    for label, key in (
+        ("Scheduled request rate (req/s):", "scheduled_request_rate"),
+        ("Achieved request rate (req/s):", "achieved_request_rate"),
+    ):
+        if schedule[key] is not None:
+            print("{:<40} {:<10.2f}".format(label, schedule[key]))
+    for name in ("mean", "p99", "max"):
+        print(
+            "{:<40} {:<10.2f}".format(
+                f"{name.capitalize()} dispatch lag (ms):",
+                schedule[f"{name}_schedule_lag_ms"],
+            )
+        )
+
     print("=" * 50)
 
+    if token_timeline_path is not None:
+        save_token_timelines(token_timeline_path, outputs, benchmark_start_time)
+
     return result
 
 
@@ -906,7 +1259,15 @@ def save_to_pytorch_benchmark_format(
     ]
     # These raw data might be useful, but they are rather big. They can be added
     # later if needed
-    ignored_metrics = ["ttfts", "itls", "generated_texts", "errors"]
+    ignored_metrics = [
+        "ttfts",
+        "itls",
+        "generated_texts",
+        "errors",
+        "schedule_lags",
+        "request_ids",
+        "server_timings",
+    ]
     pt_records = convert_to_pytorch_benchmark_format(
         args=args,
         metrics={k: [results[k]] for k in metrics},
@@ -923,29 +1284,20 @@ def save_to_pytorch_benchmark_format(
             json.dump(pt_records, f)
 
 
-def main(args: argparse.Namespace):
-    print(args)
-    random.seed(args.seed)
-    np.random.seed(args.seed)
-
-    backend = args.backend
-    model_id = args.model
-    model_name = args.served_model_name
-    tokenizer_id = args.tokenizer if args.tokenizer is not None else args.model
-    tokenizer_mode = args.tokenizer_mode
-
-    if args.base_url is not None:
-        api_url = f"{args.base_url}{args.endpoint}"
-        base_url = f"{args.base_url}"
-    else:
-        api_url = f"http://{args.host}:{args.port}{args.endpoint}"
-        base_url = f"http://{args.host}:{args.port}"
-
-    tokenizer = get_tokenizer(
+def sample_input_requests(
+    args: argparse.Namespace,
+    tokenizer: PreTrainedTokenizerBase,
+    tokenizer_id: str,
+    num_prompts: int,
+) -> list[tuple]:
+    # Dataset cache key for the tokenizer: the path alone does not change when
+    # a different tokenizer is copied to it.
+    tokenizer_key = [
         tokenizer_id,
-        tokenizer_mode=tokenizer_mode,
-        trust_remote_code=args.trust_remote_code,
-    )
+        type(tokenizer).__name__,
+        len(tokenizer),
+        getattr(tokenizer, "chat_template", None),
+    ]
 
     if args.dataset is not None:
         warnings.warn(
@@ -956,23 +1308,32 @@ def main(args: argparse.Namespace):
         )
         input_requests = sample_sharegpt_requests(
             dataset_path=args.dataset,
-            num_requests=args.num_prompts,
+            num_requests=num_prompts,
             tokenizer=tokenizer,
             fixed_output_len=args.sharegpt_output_len,
         )
 
     elif args.dataset_name == "sharegpt":
-        input_requests = sample_sharegpt_requests(
+        input_requests = cached_requests(
+            args.dataset_cache_dir,
+            lambda: sample_sharegpt_requests(
+                dataset_path=args.dataset_path,
+                num_requests=num_prompts,
+                tokenizer=tokenizer,
+                fixed_output_len=args.sharegpt_output_len,
+            ),
+            dataset="sharegpt",
+            tokenizer=tokenizer_key,
+            seed=args.seed,
             dataset_path=args.dataset_path,
-            num_requests=args.num_prompts,
-            tokenizer=tokenizer,
-            fixed_output_len=args.sharegpt_output_len,
+            num_prompts=num_prompts,
+            output_len=args.sharegpt_output_len,
         )
 
     elif args.dataset_name == "burstgpt":
         input_requests = sample_burstgpt_requests(
             dataset_path=args.dataset_path,
-            num_requests=args.num_prompts,
+            num_requests=num_prompts,
             random_seed=args.seed,
             tokenizer=tokenizer,
         )
@@ -982,7 +1343,7 @@ def main(args: argparse.Namespace):
         if args.backend == "openai-chat":
             input_requests = sample_sonnet_requests(
                 dataset_path=args.dataset_path,
-                num_requests=args.num_prompts,
+                num_requests=num_prompts,
                 input_len=args.sonnet_input_len,
                 output_len=args.sonnet_output_len,
                 prefix_len=args.sonnet_prefix_len,
@@ -998,7 +1359,7 @@ def main(args: argparse.Namespace):
             ), "Tokenizer/model must have chat template for sonnet dataset."
             input_requests = sample_sonnet_requests(
                 dataset_path=args.dataset_path,
-                num_requests=args.num_prompts,
+                num_requests=num_prompts,
                 input_len=args.sonnet_input_len,
                 output_len=args.sonnet_output_len,
                 prefix_len=args.sonnet_prefix_len,
@@ -1014,105 +1375,550 @@ def main(args: argparse.Namespace):
             dataset_path=args.dataset_path,
             dataset_subset=args.hf_subset,
             dataset_split=args.hf_split,
-            num_requests=args.num_prompts,
+            num_requests=num_prompts,
             tokenizer=tokenizer,
             random_seed=args.seed,
             fixed_output_len=args.hf_output_len,
         )
 
     elif args.dataset_name == "random":
-        input_requests = sample_random_requests(
+        input_requests = cached_requests(
+            args.dataset_cache_dir,
+            lambda: sample_random_requests(
+                prefix_len=args.random_prefix_len,
+                input_len=args.random_input_len,
+                output_len=args.random_output_len,
+                num_prompts=num_prompts,
+                range_ratio=args.random_range_ratio,
+                tokenizer=tokenizer,
+                use_chat_template=args.use_chat_template,
+            ),
+            dataset="random",
+            tokenizer=tokenizer_key,
+            seed=args.seed,
             prefix_len=args.random_prefix_len,
             input_len=args.random_input_len,
             output_len=args.random_output_len,
-            num_prompts=args.num_prompts,
             range_ratio=args.random_range_ratio,
-            tokenizer=tokenizer,
             use_chat_template=args.use_chat_template,
+            num_prompts=num_prompts,
         )
 
     else:
         raise ValueError(f"Unknown dataset: {args.dataset_name}")
 
+    return input_requests
+
+
+def save_benchmark_result(
+    args: argparse.Namespace,
+    benchmark_result: dict[str, Any],
+    tokenizer_id: str,
+    num_prompts: int,
+    request_rate: float,
+    max_concurrency: int | None,
+    result_filename: str | None,
+) -> None:
+    backend = args.backend
+    result_json: dict[str, Any] = {}
+
+    # Setup
+    current_dt = datetime.now().strftime("%Y%m%d-%H%M%S")
+    result_json["date"] = current_dt
+    result_json["backend"] = backend
+    result_json["model_id"] = args.model
+    result_json["tokenizer_id"] = tokenizer_id
+    result_json["best_of"] = args.best_of
+    result_json["num_prompts"] = num_prompts
+
+    # Metadata
+    if args.metadata:
+        for item in args.metadata:
+            if "=" in item:
+                kvstring = item.split("=")
+                result_json[kvstring[0].strip()] = kvstring[1].strip()
+            else:
+                raise ValueError(
+                    "Invalid metadata format. Please use KEY=VALUE format."
+                )
+
+    # Traffic
+    result_json["request_rate"] = request_rate if request_rate < float("inf") else "inf"
+    result_json["burstiness"] = args.burstiness
+    result_json["max_concurrency"] = max_concurrency
+
+    # Merge with benchmark result
+    result_json = {**result_json, **benchmark_result}
+
+    # Save to file
+    base_model_id = args.model.split("/")[-1]
+    max_concurrency_str = (
+        f"-concurrency{max_concurrency}" if max_concurrency is not None else ""
+    )
+    file_name = f"{backend}-{request_rate}qps{max_concurrency_str}-{base_model_id}-{current_dt}.json"  # noqa
+    if result_filename:
+        file_name = result_filename
+    if args.result_dir:
+        file_name = os.path.join(args.result_dir, file_name)
+    with open(file_name, "w", encoding="utf-8") as outfile:
+        json.dump(result_json, outfile)
+    save_to_pytorch_benchmark_format(args, result_json, file_name)
+
+
+def parse_concurrency_sweep(value: str) -> list[int]:
+    """Parse a bench.sh style concurrency list such as "5x12x24"."""
+    try:
+        levels = [int(v) for v in value.split("x") if v]
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f"Invalid concurrency sweep {value!r}; expected e.g. 5x12x24."
+        ) from err
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError(
+            f"Invalid concurrency sweep {value!r}; levels must be positive."
+        )
+    return levels
+
+
+def _phase_name(template: str | None, concurrency: int | None, iteration: int):
+    # Fill {concurrency} / {iteration} placeholders of per-phase file names.
+    if not template:
+        return None
+    return template.format(concurrency=concurrency, iteration=iteration)
+
+
+async def run_concurrency_sweep(
+    args: argparse.Namespace,
+    benchmark_args: dict[str, Any],
+    tokenizer_id: str,
+    input_requests: list[tuple],
+    levels: list[int],
+) -> None:
+    """Warm-up and measured run per concurrency level in one process.
+
+    Every phase takes its own slice of input_requests, so no prompt is sent
+    twice (which would turn into prefix-cache hits on the server), and all
+    phases share one connection pool.
+    """
+    session = create_client_session(
+        pool_size=args.connection_pool_size or max(levels),
+        keepalive_timeout=args.keepalive_timeout,
+        dns_cache_ttl=args.dns_cache_ttl,
+    )
+    warmup_args = {
+        **benchmark_args,
+        "live_metrics_pushgateway": None,
+        "steady_state": False,
+    }
+    offset = 0
+    try:
+        for concurrency in levels:
+            num_warmup = concurrency * args.sweep_warmup_multiplier
+            num_prompts = concurrency * args.sweep_prompts_multiplier
+            warmup_requests = input_requests[offset : offset + num_warmup]
+            offset += num_warmup
+            requests = input_requests[offset : offset + num_prompts]
+            offset += num_prompts
+
+            if warmup_requests:
+                print(f"Warm-up with concurrency: {concurrency}")
+                await benchmark(
+                    **warmup_args,
+                    input_requests=warmup_requests,
+                    request_rate=args.sweep_warmup_request_rate,
+                    max_concurrency=concurrency,
+                    live_metrics_path=None,
+                    token_timeline_path=None,
+                    session=session,
+                )
+
+            print(f"Running benchmark with concurrency: {concurrency}")
+            print(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            result = await benchmark(
+                **benchmark_args,
+                input_requests=requests,
+                request_rate=args.request_rate,
+                max_concurrency=concurrency,
+                live_metrics_path=_phase_name(args.live_metrics_file, concurrency, 1),
+                token_timeline_path=_phase_name(
+                    args.token_timeline_file, concurrency, 1
+                ),
+                session=session,
+            )
+            if args.save_result:
+                save_benchmark_result(
+                    args,
+                    result,
+                    tokenizer_id,
+                    num_prompts,
+                    args.request_rate,
+                    concurrency,
+                    _phase_name(args.result_filename, concurrency, 1),
+                )
+            print(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            print(f"Completed benchmark with concurrency: {concurrency}")
+    finally:
+        await session.close()
+
+
+async def run_soak(
+    args: argparse.Namespace,
+    benchmark_args: dict[str, Any],
+    tokenizer_id: str,
+    input_requests: list[tuple],
+) -> None:
+    """Repeat the benchmark until --soak-duration seconds have elapsed.
+
+    Like soak-loop.sh, every iteration sends the same requests; a new
+    iteration starts as long as the deadline has not passed.
+    """
+    session = create_client_session(
+        pool_size=args.connection_pool_size or args.max_concurrency or 0,
+        keepalive_timeout=args.keepalive_timeout,
+        dns_cache_ttl=args.dns_cache_ttl,
+    )
+    deadline = time.monotonic() + args.soak_duration
+    iteration = 0
+    try:
+        while time.monotonic() < deadline:
+            iteration += 1
+            print(f"=== Iteration {iteration} started at {datetime.now()} ===")
+            result = await benchmark(
+                **benchmark_args,
+                input_requests=input_requests,
+                request_rate=args.request_rate,
+                max_concurrency=args.max_concurrency,
+                live_metrics_path=_phase_name(
+                    args.live_metrics_file, args.max_concurrency, iteration
+                ),
+                token_timeline_path=_phase_name(
+                    args.token_timeline_file, args.max_concurrency, iteration
+                ),
+                session=session,
+            )
+            if args.save_result:
+                save_benchmark_result(
+                    args,
+                    result,
+                    tokenizer_id,
+                    len(input_requests),
+                    args.request_rate,
+                    args.max_concurrency,
+                    _phase_name(args.result_filename, args.max_concurrency, iteration),
+                )
+            print(f"=== Iteration {iteration} completed at {datetime.now()} ===")
+    finally:
+        await session.close()
+    print(f"Soak test finished after {iteration} iterations at {datetime.now()}.")
+
+
+async def run_capacity_search(
+    args: argparse.Namespace,
+    benchmark_args: dict[str, Any],
+    tokenizer_id: str,
+    input_requests: list[tuple],
+) -> None:
+    """Find the highest load level that meets the TTFT / TPOT SLOs.
+
+    Probes take consecutive slices of input_requests, wrapping around (and so
+    repeating prompts) once the pool is used up; size --num-prompts for the
+    whole search to avoid that.
+    """
+    by_concurrency = args.capacity_search == "concurrency"
+    low, high = parse_search_range(args.search_range)
+    session = create_client_session(
+        pool_size=args.connection_pool_size
+        or (int(high) if by_concurrency else args.max_concurrency or 0),
+        keepalive_timeout=args.keepalive_timeout,
+        dns_cache_ttl=args.dns_cache_ttl,
+    )
+    # The SLO check needs P99 TTFT and median TPOT in every probe result.
+    percentile_metrics = benchmark_args["selected_percentile_metrics"]
+    percentiles = benchmark_args["selected_percentiles"]
+    probe_args = {
+        **benchmark_args,
+        "selected_percentile_metrics": list(
+            dict.fromkeys([*percentile_metrics, "ttft", "tpot"])
+        ),
+        "selected_percentiles": list(dict.fromkeys([*percentiles, 99.0])),
+    }
+    warmup_args = {
+        **probe_args,
+        "live_metrics_pushgateway": None,
+        "steady_state": False,
+    }
+    offset = 0
+
+    def take(count: int) -> list[tuple]:
+        nonlocal offset
+        if offset + count > len(input_requests):
+            print("Prompt pool used up; probes now repeat earlier prompts.")
+        requests = [
+            input_requests[(offset + i) % len(input_requests)] for i in range(count)
+        ]
+        offset += count
+        return requests
+
+    async def probe(level: float) -> dict:
+        iteration = len(probes_run) + 1
+        probes_run.append(level)
+        concurrency = int(level) if by_concurrency else args.max_concurrency
+        request_rate = args.request_rate if by_concurrency else level
+        if by_concurrency:
+            num_prompts = concurrency * args.sweep_prompts_multiplier
+        else:
+            num_prompts = math.ceil(level * args.search_probe_duration)
+        num_warmup = math.ceil(level) * args.sweep_warmup_multiplier
+
+        if num_warmup:
+            print(f"Warm-up for probe {iteration} ({args.capacity_search} {level})")
+            await benchmark(
+                **warmup_args,
+                input_requests=take(num_warmup),
+                request_rate=args.sweep_warmup_request_rate,
+                max_concurrency=concurrency,
+                live_metrics_path=None,
+                token_timeline_path=None,
+                session=session,
+            )
+        print(f"Probe {iteration}: {args.capacity_search} {level}")
+        result = await benchmark(
+            **probe_args,
+            input_requests=take(num_prompts),
+            request_rate=request_rate,
+            max_concurrency=concurrency,
+            live_metrics_path=_phase_name(
+                args.live_metrics_file, concurrency, iteration
+            ),
+            token_timeline_path=_phase_name(
+                args.token_timeline_file, concurrency, iteration
+            ),
+            session=session,
+        )
+        if args.save_result:
+            save_benchmark_result(
+                args,
+                result,
+                tokenizer_id,
+                num_prompts,
+                request_rate,
+                concurrency,
+                _phase_name(args.result_filename, concurrency, iteration),
+            )
+        summary = probe_summary(
+            level,
+            num_prompts,
+            result,
+            args.search_num_gpus,
+            args.slo_ttft_ms,
+            args.slo_tpot_ms,
+        )
+        print(f"Probe {iteration} {'meets' if summary['meets_slo'] else 'misses'} SLO")
+        return summary
+
+    probes_run: list[float] = []
+    try:
+        probes, best = await capacity_search(
+            probe,
+            low,
+            high,
+            tolerance=args.search_tolerance,
+            integer=by_concurrency,
+        )
+    finally:
+        await session.close()
+
+    print("{s:{c}^{n}}".format(s=" Capacity Search ", n=50, c="="))
+    for p in probes:
+        print(
+            "{:<40} {:<10.2f}".format(
+                f"{args.capacity_search} {p['level']:g}"
+                f" ({'pass' if p['meets_slo'] else 'fail'}) tok/s/GPU:",
+                p["output_throughput_per_gpu"],
+            )
+        )
+    if best is None:
+        print(f"No level meets the SLOs; the lowest ({low:g}) is too high.")
+    else:
+        print(
+            "{:<40} {:<10g}".format(
+                f"Capacity ({args.capacity_search}):", best["level"]
+            )
+        )
+        print(
+            "{:<40} {:<10.2f}".format(
+                "Output tok/s per GPU at capacity:", best["output_throughput_per_gpu"]
+            )
+        )
+    print("=" * 50)
+
+    if args.capacity_search_file:
+        with open(args.capacity_search_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "mode": args.capacity_search,
+                    "search_range": [low, high],
+                    "tolerance": args.search_tolerance,
+                    "slo_ttft_ms": args.slo_ttft_ms,
+                    "slo_tpot_ms": args.slo_tpot_ms,
+                    "num_gpus": args.search_num_gpus,
+                    "probes": probes,
+                    "capacity": best,
+                },
+                f,
+                indent=2,
+            )
+
+
+def main(args: argparse.Namespace):
+    print(args)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    backend = args.backend
+    model_id = args.model
+    model_name = args.served_model_name
+    tokenizer_id = args.tokenizer if args.tokenizer is not None else args.model
+    tokenizer_mode = args.tokenizer_mode
+
+    if args.base_url is not None:
+        api_url = f"{args.base_url}{args.endpoint}"
+        base_url = f"{args.base_url}"
+    else:
+        api_url = f"http://{args.host}:{args.port}{args.endpoint}"
+        base_url = f"http://{args.host}:{args.port}"
+
+    tokenizer = get_tokenizer(
+        tokenizer_id,
+        tokenizer_mode=tokenizer_mode,
+        trust_remote_code=args.trust_remote_code,
+    )
+
+    levels = None
+    num_prompts = args.num_prompts
+    if args.concurrency_sweep:
+        levels = parse_concurrency_sweep(args.concurrency_sweep)
+        # One pool of prompts for all phases, sampled once.
+        num_prompts = sum(levels) * (
+            args.sweep_warmup_multiplier + args.sweep_prompts_multiplier
+        )
+    trace_offsets = None
+    multi_turn = None
+    if args.dataset_name == "trace":
+        trace = load_trace(
+            args.dataset_path,
+            trace_format=args.trace_format,
+            time_scale=args.trace_time_scale,
+            num_requests=num_prompts,
+        )
+        print(
+            f"Replaying {len(trace.offsets)} trace requests over "
+            f"{trace.offsets[-1]:.1f} s (--request-rate / --burstiness ignored)"
+        )
+        input_requests = sample_trace_requests(trace, tokenizer)
+        trace_offsets = trace.offsets
+    elif args.dataset_name == "multiturn":
+        multi_turn = sample_multi_turn_workload(
+            tokenizer,
+            num_sessions=num_prompts,
+            num_turns=args.multiturn_turns,
+            num_system_prompts=args.multiturn_system_prompts,
+            system_prompt_len=args.multiturn_system_prompt_len,
+            input_len=args.multiturn_input_len,
+            output_len=args.multiturn_output_len,
+            think_time=args.multiturn_think_time,
+            request_rate=args.request_rate,
+            burstiness=args.burstiness,
+            use_chat_template=args.use_chat_template,
+        )
+        print(
+            f"Running {num_prompts} sessions of {args.multiturn_turns} turns "
+            f"({multi_turn.num_requests} requests) over "
+            f"{args.multiturn_system_prompts} system prompts"
+        )
+        input_requests = []
+    else:
+        input_requests = sample_input_requests(
+            args, tokenizer, tokenizer_id, num_prompts
+        )
+
     goodput_config_dict = check_goodput_args(args)
 
     # Avoid GC processing "static" data - reduce pause times.
     gc.collect()
     gc.freeze()
 
+    benchmark_args = dict(
+        backend=backend,
+        api_url=api_url,
+        base_url=base_url,
+        model_id=model_id,
+        model_name=model_name,
+        tokenizer=tokenizer,
+        logprobs=args.logprobs,
+        best_of=args.best_of,
+        burstiness=args.burstiness,
+        disable_tqdm=args.disable_tqdm,
+        profile=args.profile,
+        selected_percentile_metrics=args.percentile_metrics.split(","),
+        selected_percentiles=[float(p) for p in args.metric_percentiles.split(",")],
+        ignore_eos=args.ignore_eos,
+        goodput_config_dict=goodput_config_dict,
+        lora_modules=args.lora_modules,
+        connection_pool_size=args.connection_pool_size,
+        keepalive_timeout=args.keepalive_timeout,
+        dns_cache_ttl=args.dns_cache_ttl,
+        num_workers=args.num_workers,
+        streaming_metrics=args.streaming_metrics,
+        store_text=not args.no_store_text,
+        live_metrics_interval=args.live_metrics_interval,
+        live_metrics_pushgateway=args.live_metrics_pushgateway,
+        live_metrics_job=args.live_metrics_job,
+        steady_state=args.steady_state,
+        steady_state_threshold=args.steady_state_threshold,
+        trace_offsets=trace_offsets,
+        multi_turn=multi_turn,
+        phase_timing=args.phase_timing,
+    )
+
+    if levels is not None:
+        asyncio.run(
+            run_concurrency_sweep(
+                args, benchmark_args, tokenizer_id, input_requests, levels
+            )
+        )
+        return
+    if args.soak_duration:
+        asyncio.run(run_soak(args, benchmark_args, tokenizer_id, input_requests))
+        return
+    if args.capacity_search:
+        asyncio.run(
+            run_capacity_search(args, benchmark_args, tokenizer_id, input_requests)
+        )
+        return
+
     benchmark_result = asyncio.run(
         benchmark(
-            backend=backend,
-            api_url=api_url,
-            base_url=base_url,
-            model_id=model_id,
-            model_name=model_name,
-            tokenizer=tokenizer,
+            **benchmark_args,
             input_requests=input_requests,
-            logprobs=args.logprobs,
-            best_of=args.best_of,
             request_rate=args.request_rate,
-            burstiness=args.burstiness,
-            disable_tqdm=args.disable_tqdm,
-            profile=args.profile,
-            selected_percentile_metrics=args.percentile_metrics.split(","),
-            selected_percentiles=[float(p) for p in args.metric_percentiles.split(",")],
-            ignore_eos=args.ignore_eos,
-            goodput_config_dict=goodput_config_dict,
             max_concurrency=args.max_concurrency,
-            lora_modules=args.lora_modules,
+            live_metrics_path=args.live_metrics_file,
+            token_timeline_path=args.token_timeline_file,
         )
     )
 
     # Save config and results to json
     if args.save_result:
-        result_json: dict[str, Any] = {}
-
-        # Setup
-        current_dt = datetime.now().strftime("%Y%m%d-%H%M%S")
-        result_json["date"] = current_dt
-        result_json["backend"] = backend
-        result_json["model_id"] = model_id
-        result_json["tokenizer_id"] = tokenizer_id
-        result_json["best_of"] = args.best_of
-        result_json["num_prompts"] = args.num_prompts
-
-        # Metadata
-        if args.metadata:
-            for item in args.metadata:
-                if "=" in item:
-                    kvstring = item.split("=")
-                    result_json[kvstring[0].strip()] = kvstring[1].strip()
-                else:
-                    raise ValueError(
-                        "Invalid metadata format. Please use KEY=VALUE format."
-                    )
-
-        # Traffic
-        result_json["request_rate"] = (
-            args.request_rate if args.request_rate < float("inf") else "inf"
-        )
-        result_json["burstiness"] = args.burstiness
-        result_json["max_concurrency"] = args.max_concurrency
-
-        # Merge with benchmark result
-        result_json = {**result_json, **benchmark_result}
-
-        # Save to file
-        base_model_id = model_id.split("/")[-1]
-        max_concurrency_str = (
-            f"-concurrency{args.max_concurrency}"
-            if args.max_concurrency is not None
-            else ""
+        save_benchmark_result(
+            args,
+            benchmark_result,
+            tokenizer_id,
+            args.num_prompts,
+            args.request_rate,
+            args.max_concurrency,
+            args.result_filename,
         )
-        file_name = f"{backend}-{args.request_rate}qps{max_concurrency_str}-{base_model_id}-{current_dt}.json"  # noqa
-        if args.result_filename:
-            file_name = args.result_filename
-        if args.result_dir:
-            file_name = os.path.join(args.result_dir, file_name)
-        with open(file_name, "w", encoding="utf-8") as outfile:
-            json.dump(result_json, outfile)
-        save_to_pytorch_benchmark_format(args, result_json, file_name)
 
 
 if __name__ == "__main__":
@@ -1150,8 +1956,21 @@ if __name__ == "__main__":
         "--dataset-name",
         type=str,
         default="sharegpt",
-        choices=["sharegpt", "burstgpt", "sonnet", "random", "hf"],
-        help="Name of the dataset to benchmark on.",
+        choices=[
+            "sharegpt",
+            "burstgpt",
+            "sonnet",
+            "random",
+            "hf",
+            "trace",
+            "multiturn",
+        ],
+        help="Name of the dataset to benchmark on. 'trace' replays the "
+        "arrival times and token counts of the request trace at "
+        "--dataset-path (BurstGPT, Azure LLM inference traces or CSV/JSONL "
+        "logs) open loop, with synthetic prompts of the traced lengths. "
+        "'multiturn' runs --num-prompts multi-turn chat sessions (see the "
+        "multiturn options).",
     )
     parser.add_argument(
         "--dataset-path",
@@ -1173,6 +1992,239 @@ if __name__ == "__main__":
         "actual request rate may be lower than specified with --request-rate, "
         "if the server is not processing requests fast enough to keep up.",
     )
+    parser.add_argument(
+        "--connection-pool-size",
+        type=int,
+        default=None,
+        help="Maximum number of HTTP connections kept open to the server. All "
+        "requests share one connection pool, so connections are reused instead "
+        "of being set up per request. Defaults to --max-concurrency, or "
+        "unlimited (0) when no concurrency limit is set.",
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=float,
+        default=DEFAULT_KEEPALIVE_TIMEOUT,
+        help="Seconds an idle pooled connection is kept open for reuse.",
+    )
+    parser.add_argument(
+        "--dns-cache-ttl",
+        type=int,
+        default=DEFAULT_DNS_CACHE_TTL,
+        help="Seconds resolved server addresses are cached by the client.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of load generator processes. With more than one, the "
+        "request schedule (--request-rate/--burstiness) is computed up front "
+        "and sharded across worker processes, each with its own event loop "
+        "and connection pool; --max-concurrency and --connection-pool-size "
+        "are split evenly between them (shares differ by at most one) and "
+        "requests are dealt in proportion to each worker's concurrency "
+        "share. Use when a single client process saturates a core at high "
+        "concurrency.",
+    )
+    parser.add_argument(
+        "--streaming-metrics",
+        action="store_true",
+        help="Aggregate results as requests complete, in constant memory: "
+        "per-request values go into preallocated arrays and inter-token "
+        "latencies into a log-bucketed histogram (ITL percentiles within "
+        "0.5%%). Per-request ITL lists are not kept or saved. Use for long "
+        "soak runs.",
+    )
+    parser.add_argument(
+        "--no-store-text",
+        action="store_true",
+        help="Drop each response's generated text once it completes (output "
+        "tokens are counted first). Implies --streaming-metrics.",
+    )
+    parser.add_argument(
+        "--live-metrics-file",
+        type=str,
+        default=None,
+        help="Write windowed metrics (request and output token throughput, "
+        "in-flight requests, TTFT/ITL percentiles from --metric-percentiles, "
+        "error rate) to this file while the run is in progress: CSV if it "
+        "ends in .csv, JSONL otherwise. Rows carry UTC timestamps comparable "
+        "with the BENCH_START/BENCH_END markers in timings.txt.",
+    )
+    parser.add_argument(
+        "--live-metrics-interval",
+        type=float,
+        default=DEFAULT_INTERVAL_SECONDS,
+        help="Window length in seconds for live metrics.",
+    )
+    parser.add_argument(
+        "--live-metrics-pushgateway",
+        type=str,
+        default=None,
+        help="Also push each live metrics window to this Prometheus "
+        "pushgateway URL (e.g. http://pushgateway:9091) as sa_bench_* gauges.",
+    )
+    parser.add_argument(
+        "--live-metrics-job",
+        type=str,
+        default=DEFAULT_PUSHGATEWAY_JOB,
+        help="Pushgateway job label for live metrics.",
+    )
+    parser.add_argument(
+        "--trace-format",
+        type=str,
+        default="auto",
+        choices=TRACE_FORMATS,
+        help="Format of the --dataset-name trace file (auto: by extension).",
+    )
+    parser.add_argument(
+        "--trace-time-scale",
+        type=float,
+        default=1.0,
+        help="Multiply trace inter-arrival times by this factor (0.5 replays "
+        "twice as fast, 0 sends everything at once).",
+    )
+    parser.add_argument(
+        "--phase-timing",
+        action="store_true",
+        help="Send an x-request-id header with every request (--backend "
+        "dynamo) and collect the server's per-phase timings (Server-Timing "
+        "header or a 'timing' object in the stream, e.g. queueing, prefill, "
+        "KV transfer) into per-phase percentiles next to TTFT / TPOT. "
+        "Request IDs are saved as request_ids for matching with server logs.",
+    )
+    parser.add_argument(
+        "--token-timeline-file",
+        type=str,
+        default=None,
+        help="Keep every request's token arrival times (monotonic ns) and save "
+        "them to this .npz at the end of the run, for offline analysis of "
+        "multi-token chunks and decode stalls (python3 token_timeline.py "
+        "FILE prints a summary).",
+    )
+    parser.add_argument(
+        "--concurrency-sweep",
+        type=str,
+        default=None,
+        help="Run several concurrency levels in one process, e.g. 5x12x24. "
+        "The tokenizer is loaded, the dataset sampled and the connection pool "
+        "opened once; per level a warm-up run (--sweep-warmup-multiplier x "
+        "level prompts at --sweep-warmup-request-rate) is followed by the "
+        "measured run (--sweep-prompts-multiplier x level prompts at "
+        "--request-rate). --max-concurrency and --num-prompts are ignored. "
+        "Use {concurrency} in --result-filename / --live-metrics-file / "
+        "--token-timeline-file to get one file per level.",
+    )
+    parser.add_argument(
+        "--sweep-warmup-multiplier",
+        type=int,
+        default=2,
+        help="Warm-up prompts per level, as a multiple of the concurrency "
+        "(0 disables the warm-up).",
+    )
+    parser.add_argument(
+        "--sweep-prompts-multiplier",
+        type=int,
+        default=10,
+        help="Measured prompts per level, as a multiple of the concurrency.",
+    )
+    parser.add_argument(
+        "--sweep-warmup-request-rate",
+        type=float,
+        default=250,
+        help="Request rate of the per-level warm-up runs.",
+    )
+    parser.add_argument(
+        "--capacity-search",
+        type=str,
+        default=None,
+        choices=SEARCH_MODES,
+        help="Search for the highest --max-concurrency or --request-rate "
+        "within --search-range at which every request succeeds, P99 TTFT "
+        "stays within --slo-ttft-ms and median TPOT within --slo-tpot-ms, "
+        "using short probe runs (doubling, then bisection). Concurrency "
+        "probes send --sweep-prompts-multiplier x level prompts, rate probes "
+        "--search-probe-duration seconds' worth; each is preceded by a "
+        "--sweep-warmup-multiplier warm-up. Probes draw on one pool of "
+        "--num-prompts prompts. Use {iteration} (probe number) in "
+        "--result-filename to keep every probe's result.",
+    )
+    parser.add_argument(
+        "--search-range",
+        type=str,
+        default="1:4096",
+        help="LOW:HIGH load levels for --capacity-search.",
+    )
+    parser.add_argument(
+        "--search-tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Stop --capacity-search once the highest passing and lowest "
+        "failing level are within this relative distance.",
+    )
+    parser.add_argument(
+        "--search-probe-duration",
+        type=float,
+        default=60,
+        help="Length in seconds of the schedule of a request-rate probe.",
+    )
+    parser.add_argument(
+        "--search-num-gpus",
+        type=int,
+        default=1,
+        help="GPUs serving the model, to report capacity as output tokens/s "
+        "per GPU.",
+    )
+    parser.add_argument(
+        "--slo-ttft-ms",
+        type=float,
+        default=None,
+        help="P99 TTFT SLO in ms for --capacity-search.",
+    )
+    parser.add_argument(
+        "--slo-tpot-ms",
+        type=float,
+        default=None,
+        help="Median TPOT SLO in ms for --capacity-search.",
+    )
+    parser.add_argument(
+        "--capacity-search-file",
+        type=str,
+        default=None,
+        help="Write the SLOs, every probe and the capacity found to this JSON " "file.",
+    )
+    parser.add_argument(
+        "--soak-duration",
+        type=float,
+        default=None,
+        help="Repeat the benchmark in one process until this many seconds "
+        "have elapsed (a new iteration starts while time remains). Use "
+        "{iteration} in --result-filename / --live-metrics-file / "
+        "--token-timeline-file to get one file per iteration.",
+    )
+    parser.add_argument(
+        "--dataset-cache-dir",
+        type=str,
+        default=None,
+        help="Cache sampled 'random' and 'sharegpt' requests in this directory "
+        "and reuse them when the tokenizer, dataset, seed, lengths and "
+        "--num-prompts match a previous run.",
+    )
+    parser.add_argument(
+        "--steady-state",
+        action="store_true",
+        help="Also report throughput and latency for the steady-state window "
+        "only, excluding ramp-up and drain: the span in which the number of "
+        "in-flight requests is at least --steady-state-threshold times "
+        "--max-concurrency (or the observed peak without a concurrency "
+        "limit). The window and its metrics are saved under 'steady_state'.",
+    )
+    parser.add_argument(
+        "--steady-state-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fraction of the target concurrency that counts as steady state.",
+    )
 
     parser.add_argument(
         "--model",
@@ -1394,6 +2446,47 @@ if __name__ == "__main__":
         "from the sampled HF dataset.",
     )
 
+    multiturn_group = parser.add_argument_group("multiturn dataset options")
+    multiturn_group.add_argument(
+        "--multiturn-turns",
+        type=int,
+        default=4,
+        help="Turns per session; each turn's prompt is the whole conversation "
+        "so far plus a new user message.",
+    )
+    multiturn_group.add_argument(
+        "--multiturn-system-prompts",
+        type=int,
+        default=4,
+        help="Number of distinct system prompts shared between sessions.",
+    )
+    multiturn_group.add_argument(
+        "--multiturn-system-prompt-len",
+        type=int,
+        default=1024,
+        help="Number of tokens per system prompt.",
+    )
+    multiturn_group.add_argument(
+        "--multiturn-input-len",
+        type=int,
+        default=256,
+        help="Number of tokens per user message.",
+    )
+    multiturn_group.add_argument(
+        "--multiturn-output-len",
+        type=int,
+        default=256,
+        help="Number of output tokens per turn.",
+    )
+    multiturn_group.add_argument(
+        "--multiturn-think-time",
+        type=float,
+        default=0.0,
+        help="Mean pause in seconds (exponentially distributed) between a "
+        "response and the session's next turn. Sessions start on the "
+        "--request-rate / --burstiness schedule.",
+    )
+
     parser.add_argument(
         "--tokenizer-mode",
         type=str,
@@ -1425,4 +2518,39 @@ if __name__ == "__main__":
     )
 
     args = parser.parse_args()
+    if args.concurrency_sweep and args.soak_duration:
+        parser.error("--concurrency-sweep and --soak-duration are exclusive")
+    if args.capacity_search:
+        if args.concurrency_sweep or args.soak_duration:
+            parser.error("--capacity-search cannot be combined with a sweep or soak")
+        if args.slo_ttft_ms is None and args.slo_tpot_ms is None:
+            parser.error("--capacity-search needs --slo-ttft-ms or --slo-tpot-ms")
+        if args.dataset_name in ("trace", "multiturn"):
+            parser.error("--capacity-search sets its own load schedule")
+        try:
+            parse_search_range(args.search_range)
+        except ValueError as err:
+            parser.error(str(err))
+        if args.result_filename and "{iteration}" not in args.result_filename:
+            parser.error("--result-filename needs an {iteration} placeholder")
+    if args.dataset_name == "multiturn":
+        if args.concurrency_sweep or args.soak_duration:
+            parser.error("--dataset-name multiturn cannot be used in a sweep or soak")
+        if args.num_workers > 1:
+            parser.error("--dataset-name multiturn runs in a single process")
+    if args.dataset_name == "trace":
+        if args.dataset_path is None:
+            parser.error("--dataset-name trace needs --dataset-path")
+        if args.concurrency_sweep:
+            parser.error("--dataset-name trace cannot be used in a sweep")
+    if args.concurrency_sweep:
+        try:
+            parse_concurrency_sweep(args.concurrency_sweep)
+        except argparse.ArgumentTypeError as err:
+            parser.error(str(err))
+        if args.result_filename and "{concurrency}" not in args.result_filename:
+            parser.error("--result-filename needs a {concurrency} placeholder")
+    if args.soak_duration and args.result_filename:
+        if "{iteration}" not in args.result_filename:
+            parser.error("--result-filename needs an {iteration} placeholder")
     main(args)
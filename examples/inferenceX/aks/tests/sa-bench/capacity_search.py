@@ -0,0 +1,120 @@
+# pytest: skip-file
+"""Closed-loop capacity search under latency SLOs (--capacity-search).
+
+A concurrency sweep (bench.sh, conc-*.yaml) measures hand-picked levels and
+leaves reading off the largest one that still meets the latency targets to
+the reader. capacity_search() finds it with short probe runs instead: the
+load level (--max-concurrency or --request-rate) is doubled from the low end
+of the range until a probe misses an SLO, then the last passing and first
+failing levels are bisected geometrically until they are within the
+tolerance. A probe passes when every request succeeded, P99 TTFT is within
+--slo-ttft-ms and median TPOT within --slo-tpot-ms.
+
+This assumes latency grows with load, so one boundary separates passing and
+failing levels; throughput is then highest at the boundary, which is why a
+bisection rather than a golden-section search over throughput is used. The
+reported capacity is the passing probe with the highest output throughput.
+"""
+
+import math
+from collections.abc import Awaitable, Callable
+
+SEARCH_MODES = ["concurrency", "request-rate"]
+DEFAULT_TOLERANCE = 0.05
+
+
+def parse_search_range(value: str) -> tuple[float, float]:
+    """Parse "LOW:HIGH", e.g. "1:4096"."""
+    try:
+        low, high = (float(v) for v in value.split(":"))
+    except ValueError as err:
+        raise ValueError(
+            f"Invalid search range {value!r}; expected LOW:HIGH, e.g. 1:4096."
+        ) from err
+    if not 0 < low < high:
+        raise ValueError(f"Invalid search range {value!r}; need 0 < LOW < HIGH.")
+    return low, high
+
+
+def probe_summary(
+    level: float,
+    num_prompts: int,
+    result: dict,
+    num_gpus: int,
+    slo_ttft_ms: float | None,
+    slo_tpot_ms: float | None,
+) -> dict:
+    """The SLO verdict and headline numbers of one probe's benchmark() result."""
+    failed = num_prompts - result["completed"]
+    ttft = result.get("p99_ttft_ms")
+    tpot = result.get("median_tpot_ms")
+    meets_slo = (
+        failed == 0
+        and (slo_ttft_ms is None or ttft <= slo_ttft_ms)
+        and (slo_tpot_ms is None or tpot <= slo_tpot_ms)
+    )
+    return {
+        "level": level,
+        "num_prompts": num_prompts,
+        "completed": result["completed"],
+        "failed": failed,
+        "request_throughput": result["request_throughput"],
+        "output_throughput": result["output_throughput"],
+        "output_throughput_per_gpu": result["output_throughput"] / num_gpus,
+        "p99_ttft_ms": ttft,
+        "median_tpot_ms": tpot,
+        "meets_slo": meets_slo,
+    }
+
+
+def _converged(good: float, bad: float, tolerance: float, integer: bool) -> bool:
+    return bad / good <= 1 + tolerance or (integer and bad - good <= 1)
+
+
+def _midpoint(good: float, bad: float, integer: bool) -> float:
+    mid = math.sqrt(good * bad)
+    if integer:
+        return min(max(round(mid), good + 1), bad - 1)
+    return mid
+
+
+async def capacity_search(
+    probe: Callable[[float], Awaitable[dict]],
+    low: float,
+    high: float,
+    tolerance: float = DEFAULT_TOLERANCE,
+    integer: bool = True,
+) -> tuple[list[dict], dict | None]:
+    """Return every probe_summary() in the order run, and the best passing one.
+
+    probe(level) runs one probe and returns its probe_summary(). Levels are
+    whole numbers when integer is set (concurrency).
+    """
+    if integer:
+        low, high = math.ceil(low), math.floor(high)
+    probes: list[dict] = []
+
+    async def run(level: float) -> bool:
+        summary = await probe(level)
+        probes.append(summary)
+        return summary["meets_slo"]
+
+    if not await run(low):
+        return probes, None
+    good, bad = low, None
+    while bad is None and good < high:
+        level = min(good * 2, high)
+        if await run(level):
+            good = level
+        else:
+            bad = level
+    while bad is not None and not _converged(good, bad, tolerance, integer):
+        level = _midpoint(good, bad, integer)
+        if await run(level):
+            good = level
+        else:
+            bad = level
+    best = max(
+        (p for p in probes if p["meets_slo"]), key=lambda p: p["output_throughput"]
+    )
+    return probes, best
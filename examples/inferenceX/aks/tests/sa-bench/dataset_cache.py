@@ -0,0 +1,123 @@
+# pytest: skip-file
+"""On-disk cache of sampled benchmark requests (--dataset-cache-dir).
+
+Sampling 10k+ random 8k-token prompts (or tokenizing ShareGPT) takes minutes,
+and run-suite.sh / soak-loop.sh repeat it for every run with identical
+arguments. Sampled requests are stored per (tokenizer, dataset, seed, lengths,
+num_prompts) key in one uncompressed .npz: all prompts as a single UTF-8 blob
+plus offsets, prompt and output lengths. The Python and NumPy RNG states left
+behind by sampling are stored too and restored on a hit, so everything drawn
+afterwards (arrival intervals, LoRA choice) matches an uncached run.
+"""
+
+import hashlib
+import json
+import os
+import random
+import tempfile
+from collections.abc import Callable
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+def cache_key(**params) -> str:
+    """Stable key for the sampling parameters (file datasets: path, size, mtime)."""
+    path = params.get("dataset_path")
+    if path and os.path.isfile(path):
+        st = os.stat(path)
+        params["dataset_file"] = [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+    blob = json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+def _rng_state() -> dict[str, np.ndarray]:
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    version, py_state, gauss_next = random.getstate()
+    return {
+        "np_keys": keys,
+        "np_meta": np.array([pos, has_gauss, cached_gaussian], dtype=np.float64),
+        "py_state": np.array(py_state, dtype=np.uint64),
+        "py_meta": np.array(
+            [version, np.nan if gauss_next is None else gauss_next], dtype=np.float64
+        ),
+    }
+
+
+def _restore_rng_state(data) -> None:
+    pos, has_gauss, cached_gaussian = data["np_meta"]
+    np.random.set_state(
+        ("MT19937", data["np_keys"], int(pos), int(has_gauss), float(cached_gaussian))
+    )
+    version, gauss_next = data["py_meta"]
+    random.setstate(
+        (
+            int(version),
+            tuple(int(x) for x in data["py_state"]),
+            None if np.isnan(gauss_next) else float(gauss_next),
+        )
+    )
+
+
+def save_requests(path: str, requests: list[tuple]) -> None:
+    encoded = [r[0].encode("utf-8") for r in requests]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temp file and rename so concurrent runs never read a partial file.
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                prompts=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                offsets=offsets,
+                prompt_lens=np.array([r[1] for r in requests], dtype=np.int64),
+                output_lens=np.array([r[2] for r in requests], dtype=np.int64),
+                **_rng_state(),
+            )
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_requests(path: str) -> list[tuple[str, int, int, None]]:
+    with np.load(path) as data:
+        blob = data["prompts"].tobytes()
+        offsets = data["offsets"]
+        requests = [
+            (blob[offsets[i] : offsets[i + 1]].decode("utf-8"), int(p), int(o), None)
+            for i, (p, o) in enumerate(zip(data["prompt_lens"], data["output_lens"]))
+        ]
+        _restore_rng_state(data)
+    return requests
+
+
+def cached_requests(
+    cache_dir: str | None,
+    build: Callable[[], list[tuple]],
+    **params,
+) -> list[tuple]:
+    """Return build() output, reusing the cached copy for identical params.
+
+    Only text-only requests (no multi-modal content) can be cached.
+    """
+    if not cache_dir:
+        return build()
+    path = os.path.join(cache_dir, f"requests-{cache_key(**params)}.npz")
+    if os.path.exists(path):
+        try:
+            requests = load_requests(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable dataset cache {path}: {e}")
+        else:
+            print(f"Loaded {len(requests)} cached requests from {path}")
+            return requests
+    requests = build()
+    if all(r[3] is None for r in requests):
+        save_requests(path, requests)
+        print(f"Cached {len(requests)} requests in {path}")
+    return requests
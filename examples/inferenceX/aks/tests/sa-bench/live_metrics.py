@@ -0,0 +1,223 @@
+# pytest: skip-file
+"""Live windowed metrics for benchmark_serving.py (--live-metrics-*).
+
+The end-of-run summary hides warm-up, saturation and degradation inside a run.
+LiveMetrics keeps counters for the current window only and, every interval,
+emits one row with request throughput, output tok/s, in-flight count, TTFT /
+ITL percentiles and error rate: appended to a JSONL or CSV file (flushed per
+row) and optionally pushed to a Prometheus pushgateway. Rows carry UTC wall
+clock timestamps in the same format as run-test.sh's timings.txt, so they line
+up with the BENCH_START / BENCH_END markers used by collect-prom-stats.py.
+
+Latency and token counts are attributed to the window in which a request
+completes; use an interval of a few seconds when requests are long.
+"""
+
+import asyncio
+import csv
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+import numpy as np
+
+DEFAULT_INTERVAL_SECONDS = 1.0
+DEFAULT_PUSHGATEWAY_JOB = "sa-bench"
+PUSH_TIMEOUT = aiohttp.ClientTimeout(total=2)
+
+
+def _utc_timestamp(epoch: float) -> str:
+    # Same layout as timings.txt (date -u +%Y-%m-%dT%H:%M:%SZ) plus millis.
+    dt = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _percentile_name(p: float) -> str:
+    return str(int(p)) if int(p) == p else str(p).replace(".", "_")
+
+
+class LiveMetrics:
+    """Per-window request counters, written out every interval seconds.
+
+    started() / finished() may be called from any thread (sharded mode feeds
+    them from worker events); run() is the asyncio task that emits windows.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        percentiles: list[float] | None = None,
+        pushgateway_url: str | None = None,
+        job: str = DEFAULT_PUSHGATEWAY_JOB,
+    ):
+        if interval <= 0:
+            raise ValueError("live metrics interval must be positive")
+        self.interval = interval
+        self.percentiles = percentiles or [50.0, 99.0]
+        self.fields = [
+            "timestamp",
+            "epoch_s",
+            "elapsed_s",
+            "window_s",
+            "in_flight",
+            "started",
+            "completed",
+            "errors",
+            "error_rate",
+            "request_throughput",
+            "output_throughput",
+        ]
+        for metric in ("ttft", "itl"):
+            self.fields += [
+                f"p{_percentile_name(p)}_{metric}_ms" for p in self.percentiles
+            ]
+        self._path = path
+        self._file = None
+        self._writer = None
+        self._push_url = None
+        if pushgateway_url:
+            self._push_url = f"{pushgateway_url.rstrip('/')}/metrics/job/{job}"
+        # Own session so pushes never wait behind benchmark requests for a
+        # connection from the benchmark's pool.
+        self._session: aiohttp.ClientSession | None = None
+        self._push_failed = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._reset_window()
+        self._start = self._window_start = time.time()
+        self._stopped = asyncio.Event()
+
+    def _reset_window(self) -> None:
+        self._started = 0
+        self._completed = 0
+        self._errors = 0
+        self._output_tokens = 0
+        self._ttfts: list[float] = []
+        self._itls: list[float] = []
+
+    def started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._started += 1
+
+    def finished(
+        self,
+        success: bool,
+        ttft: float,
+        itl: list[float],
+        output_tokens: int | None,
+    ) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if not success:
+                self._errors += 1
+                return
+            self._completed += 1
+            # Without usage data each streamed chunk counts as one token.
+            self._output_tokens += (
+                output_tokens if output_tokens is not None else len(itl) + 1
+            )
+            self._ttfts.append(ttft)
+            self._itls.extend(itl)
+
+    def _snapshot(self, now: float) -> dict:
+        with self._lock:
+            window = max(now - self._window_start, 1e-9)
+            ttfts = np.asarray(self._ttfts) * 1000
+            itls = np.asarray(self._itls) * 1000
+            done = self._completed + self._errors
+            row = {
+                "timestamp": _utc_timestamp(now),
+                "epoch_s": round(now, 3),
+                "elapsed_s": round(now - self._start, 3),
+                "window_s": round(window, 3),
+                "in_flight": self._in_flight,
+                "started": self._started,
+                "completed": self._completed,
+                "errors": self._errors,
+                "error_rate": self._errors / done if done else 0.0,
+                "request_throughput": self._completed / window,
+                "output_throughput": self._output_tokens / window,
+            }
+            self._reset_window()
+            self._window_start = now
+        for metric, values in (("ttft", ttfts), ("itl", itls)):
+            pcts = (
+                np.percentile(values, self.percentiles)
+                if values.size
+                else [None] * len(self.percentiles)
+            )
+            for p, v in zip(self.percentiles, pcts):
+                row[f"p{_percentile_name(p)}_{metric}_ms"] = (
+                    None if v is None else float(v)
+                )
+        return row
+
+    def _write(self, row: dict) -> None:
+        if self._path is None:
+            return
+        if self._file is None:
+            self._file = open(self._path, "w", newline="")
+            if self._path.endswith(".csv"):
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+                self._writer.writeheader()
+        if self._writer is not None:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def _exposition(self, row: dict) -> str:
+        lines = []
+        for key in self.fields[4:]:
+            value = row[key]
+            if value is None:
+                continue
+            name = f"sa_bench_{key}"
+            lines.append(f"# TYPE {name} gauge\n{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def _push(self, row: dict) -> None:
+        if self._push_url is None:
+            return
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=PUSH_TIMEOUT)
+        try:
+            async with self._session.post(
+                self._push_url, data=self._exposition(row)
+            ) as response:
+                response.raise_for_status()
+        except Exception as e:
+            if not self._push_failed:
+                print(f"WARNING: pushgateway push to {self._push_url} failed: {e}")
+            self._push_failed = True
+
+    async def _emit(self) -> None:
+        row = self._snapshot(time.time())
+        self._write(row)
+        await self._push(row)
+
+    async def run(self) -> None:
+        """Emit one row per interval until stop() is called."""
+        self._start = self._window_start = time.time()
+        next_tick = self._start + self.interval
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), timeout=max(next_tick - time.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                await self._emit()
+                next_tick += self.interval
+
+    async def stop(self) -> None:
+        """Emit the final partial window and close the output file."""
+        self._stopped.set()
+        await self._emit()
+        if self._file is not None:
+            self._file.close()
+        if self._session is not None:
+            await self._session.close()
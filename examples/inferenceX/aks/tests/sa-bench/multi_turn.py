@@ -0,0 +1,195 @@
+# pytest: skip-file
+"""Multi-turn chat sessions with shared system prompts (--dataset-name multiturn).
+
+The other samplers produce independent single-turn requests, so the server's
+prefix cache only ever sees --random-prefix-len. Here each of --num-prompts
+sessions starts on the --request-rate / --burstiness arrival schedule, picks
+one of --multiturn-system-prompts shared system prompts, and runs
+--multiturn-turns turns: every turn appends a new user message to the
+conversation so far (system prompt, earlier user messages and the model's
+actual responses), waits for the response, then "thinks" for an exponentially
+distributed --multiturn-think-time before the next turn. A turn's prompt is
+therefore a prefix-cache hit on everything but its new user message, and
+TTFT by turn index (turn_metrics()) shows how well the KV cache holds
+growing conversations. A failed turn ends its session; the remaining turns
+are reported as failed.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import numpy as np
+from arrival_schedule import arrival_offsets, sleep_until
+from backend_request_func import RequestFuncOutput
+from transformers import PreTrainedTokenizerBase
+
+# send(index, (prompt, prompt_len, output_len, None), schedule_lag) returns the
+# turn's output and its generated text (kept even when outputs drop it).
+SendTurn = Callable[[int, tuple, float], Awaitable[tuple[RequestFuncOutput, str]]]
+
+
+@dataclass
+class Session:
+    # First turn's arrival time, seconds from the start of the run.
+    offset: float
+    system_prompt: str
+    user_messages: list[str]
+    # Pause before each turn after the first, seconds.
+    think_times: list[float]
+    output_len: int
+
+
+class MultiTurnWorkload:
+    """Sessions plus the prompt rendering they are sent with.
+
+    Output index session * num_turns + turn holds that session's turn.
+    """
+
+    def __init__(
+        self,
+        sessions: list[Session],
+        tokenizer: PreTrainedTokenizerBase,
+        use_chat_template: bool = False,
+    ):
+        self.sessions = sessions
+        self.num_turns = len(sessions[0].user_messages)
+        self.num_requests = len(sessions) * self.num_turns
+        self.offsets = np.array([s.offset for s in sessions])
+        self._tokenizer = tokenizer
+        self._use_chat_template = use_chat_template
+
+    def render(self, system_prompt: str, messages: list[dict]) -> tuple[str, int]:
+        """Prompt text and token count for a conversation ending in a user turn."""
+        if self._use_chat_template:
+            prompt = self._tokenizer.apply_chat_template(
+                [{"role": "system", "content": system_prompt}, *messages],
+                add_generation_prompt=True,
+                tokenize=False,
+            )
+        else:
+            # Append-only plain transcript, so every turn extends the last.
+            prompt = system_prompt + "".join(
+                f"\n\n{m['role'].capitalize()}: {m['content']}" for m in messages
+            )
+            prompt += "\n\nAssistant:"
+        prompt_len = len(self._tokenizer(prompt, add_special_tokens=False).input_ids)
+        return prompt, prompt_len
+
+    def first_request(self) -> tuple[str, int, int, None]:
+        session = self.sessions[0]
+        prompt, prompt_len = self.render(
+            session.system_prompt,
+            [{"role": "user", "content": session.user_messages[0]}],
+        )
+        return prompt, prompt_len, session.output_len, None
+
+    async def _run_session(
+        self, index: int, session: Session, send: SendTurn, start: float
+    ) -> list[RequestFuncOutput]:
+        outputs = []
+        messages: list[dict] = []
+        deadline = start + session.offset
+        for turn, user_message in enumerate(session.user_messages):
+            if turn:
+                deadline = time.perf_counter() + session.think_times[turn - 1]
+            await sleep_until(deadline)
+            schedule_lag = time.perf_counter() - deadline
+            messages.append({"role": "user", "content": user_message})
+            prompt, prompt_len = self.render(session.system_prompt, messages)
+            output, text = await send(
+                index * self.num_turns + turn,
+                (prompt, prompt_len, session.output_len, None),
+                schedule_lag,
+            )
+            outputs.append(output)
+            if not output.success:
+                break
+            messages.append({"role": "assistant", "content": text})
+        for _ in range(self.num_turns - len(outputs)):
+            outputs.append(RequestFuncOutput(error="Previous turn of session failed"))
+        return outputs
+
+    async def run(self, send: SendTurn, start: float) -> list[RequestFuncOutput]:
+        """Run every session; start is time zero on time.perf_counter()."""
+        per_session = await asyncio.gather(
+            *(
+                self._run_session(i, session, send, start)
+                for i, session in enumerate(self.sessions)
+            )
+        )
+        return [output for outputs in per_session for output in outputs]
+
+
+def sample_multi_turn_workload(
+    tokenizer: PreTrainedTokenizerBase,
+    num_sessions: int,
+    num_turns: int,
+    num_system_prompts: int,
+    system_prompt_len: int,
+    input_len: int,
+    output_len: int,
+    think_time: float,
+    request_rate: float,
+    burstiness: float,
+    use_chat_template: bool = False,
+) -> MultiTurnWorkload:
+    """Random-token system prompts and user messages of the given lengths."""
+    if num_turns < 1 or num_system_prompts < 1:
+        raise ValueError("multi-turn sessions need at least one turn and prompt")
+
+    def random_texts(count: int, length: int) -> list[str]:
+        ids = np.random.randint(0, tokenizer.vocab_size, size=(count, length))
+        return tokenizer.batch_decode(ids.tolist())
+
+    system_prompts = random_texts(num_system_prompts, system_prompt_len)
+    user_messages = random_texts(num_sessions * num_turns, input_len)
+    choices = np.random.randint(0, num_system_prompts, size=num_sessions)
+    offsets = arrival_offsets(num_sessions, request_rate, burstiness)
+    think_times = (
+        np.random.exponential(think_time, size=(num_sessions, num_turns - 1))
+        if think_time > 0
+        else np.zeros((num_sessions, num_turns - 1))
+    )
+    sessions = [
+        Session(
+            offset=float(offsets[i]),
+            system_prompt=system_prompts[choices[i]],
+            user_messages=user_messages[i * num_turns : (i + 1) * num_turns],
+            think_times=think_times[i].tolist(),
+            output_len=output_len,
+        )
+        for i in range(num_sessions)
+    ]
+    return MultiTurnWorkload(sessions, tokenizer, use_chat_template)
+
+
+def turn_metrics(
+    outputs: list[RequestFuncOutput],
+    num_turns: int,
+    selected_percentiles: list[float],
+) -> list[dict]:
+    """TTFT and prompt length per turn index, over successful turns."""
+    success = np.array([o.success for o in outputs], dtype=bool)
+    ttfts = np.array([o.ttft for o in outputs]) * 1000
+    prompt_lens = np.array([o.prompt_len for o in outputs])
+    turns = np.arange(len(outputs)) % num_turns
+    result = []
+    for turn in range(num_turns):
+        ok = success & (turns == turn)
+        values = ttfts[ok] if ok.any() else np.zeros(1)
+        row = {
+            "turn": turn,
+            "completed": int(ok.sum()),
+            "mean_prompt_len": float(prompt_lens[ok].mean()) if ok.any() else 0.0,
+            "mean_ttft_ms": float(values.mean()),
+            "median_ttft_ms": float(np.median(values)),
+        }
+        for p, v in zip(
+            selected_percentiles, np.percentile(values, selected_percentiles)
+        ):
+            p_word = str(int(p)) if int(p) == p else str(p)
+            row[f"p{p_word}_ttft_ms"] = float(v)
+        result.append(row)
+    return result
@@ -0,0 +1,103 @@
+# pytest: skip-file
+"""Server-side phase timings for disaggregated serving (--phase-timing).
+
+Client TTFT at high concurrency lumps together frontend routing, prefill
+queueing, prefill itself, the KV transfer to the decode worker and the first
+decode step. With --phase-timing the Dynamo completions handler tags every
+request with an x-request-id header (so it can be found in the frontend and
+worker logs) and collects whatever per-phase timings the server returns:
+
+    Server-Timing response header   prefill;dur=41.2, kv_transfer;dur=3.5
+    "timing" object in a chunk      {"nvext": {"timing": {"queue_ms": 12.0}}}
+                                    or a top-level / usage "timing" object
+
+Header durations are milliseconds (per the Server-Timing spec); chunk fields
+are taken as milliseconds unless named *_s / *_seconds / *_us / *_ns, and
+the unit suffix is dropped from the phase name. Names are kept as the server
+sends them, so the breakdown follows whatever the deployment exposes.
+phase_metrics() aggregates them per phase next to TTFT and TPOT.
+"""
+
+import numpy as np
+
+# backend_request_func imports this module, so RequestFuncOutput is not
+# imported here.
+
+REQUEST_ID_HEADER = "x-request-id"
+SERVER_TIMING_HEADER = "server-timing"
+
+# Phase field suffix -> factor to milliseconds.
+_UNIT_SUFFIXES = {
+    "_ms": 1.0,
+    "_seconds": 1000.0,
+    "_s": 1000.0,
+    "_us": 1e-3,
+    "_ns": 1e-6,
+}
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Phase durations (ms) from a Server-Timing header value."""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        for param in params:
+            key, _, value = param.partition("=")
+            if name and key.strip().lower() == "dur":
+                try:
+                    timings[name] = float(value.strip('"'))
+                except ValueError:
+                    pass
+    return timings
+
+
+def chunk_timings(chunk: dict) -> dict[str, float]:
+    """Phase durations (ms) from a decoded stream chunk, if it has any."""
+    timing = None
+    for holder in (chunk.get("nvext"), chunk.get("usage"), chunk):
+        if isinstance(holder, dict) and isinstance(holder.get("timing"), dict):
+            timing = holder["timing"]
+            break
+    if timing is None:
+        return {}
+    timings = {}
+    for name, value in timing.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        factor = 1.0
+        for suffix, suffix_factor in _UNIT_SUFFIXES.items():
+            if name.endswith(suffix):
+                name, factor = name[: -len(suffix)], suffix_factor
+                break
+        timings[name] = value * factor
+    return timings
+
+
+def phase_metrics(outputs: list, selected_percentiles: list[float]) -> dict[str, dict]:
+    """Per phase over RequestFuncOutputs: count and mean / median / pXX ms.
+
+    Only successful requests count. Client TTFT is included as "client_ttft"
+    so the phases can be read against it.
+    """
+    samples: dict[str, list[float]] = {}
+    for output in outputs:
+        if not output.success or not output.server_timings:
+            continue
+        samples.setdefault("client_ttft", []).append(output.ttft * 1000)
+        for name, value in output.server_timings.items():
+            samples.setdefault(name, []).append(value)
+    result = {}
+    for name, values in samples.items():
+        values = np.asarray(values)
+        row = {
+            "count": int(values.size),
+            "mean_ms": float(values.mean()),
+            "median_ms": float(np.median(values)),
+        }
+        for p, v in zip(
+            selected_percentiles, np.percentile(values, selected_percentiles)
+        ):
+            p_word = str(int(p)) if int(p) == p else str(p)
+            row[f"p{p_word}_ms"] = float(v)
+        result[name] = row
+    return result
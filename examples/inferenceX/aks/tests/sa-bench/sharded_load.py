@@ -0,0 +1,327 @@
+# pytest: skip-file
+"""Multi-process load generation for benchmark_serving.py (--num-workers).
+
+A single asyncio loop saturates one core at concurrency in the thousands
+(SSE parsing is a json.loads per chunk), after which measured ITL reflects
+client stalls rather than server behaviour. Sharded mode computes the whole
+arrival schedule up front in the parent, as the single-process loop does, and
+deals requests to N worker processes in proportion to their --max-concurrency
+slots, which differ by one when the limit does not divide evenly, so no
+worker's queue backs up behind a smaller semaphore. Each worker has its own
+event loop and connection pool, waits for a shared start time and sends every
+request at its scheduled offset, so the aggregate arrival process still
+follows --request-rate / --burstiness. Outputs are merged back in input order.
+"""
+
+import asyncio
+import multiprocessing as mp
+import queue
+import threading
+import time
+from array import array
+from typing import Any
+
+import numpy as np
+from arrival_schedule import arrival_offsets, sleep_until
+from backend_request_func import (
+    ASYNC_REQUEST_FUNCS,
+    RequestFuncInput,
+    RequestFuncOutput,
+    create_client_session,
+)
+from live_metrics import LiveMetrics
+from streaming_metrics import LatencyHistogram
+
+# Seconds between the go signal and the first request; lets every worker
+# leave its wait before the schedule starts.
+START_LEAD_SECONDS = 0.5
+# Seconds to wait for workers to import and open their sessions.
+READY_TIMEOUT_SECONDS = 300
+
+
+def split_evenly(total: int, parts: int) -> list[int]:
+    """Split total into parts that differ by at most one (0 stays unlimited).
+
+    Every part gets at least 1 so a small limit never turns into 0 (unlimited).
+    """
+    if not total:
+        return [0] * parts
+    base, extra = divmod(total, parts)
+    return [max(1, base + (1 if i < extra else 0)) for i in range(parts)]
+
+
+def deal_order(weights: list[int]) -> list[int]:
+    """One dealing cycle: worker w appears weights[w] times, spread evenly.
+
+    Request i goes to worker deal_order(...)[i % sum(weights)], so each worker
+    receives requests in proportion to its weight, interleaved over time.
+    """
+    slots = sorted(
+        ((k + 0.5) / weight, worker)
+        for worker, weight in enumerate(weights)
+        for k in range(weight)
+    )
+    return [worker for _, worker in slots]
+
+
+async def _run_shard(
+    backend: str,
+    shard: list[tuple[int, float, RequestFuncInput]],
+    max_concurrency: int,
+    session_kwargs: dict[str, Any],
+    ready: Any,
+    go: Any,
+    start_at: Any,
+    itl_histogram: LatencyHistogram | None,
+    events: Any,
+) -> list[tuple[int, RequestFuncOutput]]:
+    request_func = ASYNC_REQUEST_FUNCS[backend]
+    session = create_client_session(**session_kwargs)
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def send_now(request_func_input):
+        if events is not None:
+            events.put(("started",))
+        # perf_counter is CLOCK_MONOTONIC on Linux, shared by all processes,
+        # so these are comparable with the parent's benchmark start time.
+        start_time = time.perf_counter()
+        output = await request_func(
+            request_func_input=request_func_input, session=session
+        )
+        output.start_time, output.end_time = start_time, time.perf_counter()
+        if events is not None:
+            events.put(
+                (
+                    "finished",
+                    output.success,
+                    output.ttft,
+                    output.itl,
+                    output.output_tokens,
+                )
+            )
+        return output
+
+    async def send(index, offset, request_func_input):
+        deadline = start_at.value + offset
+        await sleep_until(deadline, time.monotonic)
+        schedule_lag = time.monotonic() - deadline
+        if semaphore is None:
+            output = await send_now(request_func_input)
+        else:
+            async with semaphore:
+                output = await send_now(request_func_input)
+        output.schedule_lag = schedule_lag
+        if itl_histogram is not None:
+            # Fold ITLs in per worker instead of shipping the lists back; only
+            # successful requests count, as in OnlineMetrics.record().
+            if output.success:
+                itl_histogram.add_many(output.itl)
+            output.itl = array("d")
+        return index, output
+
+    try:
+        await asyncio.to_thread(ready.wait, READY_TIMEOUT_SECONDS)
+        await asyncio.to_thread(go.wait)
+        return await asyncio.gather(*(send(*item) for item in shard))
+    finally:
+        await session.close()
+
+
+def _worker_main(
+    worker_id,
+    backend,
+    shard,
+    max_concurrency,
+    session_kwargs,
+    ready,
+    go,
+    start_at,
+    results,
+    compact_itl,
+    events,
+):
+    itl_histogram = LatencyHistogram() if compact_itl else None
+    try:
+        outputs = asyncio.run(
+            _run_shard(
+                backend,
+                shard,
+                max_concurrency,
+                session_kwargs,
+                ready,
+                go,
+                start_at,
+                itl_histogram,
+                events,
+            )
+        )
+    except BaseException as e:
+        ready.abort()
+        results.put((worker_id, None, None, f"{type(e).__name__}: {e}"))
+        raise
+    results.put((worker_id, outputs, itl_histogram, None))
+
+
+def _collect(
+    results, procs, pbar, itl_histogram
+) -> list[tuple[int, RequestFuncOutput]]:
+    merged: list[tuple[int, RequestFuncOutput]] = []
+    pending = len(procs)
+    while pending:
+        try:
+            worker_id, outputs, histogram, error = results.get(timeout=1.0)
+        except queue.Empty:
+            dead = [p.name for p in procs if p.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"load generator worker(s) died: {', '.join(dead)}")
+            continue
+        if error is not None:
+            raise RuntimeError(f"load generator worker {worker_id} failed: {error}")
+        merged.extend(outputs)
+        if itl_histogram is not None:
+            itl_histogram.merge(histogram)
+        if pbar is not None:
+            pbar.update(len(outputs))
+        pending -= 1
+    return merged
+
+
+def _forward_events(events, live_metrics: LiveMetrics) -> None:
+    while (event := events.get()) is not None:
+        if event[0] == "started":
+            live_metrics.started()
+        else:
+            live_metrics.finished(*event[1:])
+
+
+def _run_workers(
+    backend,
+    shards,
+    concurrencies,
+    session_kwargs,
+    pbar,
+    itl_histogram,
+    live_metrics,
+) -> tuple[list[tuple[int, RequestFuncOutput]], float]:
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(len(shards) + 1)
+    go = ctx.Event()
+    start_at = ctx.Value("d", 0.0)
+    results = ctx.Queue()
+    events = ctx.Queue() if live_metrics is not None else None
+    forwarder = None
+    if events is not None:
+        forwarder = threading.Thread(
+            target=_forward_events, args=(events, live_metrics), daemon=True
+        )
+        forwarder.start()
+    procs = [
+        ctx.Process(
+            target=_worker_main,
+            name=f"sa-bench-worker-{i}",
+            args=(
+                i,
+                backend,
+                shard,
+                concurrencies[i],
+                session_kwargs[i],
+                ready,
+                go,
+                start_at,
+                results,
+                itl_histogram is not None,
+                events,
+            ),
+            daemon=True,
+        )
+        for i, shard in enumerate(shards)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        ready.wait(READY_TIMEOUT_SECONDS)
+        start_at.value = time.monotonic() + START_LEAD_SECONDS
+        go.set()
+        merged = _collect(results, procs, pbar, itl_histogram)
+    except BaseException:
+        for p in procs:
+            p.terminate()
+        raise
+    finally:
+        for p in procs:
+            p.join(timeout=10)
+        # Workers flush their queued events on exit; stop forwarding after.
+        if forwarder is not None:
+            events.put(None)
+            forwarder.join(timeout=10)
+    return merged, start_at.value
+
+
+async def run_sharded(
+    backend: str,
+    request_inputs: list[RequestFuncInput],
+    request_rate: float,
+    burstiness: float,
+    num_workers: int,
+    max_concurrency: int | None,
+    connection_pool_size: int,
+    keepalive_timeout: float,
+    dns_cache_ttl: int,
+    pbar=None,
+    itl_histogram: LatencyHistogram | None = None,
+    live_metrics: LiveMetrics | None = None,
+    offsets: np.ndarray | None = None,
+) -> tuple[list[RequestFuncOutput], float]:
+    """Run the benchmark requests across num_workers processes.
+
+    max_concurrency and connection_pool_size are split evenly across workers,
+    and requests are dealt in proportion to each worker's concurrency slots.
+    With itl_histogram, workers aggregate ITLs into their own histograms, which
+    are merged into it, and return outputs with empty itl lists. With
+    live_metrics, workers report request start / completion events to it.
+    offsets (seconds from start, e.g. a replayed trace) replace the
+    request_rate / burstiness arrival process.
+    Returns the outputs in request order and the schedule start time on the
+    time.perf_counter() clock.
+    """
+    if backend not in ASYNC_REQUEST_FUNCS:
+        raise ValueError(f"Unknown backend: {backend}")
+    num_workers = max(1, min(num_workers, len(request_inputs)))
+    if max_concurrency:
+        # Each worker needs at least one concurrency slot.
+        num_workers = min(num_workers, max_concurrency)
+    if offsets is None:
+        offsets = arrival_offsets(len(request_inputs), request_rate, burstiness)
+    concurrencies = split_evenly(max_concurrency or 0, num_workers)
+    # Without a concurrency limit every worker takes an equal share.
+    order = deal_order(concurrencies if max_concurrency else [1] * num_workers)
+    shards: list[list[tuple[int, float, RequestFuncInput]]] = [
+        [] for _ in range(num_workers)
+    ]
+    for i, request_func_input in enumerate(request_inputs):
+        shards[order[i % len(order)]].append((i, float(offsets[i]), request_func_input))
+
+    session_kwargs = [
+        {
+            "pool_size": pool_size,
+            "keepalive_timeout": keepalive_timeout,
+            "dns_cache_ttl": dns_cache_ttl,
+        }
+        for pool_size in split_evenly(connection_pool_size, num_workers)
+    ]
+    merged, start_monotonic = await asyncio.to_thread(
+        _run_workers,
+        backend,
+        shards,
+        concurrencies,
+        session_kwargs,
+        pbar,
+        itl_histogram,
+        live_metrics,
+    )
+    start_perf = time.perf_counter() - (time.monotonic() - start_monotonic)
+
+    outputs: list[RequestFuncOutput] = [None] * len(request_inputs)
+    for index, output in merged:
+        outputs[index] = output
+    return outputs, start_perf
@@ -0,0 +1,174 @@
+# pytest: skip-file
+"""CPU microbenchmark: upstream SSE parsing vs sse_parser.parse_sse_line().
+
+Replays SSE streams through both parsers exactly as the request handlers see
+them (one line per aiohttp iteration, stripped, blank lines skipped) and
+reports CPU time per line. Streams are either recorded response bodies, e.g.
+
+    curl -sN http://localhost:8000/v1/completions -H 'Content-Type: application/json' \\
+        -d '{"model": "...", "prompt": "...", "max_tokens": 1024, "stream": true,
+             "stream_options": {"include_usage": true}}' > stream.sse
+    python3 sse_microbench.py --streams stream.sse
+
+or, without --streams, synthetic vLLM/Dynamo-shaped streams. Both parsers must
+produce the same text and completion token count, otherwise the run aborts.
+"""
+
+import argparse
+import json
+import random
+import string
+import time
+
+from sse_parser import JSON_BACKEND, parse_sse_line
+
+
+def synthetic_stream(num_tokens: int, chat: bool, rng: random.Random) -> list[bytes]:
+    """One response body as the lines aiohttp yields, usage chunk last."""
+    alphabet = string.ascii_letters + ' \n"\\éü—'
+    lines = []
+    for i in range(num_tokens):
+        piece = "".join(rng.choices(alphabet, k=rng.randint(1, 6)))
+        if chat:
+            choice = {
+                "index": 0,
+                "delta": {"role": "assistant", "content": piece}
+                if i == 0
+                else {"content": piece},
+                "logprobs": None,
+                "finish_reason": None,
+            }
+        else:
+            choice = {
+                "index": 0,
+                "text": piece,
+                "logprobs": None,
+                "finish_reason": None,
+                "stop_reason": None,
+            }
+        chunk = {
+            "id": "cmpl-0f6c3b2f8e6d4c0a9b1e2d3c4b5a6978",
+            "object": "chat.completion.chunk" if chat else "text_completion",
+            "created": 1767225600,
+            "model": "deepseek-r1-0528-fp4-v2",
+            "choices": [choice],
+            "usage": None,
+        }
+        lines += [f"data: {json.dumps(chunk)}\n".encode(), b"\n"]
+    usage = {
+        "id": "cmpl-0f6c3b2f8e6d4c0a9b1e2d3c4b5a6978",
+        "object": "chat.completion.chunk" if chat else "text_completion",
+        "created": 1767225600,
+        "model": "deepseek-r1-0528-fp4-v2",
+        "choices": [],
+        "usage": {
+            "prompt_tokens": 8192,
+            "completion_tokens": num_tokens,
+            "total_tokens": 8192 + num_tokens,
+        },
+    }
+    lines += [f"data: {json.dumps(usage)}\n".encode(), b"\n", b"data: [DONE]\n", b"\n"]
+    return lines
+
+
+def upstream_parse(lines: list[bytes], chat: bool) -> tuple[str, int | None]:
+    """The decode / json.loads / += loop of the upstream handlers."""
+    generated_text = ""
+    output_tokens = None
+    for chunk_bytes in lines:
+        chunk_bytes = chunk_bytes.strip()
+        if not chunk_bytes:
+            continue
+        chunk = chunk_bytes.decode("utf-8")
+        if chunk.startswith("event:") or chunk.startswith(":"):
+            continue
+        chunk = chunk.removeprefix("data: ")
+        if chunk != "[DONE]":
+            data = json.loads(chunk)
+            if choices := data.get("choices"):
+                if chat:
+                    generated_text += choices[0]["delta"].get("content") or ""
+                else:
+                    generated_text += choices[0].get("text") or ""
+            elif usage := data.get("usage"):
+                output_tokens = usage.get("completion_tokens")
+    return generated_text, output_tokens
+
+
+def fast_parse(lines: list[bytes], chat: bool) -> tuple[str, int | None]:
+    """The parse_sse_line() loop of the current handlers."""
+    text_parts: list[str] = []
+    output_tokens = None
+    for chunk_bytes in lines:
+        chunk_bytes = chunk_bytes.strip()
+        if not chunk_bytes:
+            continue
+        parsed = parse_sse_line(chunk_bytes, chat=chat)
+        if parsed is not None:
+            has_choice, text, completion_tokens = parsed
+            if has_choice:
+                if text:
+                    text_parts.append(text)
+            elif completion_tokens is not None:
+                output_tokens = completion_tokens
+    return "".join(text_parts), output_tokens
+
+
+def cpu_time(parse, streams: list[list[bytes]], chat: bool, repeat: int) -> float:
+    """Best-of-repeat process CPU seconds to parse every stream once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        for lines in streams:
+            parse(lines, chat)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.streams:
+        streams = []
+        for path in args.streams:
+            with open(path, "rb") as f:
+                streams.append(f.read().splitlines(keepends=True))
+    else:
+        rng = random.Random(args.seed)
+        streams = [
+            synthetic_stream(args.tokens, args.chat, rng)
+            for _ in range(args.num_streams)
+        ]
+
+    for lines in streams:
+        expected = upstream_parse(lines, args.chat)
+        actual = fast_parse(lines, args.chat)
+        if expected != actual:
+            raise SystemExit("parsers disagree on text or completion_tokens")
+
+    num_lines = sum(len(lines) for lines in streams)
+    upstream = cpu_time(upstream_parse, streams, args.chat, args.repeat)
+    fast = cpu_time(fast_parse, streams, args.chat, args.repeat)
+    print(f"Streams: {len(streams)}  lines: {num_lines}  JSON backend: {JSON_BACKEND}")
+    print(f"{'Parser':<10} {'CPU s':>10} {'us/line':>10}")
+    for name, seconds in (("upstream", upstream), ("sse_parser", fast)):
+        print(f"{name:<10} {seconds:>10.4f} {seconds / num_lines * 1e6:>10.3f}")
+    print(f"CPU reduction: {1 - fast / upstream:.1%} ({upstream / fast:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--streams",
+        nargs="+",
+        help="Recorded SSE response bodies (one stream per file). "
+        "Default: synthetic streams.",
+    )
+    parser.add_argument(
+        "--chat",
+        action="store_true",
+        help="Streams are chat completions (delta.content) instead of completions.",
+    )
+    parser.add_argument("--num-streams", type=int, default=64)
+    parser.add_argument("--tokens", type=int, default=1024, help="Tokens per stream.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,115 @@
+# pytest: skip-file
+"""Bytes-level parser for OpenAI-style SSE streams.
+
+Upstream decodes every streamed line to str, strips the ``data: `` prefix,
+builds a full dict with json.loads and appends to the generated text with
+``+=``; at thousands of concurrent streams that parsing is most of the client's
+CPU. parse_sse_line() works on the raw bytes from aiohttp and decodes only the
+fields the benchmark uses (first choice's text / delta content and
+usage.completion_tokens) with the fastest decoder installed: msgspec (typed
+decode that skips every other field), else orjson, else the standard library.
+Callers collect text pieces in a list and join once at the end.
+
+sse_microbench.py compares this against the upstream parsing on recorded or
+synthetic streams.
+"""
+
+import json
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# (has_choice, text, completion_tokens) for one data line.
+ParsedChunk = tuple[bool, str | None, int | None]
+
+# Untyped decode of a whole JSON payload, for the rare full-chunk reads.
+if msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    loads = msgspec.json.decode
+elif orjson is not None:
+    JSON_BACKEND = "orjson"
+    loads = orjson.loads
+else:
+    JSON_BACKEND = "json"
+    _raw_decode = json.JSONDecoder().raw_decode
+
+    def loads(payload: bytes):
+        # json.loads(bytes) sniffs the encoding first; SSE is always UTF-8.
+        return _raw_decode(payload.decode("utf-8"))[0]
+
+
+if msgspec is not None:
+
+    class _Delta(msgspec.Struct):
+        content: str | None = None
+
+    class _Choice(msgspec.Struct):
+        text: str | None = None
+        delta: _Delta | None = None
+
+    class _Usage(msgspec.Struct):
+        completion_tokens: int | None = None
+
+    class _Chunk(msgspec.Struct):
+        choices: list[_Choice] | None = None
+        usage: _Usage | None = None
+
+    _decode_chunk = msgspec.json.Decoder(_Chunk).decode
+
+    def _parse_payload(payload: bytes, chat: bool) -> ParsedChunk:
+        chunk = _decode_chunk(payload)
+        tokens = chunk.usage.completion_tokens if chunk.usage else None
+        if not chunk.choices:
+            return False, None, tokens
+        choice = chunk.choices[0]
+        if chat:
+            return True, choice.delta.content if choice.delta else None, tokens
+        return True, choice.text, tokens
+
+else:
+
+    def _parse_payload(payload: bytes, chat: bool) -> ParsedChunk:
+        data = loads(payload)
+        usage = data.get("usage")
+        tokens = usage.get("completion_tokens") if usage else None
+        if not (choices := data.get("choices")):
+            return False, None, tokens
+        choice = choices[0]
+        if chat:
+            return True, (choice.get("delta") or {}).get("content"), tokens
+        return True, choice.get("text"), tokens
+
+
+def sse_payload(line: bytes) -> bytes | None:
+    """The JSON payload of a stripped data line, None for any other line."""
+    if not line or line.startswith((b":", b"event:")):
+        return None
+    if line.startswith(b"data:"):
+        line = line[5:].lstrip()
+    if line == b"[DONE]":
+        return None
+    return line
+
+
+def parse_sse_line(line: bytes, chat: bool = False) -> ParsedChunk | None:
+    """Parse one stripped line of a completions (or chat completions) stream.
+
+    Returns None for blank, comment, ``event:`` and ``[DONE]`` lines, otherwise
+    (has_choice, text, completion_tokens); has_choice is False for a trailing
+    usage-only chunk, and completion_tokens is None when the chunk has no usage.
+    """
+    # sse_payload() inlined: this runs once per streamed token.
+    if not line or line.startswith((b":", b"event:")):
+        return None
+    if line.startswith(b"data:"):
+        line = line[5:].lstrip()
+    if line == b"[DONE]":
+        return None
+    return _parse_payload(line, chat)
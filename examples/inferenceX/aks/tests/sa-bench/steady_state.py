@@ -0,0 +1,122 @@
+# pytest: skip-file
+"""Steady-state window detection for benchmark_serving.py (--steady-state).
+
+Whole-run throughput (completed / duration) includes the ramp-up, where the
+in-flight count climbs towards --max-concurrency, and the drain tail, where it
+falls off as the last requests finish; both understate sustained throughput at
+high concurrency. From each request's send / completion time this module
+rebuilds the in-flight count over the run, takes the steady state to be the
+span from the first to the last moment it is at least threshold * target
+(target = --max-concurrency, else the observed peak), and recomputes
+throughput and latency for that window only.
+"""
+
+import numpy as np
+from backend_request_func import RequestFuncOutput
+
+DEFAULT_THRESHOLD = 0.9
+
+
+def in_flight_profile(
+    starts: np.ndarray, ends: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Event times and the in-flight count right after each event."""
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts)), -np.ones(len(ends))])
+    # At equal times apply completions first, so a hand-off between two
+    # requests is not counted as one extra in flight.
+    order = np.lexsort((deltas, times))
+    return times[order], np.cumsum(deltas[order]).astype(np.int64)
+
+
+def detect_steady_state(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    target: int | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> tuple[float, float, int] | None:
+    """Return (window start, window end, target concurrency) or None.
+
+    The window runs from the first time the in-flight count reaches
+    threshold * target to the event that takes it below that level for the
+    last time.
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError("steady-state threshold must be in (0, 1]")
+    if not len(starts):
+        return None
+    times, in_flight = in_flight_profile(starts, ends)
+    target = int(target or in_flight.max())
+    above = np.flatnonzero(in_flight >= threshold * target)
+    if not above.size:
+        return None
+    first, last = above[0], above[-1]
+    if last + 1 >= len(times):
+        return None
+    t0, t1 = float(times[first]), float(times[last + 1])
+    if t1 <= t0:
+        return None
+    return t0, t1, target
+
+
+def steady_state_metrics(
+    outputs: list[RequestFuncOutput],
+    output_lens: list[int],
+    benchmark_start_time: float,
+    max_concurrency: int | None,
+    selected_percentiles: list[float],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> dict | None:
+    """Throughput and latency of the steady-state window, or None if none.
+
+    Throughput counts requests completing inside the window; latency uses the
+    requests that were both sent and completed inside it. Window bounds are
+    seconds from benchmark start.
+    """
+    starts = np.array([o.start_time for o in outputs])
+    ends = np.array([o.end_time for o in outputs])
+    window = detect_steady_state(starts, ends, max_concurrency, threshold)
+    if window is None:
+        return None
+    t0, t1, target = window
+    duration = t1 - t0
+    success = np.array([o.success for o in outputs], dtype=bool)
+    output_lens = np.asarray(output_lens)
+    prompt_lens = np.array([o.prompt_len for o in outputs])
+    ttfts = np.array([o.ttft for o in outputs])
+    latencies = np.array([o.latency for o in outputs])
+
+    completed_in = success & (ends >= t0) & (ends <= t1)
+    inside = completed_in & (starts >= t0)
+    multi_token = inside & (output_lens > 1)
+    tpots = (latencies - ttfts)[multi_token] / (output_lens[multi_token] - 1)
+
+    completed = int(completed_in.sum())
+    total_output = int(output_lens[completed_in].sum())
+    total_input = int(prompt_lens[completed_in].sum())
+    result = {
+        "start_s": t0 - benchmark_start_time,
+        "end_s": t1 - benchmark_start_time,
+        "duration_s": duration,
+        "threshold": threshold,
+        "target_concurrency": target,
+        "completed": completed,
+        "latency_requests": int(inside.sum()),
+        "request_throughput": completed / duration,
+        "output_throughput": total_output / duration,
+        "total_token_throughput": (total_input + total_output) / duration,
+    }
+    for name, values in (
+        ("ttft", ttfts[inside]),
+        ("tpot", tpots),
+        ("e2el", latencies[inside]),
+    ):
+        values = values * 1000 if values.size else np.zeros(1)
+        result[f"mean_{name}_ms"] = float(np.mean(values))
+        result[f"median_{name}_ms"] = float(np.median(values))
+        for p, v in zip(
+            selected_percentiles, np.percentile(values, selected_percentiles)
+        ):
+            p_word = str(int(p)) if int(p) == p else str(p)
+            result[f"p{p_word}_{name}_ms"] = float(v)
+    return result
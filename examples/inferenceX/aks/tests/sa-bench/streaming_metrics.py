@@ -0,0 +1,145 @@
+# pytest: skip-file
+"""Constant-memory metric aggregation for benchmark_serving.py (--streaming-metrics).
+
+calculate_metrics() keeps every inter-token latency of the run in one Python
+list and sorts it for np.percentile; a long soak produces millions of them.
+In streaming mode each request is folded in as soon as it completes: per-request
+scalars go into NumPy arrays preallocated for the run, ITLs into a mergeable
+log-bucketed histogram (HDR-histogram style) whose size does not depend on the
+number of samples, and the request's ITL list (and, with --no-store-text, its
+generated text) is released immediately.
+"""
+
+import math
+from array import array
+from collections.abc import Callable
+
+import numpy as np
+from backend_request_func import RequestFuncOutput
+
+# Relative error of a histogram percentile, e.g. 0.005 = within 0.5%.
+DEFAULT_RELATIVE_ERROR = 0.005
+# Latency range the histogram resolves (seconds); values outside are clamped.
+DEFAULT_MIN_LATENCY = 1e-6
+DEFAULT_MAX_LATENCY = 3600.0
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with bounded relative error.
+
+    Bucket i >= 1 covers [min_value * r**(i-1), min_value * r**i) with
+    r = 1 + 2 * relative_error, so reporting the bucket's geometric midpoint is
+    within relative_error of any value in it. Bucket 0 holds values below
+    min_value. Mean and std are exact (running sums); percentiles are clamped to
+    the exact observed min / max. Histograms with the same layout merge by
+    adding counts, so per-worker histograms combine into the run's histogram.
+    """
+
+    def __init__(
+        self,
+        relative_error: float = DEFAULT_RELATIVE_ERROR,
+        min_value: float = DEFAULT_MIN_LATENCY,
+        max_value: float = DEFAULT_MAX_LATENCY,
+    ):
+        self.layout = (relative_error, min_value, max_value)
+        self._log_min = math.log(min_value)
+        self._log_ratio = math.log1p(2 * relative_error)
+        log_span = math.log(max_value) - self._log_min
+        num_buckets = int(math.ceil(log_span / self._log_ratio)) + 2
+        self.counts = np.zeros(num_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        min_value = self.layout[1]
+        idx = (
+            np.floor(
+                (np.log(np.maximum(values, min_value)) - self._log_min)
+                / self._log_ratio
+            ).astype(np.int64)
+            + 1
+        )
+        idx[values < min_value] = 0
+        np.clip(idx, 0, len(self.counts) - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.count += values.size
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.layout != self.layout:
+            raise ValueError("cannot merge histograms with different layouts")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        mean = self.mean()
+        return math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100 * (self.count - 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        if bucket == 0:
+            value = 0.0
+        else:
+            value = math.exp(self._log_min + (bucket - 0.5) * self._log_ratio)
+        return min(max(value, self.min), self.max)
+
+
+class OnlineMetrics:
+    """Per-request results folded in as requests complete.
+
+    Scalars live in arrays preallocated for num_requests (indexed by request
+    position), ITLs in a LatencyHistogram. record() drops the request's ITL
+    list and, unless store_text, its generated text. count_tokens is used for
+    backends that do not report completion_tokens.
+    """
+
+    def __init__(
+        self,
+        num_requests: int,
+        count_tokens: Callable[[str], int],
+        store_text: bool = True,
+    ):
+        self.success = np.zeros(num_requests, dtype=bool)
+        self.prompt_len = np.zeros(num_requests, dtype=np.int64)
+        self.output_len = np.zeros(num_requests, dtype=np.int64)
+        self.ttft = np.zeros(num_requests)
+        self.latency = np.zeros(num_requests)
+        self.itl = LatencyHistogram()
+        self._count_tokens = count_tokens
+        self._store_text = store_text
+
+    def record(self, index: int, output: RequestFuncOutput) -> None:
+        self.prompt_len[index] = output.prompt_len
+        if output.success:
+            output_len = output.output_tokens
+            if output_len is None:
+                output_len = self._count_tokens(output.generated_text)
+            self.success[index] = True
+            self.output_len[index] = output_len
+            self.ttft[index] = output.ttft
+            self.latency[index] = output.latency
+            self.itl.add_many(output.itl)
+        output.itl = array("d")
+        if not self._store_text:
+            output.generated_text = ""
@@ -0,0 +1,101 @@
+# pytest: skip-file
+"""Per-token arrival timelines for offline analysis (--token-timeline-file).
+
+The request handlers stamp every streamed token chunk with
+time.perf_counter_ns() (CLOCK_MONOTONIC on Linux, shared by the sharded worker
+processes) into a compact array('q'); with --token-timeline-file those arrays
+are kept and written at the end of the run to one uncompressed .npz:
+
+    token_times_ns  all chunk arrival times, concatenated (int64 ns)
+    offsets         request i owns token_times_ns[offsets[i]:offsets[i + 1]]
+    send_ns         when each request was sent
+    end_ns          when each request completed
+    success         per request
+    prompt_len      per request
+    output_tokens   completion_tokens reported by the server (-1 if none)
+    start_ns        benchmark start
+
+output_tokens / chunks > 1 means chunks carry several tokens (e.g. accepted
+MTP / speculative drafts); long gaps inside a timeline are decode stalls,
+and stalls that line up across requests point at the server rather than one
+stream. Run this module on a file for a summary of both.
+"""
+
+import argparse
+
+import numpy as np
+from backend_request_func import NS_PER_SECOND, RequestFuncOutput
+
+DEFAULT_STALL_MS = 100.0
+
+
+def save_token_timelines(
+    path: str, outputs: list[RequestFuncOutput], benchmark_start_time: float
+) -> None:
+    lengths = [len(o.token_times_ns) for o in outputs]
+    offsets = np.zeros(len(outputs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    token_times = np.empty(offsets[-1], dtype=np.int64)
+    for output, start, end in zip(outputs, offsets[:-1], offsets[1:]):
+        token_times[start:end] = np.frombuffer(output.token_times_ns, dtype=np.int64)
+    # start_time / end_time are perf_counter() seconds on the same clock.
+    np.savez(
+        path,
+        token_times_ns=token_times,
+        offsets=offsets,
+        send_ns=np.array([o.start_time * NS_PER_SECOND for o in outputs], np.int64),
+        end_ns=np.array([o.end_time * NS_PER_SECOND for o in outputs], np.int64),
+        success=np.array([o.success for o in outputs], dtype=bool),
+        prompt_len=np.array([o.prompt_len for o in outputs], dtype=np.int64),
+        output_tokens=np.array(
+            [-1 if o.output_tokens is None else o.output_tokens for o in outputs],
+            dtype=np.int64,
+        ),
+        start_ns=np.int64(benchmark_start_time * NS_PER_SECOND),
+    )
+    print(f"Token timelines of {len(outputs)} requests saved to {path}")
+
+
+def load_token_timelines(path: str) -> tuple[dict[str, np.ndarray], list[np.ndarray]]:
+    """Return the per-request arrays and one token-time array per request."""
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    timelines = np.split(arrays["token_times_ns"], arrays["offsets"][1:-1])
+    return arrays, timelines
+
+
+def summarize(path: str, stall_ms: float = DEFAULT_STALL_MS) -> None:
+    arrays, timelines = load_token_timelines(path)
+    ok = arrays["success"]
+    chunks = np.diff(arrays["offsets"])
+    reported = ok & (arrays["output_tokens"] > 0) & (chunks > 0)
+    gaps_ms = [np.diff(t) / 1e6 for t, s in zip(timelines, ok) if s]
+    stalled = sum(bool((g > stall_ms).any()) for g in gaps_ms)
+    gaps_ms = np.concatenate(gaps_ms) if gaps_ms else np.zeros(0)
+
+    print(f"Requests:                {ok.size} ({int(ok.sum())} successful)")
+    print(f"Token chunks:            {int(chunks[ok].sum())}")
+    if reported.any():
+        per_chunk = arrays["output_tokens"][reported] / chunks[reported]
+        print(f"Tokens per chunk (mean): {per_chunk.mean():.3f}")
+        print(f"Tokens per chunk (max):  {per_chunk.max():.3f}")
+    if gaps_ms.size:
+        for p in (50, 90, 99, 99.9):
+            label = f"P{p} chunk gap (ms):"
+            print(f"{label:<25}{np.percentile(gaps_ms, p):.2f}")
+        print(f"{'Max chunk gap (ms):':<25}{gaps_ms.max():.2f}")
+        label = f"Stalls > {stall_ms:g} ms:"
+        print(f"{label:<25}{int((gaps_ms > stall_ms).sum())} in {stalled} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a token timeline file.")
+    parser.add_argument("path", help="npz written with --token-timeline-file")
+    parser.add_argument(
+        "--stall-ms",
+        type=float,
+        default=DEFAULT_STALL_MS,
+        help="Chunk gap counted as a decode stall.",
+    )
+    args = parser.parse_args()
+    summarize(args.path, args.stall_ms)
@@ -0,0 +1,113 @@
+# pytest: skip-file
+"""Open-loop replay of timestamped request traces (--dataset-name trace).
+
+get_request() draws Poisson / gamma arrivals and sample_burstgpt_requests()
+keeps BurstGPT's lengths but not its timestamps. load_trace() reads a trace
+with per-request arrival times and token counts, e.g.
+
+    BurstGPT          Timestamp, Request tokens, Response tokens
+    Azure LLM traces  TIMESTAMP, ContextTokens, GeneratedTokens
+    own logs          timestamp, input_len, output_len  (CSV or JSONL)
+
+Column names are matched case-insensitively (see COLUMN_ALIASES); numeric
+timestamps are seconds, anything else is parsed as a date/time. Arrival
+offsets are relative to the first request and multiplied by time_scale
+(0.5 replays twice as fast).
+
+The offsets are sent open loop by arrival_schedule.dispatch_schedule(),
+which reports the lateness of each send (schedule lag) alongside the run.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+TRACE_FORMATS = ["auto", "csv", "jsonl"]
+
+COLUMN_ALIASES = {
+    "timestamp": ["timestamp", "arrival_time", "time"],
+    "input_len": [
+        "input_len",
+        "input_tokens",
+        "prompt_len",
+        "prompt_tokens",
+        "request tokens",
+        "contexttokens",
+    ],
+    "output_len": [
+        "output_len",
+        "output_tokens",
+        "completion_tokens",
+        "response tokens",
+        "generatedtokens",
+    ],
+}
+
+
+@dataclass
+class Trace:
+    # Arrival time of each request, seconds from the first one (scaled).
+    offsets: np.ndarray
+    input_lens: np.ndarray
+    output_lens: np.ndarray
+
+
+def _column(df: pd.DataFrame, field: str, path: str) -> pd.Series:
+    columns = {name.strip().lower(): name for name in df.columns}
+    for alias in COLUMN_ALIASES[field]:
+        if alias in columns:
+            return df[columns[alias]]
+    raise ValueError(
+        f"Trace {path} has no {field} column; expected one of "
+        f"{COLUMN_ALIASES[field]}, found {list(df.columns)}"
+    )
+
+
+def load_trace(
+    path: str,
+    trace_format: str = "auto",
+    time_scale: float = 1.0,
+    num_requests: int | None = None,
+) -> Trace:
+    """Read a trace, keeping the first num_requests arrivals.
+
+    Rows without input or output tokens (failed requests in BurstGPT) are
+    dropped.
+    """
+    if time_scale < 0:
+        raise ValueError("trace time scale must not be negative")
+    if trace_format == "auto":
+        ext = os.path.splitext(path)[1].lower()
+        trace_format = "jsonl" if ext in (".jsonl", ".json") else "csv"
+    if trace_format == "jsonl":
+        df = pd.read_json(path, lines=True)
+    elif trace_format == "csv":
+        df = pd.read_csv(path)
+    else:
+        raise ValueError(f"Unknown trace format: {trace_format}")
+
+    timestamps = _column(df, "timestamp", path)
+    if pd.api.types.is_numeric_dtype(timestamps):
+        seconds = timestamps.to_numpy(dtype=np.float64)
+    else:
+        seconds = pd.to_datetime(timestamps).astype("int64").to_numpy() / 1e9
+    input_lens = _column(df, "input_len", path).to_numpy(dtype=np.int64)
+    output_lens = _column(df, "output_len", path).to_numpy(dtype=np.int64)
+
+    keep = (input_lens > 0) & (output_lens > 0) & np.isfinite(seconds)
+    seconds, input_lens, output_lens = (
+        seconds[keep],
+        input_lens[keep],
+        output_lens[keep],
+    )
+    order = np.argsort(seconds, kind="stable")[:num_requests]
+    if not order.size:
+        raise ValueError(f"Trace {path} has no usable requests")
+    seconds = seconds[order]
+    return Trace(
+        offsets=(seconds - seconds[0]) * time_scale,
+        input_lens=input_lens[order],
+        output_lens=output_lens[order],
+    )
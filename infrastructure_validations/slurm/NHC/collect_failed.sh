@@ -23,10 +23,10 @@ else
 
 		elif [[ $MODE == "drain" ]]; then
 			echo -e "\n### Draining failed nodes in SLURM... ###"
-			while read -r node; do
-				echo "Draining $node..."
-				sudo scontrol update NodeName="$node" State=DRAIN Reason="Health check failed"
-			done <"$OUTPUT_FILE"
+			# One scontrol call for all nodes, as a compressed hostlist (ccw-gpu-[1-4,7])
+			NODES=$(scontrol show hostlist "$(paste -sd, "$OUTPUT_FILE")")
+			echo "Draining $NODES..."
+			sudo scontrol update NodeName="$NODES" State=DRAIN Reason="Health check failed"
 			echo "All failed nodes drained."
 
 		else
@@ -5,13 +5,25 @@ from typing import Any, Dict, List, Optional
 from fastmcp.server import FastMCP
 
 from .tools.azure_vm import get_physical_hostnames as _get_physical_hostnames_impl
+from .tools.azure_vm import get_vm_metadata as _get_vm_metadata_impl
 from .tools.azure_vm import get_vmss_id as _get_vmss_instance_name_impl
 from .tools.files import read_file_content as _read_file_content_impl
+from .tools.nccl_bisect import bisect_nccl as _bisect_nccl_impl
+from .tools.nccl_results import ingest_nccl_output as _ingest_nccl_output_impl
+from .tools.nccl_results import query_nccl_results as _query_nccl_results_impl
+from .tools.nhc import nhc_report as _nhc_report_impl
+from .tools.outliers import detect_outliers as _detect_outliers_impl
 from .tools.pkeys import get_infiniband_pkeys as _get_infiniband_pkeys_impl
 from .tools.shell import run_command as _run_command_impl
 from .tools.slurm import slurm as _slurm_impl
+from .tools.slurm_jobs import submit_and_watch as _submit_and_watch_impl
+from .tools.slurm_jobs import watch_jobs as _watch_jobs_impl
+from .tools.slurm_nodes import drain_nodes as _drain_nodes_impl
+from .tools.slurm_nodes import resume_nodes as _resume_nodes_impl
 from .tools.systemd import journalctl as _journalctl_impl
 from .tools.systemd import systemctl as _systemctl_impl
+from .tools.thermal import analyze_thermal_results as _analyze_thermal_results_impl
+from .tools.validation import run_validation_sweep as _run_validation_sweep_impl
 
 
 def build_server() -> FastMCP:
@@ -48,7 +60,9 @@ def build_server() -> FastMCP:
         return _get_physical_hostnames_impl(hosts)
 
     @server.tool()
-    def get_vmss_instance_name(hosts: List[str]) -> Dict[str, Any]:  # type: ignore
+    def get_vmss_instance_name(
+        hosts: List[str], refresh: bool = False
+    ) -> Dict[str, Any]:  # type: ignore
         """Retrieve Azure VMSS (Virtual Machine Scale Set) instance names for VMs.
 
         Extracts the VMSS instance name from the compute.name field, which is used
@@ -56,6 +70,7 @@ def build_server() -> FastMCP:
 
         Args:
             hosts: VM hostnames to query (required, non-empty)
+            refresh: Bypass the cached instance metadata and query IMDS again
 
         Returns:
             Structured JSON dict with version, timestamp, hosts[], summary.
@@ -65,8 +80,33 @@ def build_server() -> FastMCP:
             - vmss_id field may be empty if Azure instance metadata is not accessible
             - VMSS instance names are specifically for Azure Monitor metrics correlation
             - This is NOT the Azure VM ID - use get_physical_hostnames + Kusto for VM IDs
+            - Shares the per-host IMDS document cache with get_vm_metadata
+        """
+        return _get_vmss_instance_name_impl(hosts, refresh)
+
+    @server.tool()
+    def get_vm_metadata(
+        hosts: List[str], refresh: bool = False
+    ) -> Dict[str, Any]:  # type: ignore
+        """Retrieve Azure instance metadata (IMDS) fields for VMs.
+
+        Returns VMSS instance name, VM size, availability zone, placement group,
+        scale set name, location, resource ID and tags for each host. The full IMDS
+        instance document is fetched once per host and cached for a few minutes,
+        so repeated calls (and get_vmss_instance_name) need no extra IMDS requests.
+
+        Args:
+            hosts: VM hostnames to query (required, non-empty)
+            refresh: Bypass the cache and query IMDS again
+
+        Returns:
+            Structured JSON dict with version, timestamp, hosts[], summary.
+
+        Notes:
+            - Hosts are queried in bounded batches to avoid IMDS/SSH throttling
+            - Each host entry reports whether it was served from the cache
         """
-        return _get_vmss_instance_name_impl(hosts)
+        return _get_vm_metadata_impl(hosts, refresh)
 
     @server.tool()
     def slurm(command: str, args: Optional[List[str]] = None) -> Dict[str, Any]:  # type: ignore
@@ -131,6 +171,83 @@ def build_server() -> FastMCP:
         """
         return _slurm_impl(command, args)
 
+    @server.tool()
+    def submit_and_watch(
+        args: List[str], wait: bool = True, timeout: Optional[float] = 600
+    ) -> Dict[str, Any]:  # type: ignore
+        """Submit a Slurm batch job and wait for it to complete.
+
+        Runs sbatch with the given arguments, then tracks the job with a shared
+        server-side poller (one batched squeue for all watched jobs) instead of
+        repeated squeue calls from the client.
+
+        Args:
+            args: sbatch arguments, e.g. ['--nodes=2', '--partition=gpu', 'job.slurm']
+            wait: Block until the job finishes or timeout elapses (default True)
+            timeout: Maximum seconds to block (default 600, None = no limit)
+
+        Returns:
+            Structured JSON dict with version, success, command, job_id,
+            submit_output, job (state, exit_code, signal, stdout, stderr, nodes,
+            elapsed, done) and error.
+
+        Notes:
+            - If the job is still running at timeout, job.done is False; use
+              watch_slurm_jobs with the job_id to keep waiting
+        """
+        return _submit_and_watch_impl(args, wait, timeout)
+
+    @server.tool()
+    def watch_slurm_jobs(
+        job_ids: List[str], timeout: Optional[float] = 600
+    ) -> Dict[str, Any]:  # type: ignore
+        """Wait for submitted Slurm jobs to finish and report their results.
+
+        Args:
+            job_ids: Slurm job ids to track (e.g. ['1234', '1235'])
+            timeout: Maximum seconds to block (default 600, 0 = report current state)
+
+        Returns:
+            Structured JSON dict with version, timestamp, jobs[], summary
+            (watched, done, running, failed).
+        """
+        return _watch_jobs_impl(job_ids, timeout)
+
+    @server.tool()
+    def drain_nodes(hosts: List[str], reason: str) -> Dict[str, Any]:  # type: ignore
+        """Drain a set of Slurm nodes in one scontrol call and verify the result.
+
+        The hosts are compressed into one hostlist expression (ccw-gpu-[1-4,7]),
+        drained with a single `scontrol update` and read back with a single
+        `sinfo`, all in one SSH session.
+
+        Args:
+            hosts: Nodes to drain
+            reason: Drain reason (required); use "<issue>_<YYYYMMDD>"
+
+        Returns:
+            Structured JSON dict with version, timestamp, success, command,
+            hostlist, nodes[] (host, state, reason, applied), not_applied[],
+            error, summary (requested, applied, not_applied).
+        """
+        return _drain_nodes_impl(hosts, reason)
+
+    @server.tool()
+    def resume_nodes(
+        hosts: List[str], reason: Optional[str] = None
+    ) -> Dict[str, Any]:  # type: ignore
+        """Return drained Slurm nodes to service in one scontrol call and verify.
+
+        Args:
+            hosts: Nodes to resume
+            reason: Optional reason recorded with the update
+
+        Returns:
+            Same structure as drain_nodes; a node is applied once it is no
+            longer drained or draining.
+        """
+        return _resume_nodes_impl(hosts, reason)
+
     @server.tool()
     def systemctl(hosts: List[str], args: Optional[List[str]] = None) -> Dict[str, Any]:  # type: ignore
         """Wrapper for the systemctl command - control systemd services and other units.
@@ -244,6 +361,254 @@ def build_server() -> FastMCP:
         """
         return _run_command_impl(command)
 
+    @server.tool()
+    def run_validation_sweep(
+        hosts: List[str],
+        tests: Optional[List[str]] = None,
+        partition: str = "gpu",
+        group_by_rack: bool = True,
+        max_concurrent_jobs: int = 16,
+        output_dir: Optional[str] = None,
+        timeout: Optional[float] = 3600,
+    ) -> Dict[str, Any]:  # type: ignore
+        """Run NCCL / GPU GEMM / thermal validation jobs across a node set per MNNVL rack.
+
+        Discovers rack membership (nvidia-smi ClusterUUID) with one parallel-ssh
+        call, submits the infrastructure_validations/slurm test scripts for every
+        rack in parallel, waits for them and returns one fleet report.
+
+        Args:
+            hosts: Nodes to validate (required, non-empty)
+            tests: Subset of ['nccl', 'gpu', 'thermal'] (default ['nccl', 'gpu'])
+            partition: Slurm partition to submit to (default 'gpu')
+            group_by_rack: Group nodes by ClusterUUID; False runs one group of all nodes
+            max_concurrent_jobs: Maximum jobs in flight at once (default 16)
+            output_dir: Cluster directory for job outputs (default validation-<timestamp>)
+            timeout: Seconds to wait for all jobs (default 3600)
+
+        Returns:
+            Structured JSON dict with version, timestamp, output_dir, racks[]
+            (hosts, sku, per-test job state and parsed metrics),
+            unreachable_hosts, summary.
+
+        Notes:
+            - Tests on the same rack run one after another; racks run in parallel
+            - In-flight jobs never use more nodes than the partition has usable
+            - NCCL runs the quick check (16G, 10 iters); nodes without an MNNVL
+              domain only get the per-node gpu/thermal tests
+            - Jobs unfinished at timeout keep running; use watch_slurm_jobs
+            - Scripts are read from CLUSTER_VALIDATIONS_DIR on the cluster
+        """
+        return _run_validation_sweep_impl(
+            hosts,
+            tests,
+            partition,
+            group_by_rack,
+            max_concurrent_jobs,
+            output_dir,
+            timeout,
+        )
+
+    @server.tool()
+    def bisect_nccl(
+        hosts: List[str],
+        sku: Optional[str] = None,
+        partition: str = "gpu",
+        scope: Optional[str] = None,
+        min_busbw: Optional[float] = None,
+        output_dir: Optional[str] = None,
+        timeout: Optional[float] = 1800,
+    ) -> Dict[str, Any]:  # type: ignore
+        """Isolate the bad node(s) in a group that fails the NCCL allreduce test.
+
+        Splits the group in two, runs nccl_test.sh on both halves concurrently,
+        keeps passing halves as known-good and recurses only into failing halves.
+        Remaining 2-3 node suspects are each paired with a different known-good
+        node in one final parallel round.
+
+        Args:
+            hosts: Nodes of the failing group, e.g. one MNNVL rack (at least 2)
+            sku: NCCL config name ('graceblackwell', 'hopper'); detected if omitted
+            partition: Slurm partition for the test jobs (default 'gpu')
+            scope: Baseline scope: 'intra_rack', 'inter_rack' (GB300) or 'full' (H100)
+            min_busbw: Pass threshold in GB/s (default: SKU warn threshold)
+            output_dir: Cluster directory for job outputs
+            timeout: Seconds to wait for each round of jobs (default 1800)
+
+        Returns:
+            Structured JSON dict with version, timestamp, sku, min_busbw, rounds[]
+            (groups, busbw, passed, status), bad_nodes, known_good, unresolved,
+            interaction_failures, jobs[], summary.
+
+        Notes:
+            - Tests use the bisection settings (8G-16G, 20 iterations)
+            - interaction_failures lists groups whose halves both passed; the
+              failure only appears when all nodes run together
+            - Tests with no result (job failed / timed out) have passed=None
+              and their hosts go to unresolved, never to bad_nodes
+            - Drain bad_nodes and re-run the original test to verify
+        """
+        return _bisect_nccl_impl(
+            hosts, sku, partition, scope, min_busbw, output_dir, timeout
+        )
+
+    @server.tool()
+    def ingest_nccl_output(
+        path: str, hosts: List[str], sku: str, job_id: Optional[str] = None
+    ) -> Dict[str, Any]:  # type: ignore
+        """Parse an nccl-tests output file on the cluster and add it to the result store.
+
+        Use this for runs submitted outside run_validation_sweep / bisect_nccl
+        (those record their NCCL results automatically).
+
+        Args:
+            path: Output file on the cluster, e.g. nccl_test.1234.out
+            hosts: Node set the test ran on
+            sku: NCCL config name ('graceblackwell' or 'hopper')
+            job_id: Optional Slurm job id
+
+        Returns:
+            Structured JSON dict with version, success, path, run_id, rows,
+            summary (peak_size_bytes, peak_busbw_gbps, avg_busbw_gbps, wrong), error.
+        """
+        return _ingest_nccl_output_impl(path, hosts, sku, job_id)
+
+    @server.tool()
+    def query_nccl_results(
+        sku: Optional[str] = None,
+        hosts: Optional[List[str]] = None,
+        size: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:  # type: ignore
+        """Query stored NCCL busbw results for trends and regressions.
+
+        Args:
+            sku: Filter by NCCL config name ('graceblackwell', 'hopper')
+            hosts: Filter by exact node set (order does not matter)
+            size: Message size in bytes (default: largest size of each run)
+            since: Earliest run date, YYYY-MM-DD (inclusive)
+            until: Latest run date, YYYY-MM-DD (inclusive)
+            limit: Maximum runs returned, newest first (default 100)
+
+        Returns:
+            Structured JSON dict with version, timestamp, runs[] (run_id, date,
+            sku, node_set, num_nodes, job_id, size, busbw_gbps, algbw_gbps,
+            avg_busbw_gbps, wrong), summary (runs, min/max/mean busbw).
+        """
+        return _query_nccl_results_impl(sku, hosts, size, since, until, limit)
+
+    @server.tool()
+    def nhc_report(
+        path: str,
+        action: Optional[str] = None,
+        reason: str = "Health check failed",
+        pattern: str = "*.log",
+        parallelism: int = 4,
+        refresh: bool = False,
+    ) -> Dict[str, Any]:  # type: ignore
+        """Summarize Node Health Check logs and optionally drain or reboot failed nodes.
+
+        Reads every per-node NHC log written by nhc.slurm once into a per-node
+        table of check results, error lines and InfiniBand firmware versions.
+
+        Args:
+            path: Directory containing the <hostname>.log files
+            action: None (report only), 'drain' or 'reboot' for all failed nodes
+            reason: Slurm drain reason (default 'Health check failed')
+            pattern: Log file glob inside path (default '*.log')
+            parallelism: SSH sessions used to stream the logs (default 4)
+            refresh: Re-read the logs even if path was ingested in the last 5 minutes
+
+        Returns:
+            Structured JSON dict with version, timestamp, path, failed_nodes[]
+            (host, failed_checks, errors), check_failures (check -> nodes),
+            firmware_versions (version -> nodes), action (action, hosts, success,
+            command, error), summary (files, nodes, failed, passed), error.
+
+        Notes:
+            - A node fails when its log has a failed NHC check or any ERROR/Error
+              line (same criterion as collect_failed.sh)
+            - drain issues one scontrol update for all failed nodes; reboot issues
+              one parallel-ssh 'sudo reboot'
+        """
+        return _nhc_report_impl(path, action, reason, pattern, parallelism, refresh)
+
+    @server.tool()
+    def analyze_thermal_results(
+        path: str, parallelism: int = 8, limit: Optional[int] = 100
+    ) -> Dict[str, Any]:  # type: ignore
+        """Analyze thermal stress test telemetry into a per-GPU pass/warn/fail table.
+
+        Streams every thermal_results.*.csv written by thermal_test.sh (several
+        files in parallel, line by line) and detects throttle intervals, tlimit
+        headroom minima and SM clock drops for each GPU.
+
+        Args:
+            path: A thermal_results.*.csv file or the directory containing them
+            parallelism: Files streamed concurrently (default 8)
+            limit: Maximum GPU rows returned, worst first (default 100)
+
+        Returns:
+            Structured JSON dict with version, timestamp, path, files[] (path,
+            error), gpus[] (host, gpu, status, samples, max_temp_c, min_tlimit_c,
+            max_power_w, peak/min_sm_mhz, max_clock_drop_pct, clock_drop_samples,
+            throttle_seconds, throttle_intervals, intervals), summary, error.
+
+        Notes:
+            - fail: any thermal or HW slowdown / power brake sample, or tlimit
+              headroom reaching 0 C
+            - warn: SW power capping or SM clock below 90% of the GPU's peak
+            - Up to 10 intervals (start, end, samples, reasons) are kept per
+              GPU and category; throttle_intervals has the full count
+        """
+        return _analyze_thermal_results_impl(path, parallelism, limit)
+
+    @server.tool()
+    def detect_outliers(
+        kind: str,
+        path: Optional[str] = None,
+        values: Optional[Dict[str, Optional[float]]] = None,
+        sku: Optional[str] = None,
+        scope: Optional[str] = None,
+        since: Optional[str] = None,
+        z_threshold: float = -2.0,
+        limit: int = 50,
+    ) -> Dict[str, Any]:  # type: ignore
+        """Rank fleet outliers in GEMM, NCCL or thermal validation results.
+
+        Applies the cluster_outlier_detection methods (absolute SKU threshold,
+        z-score, median/MAD modified z-score, deviation from expected) across the
+        whole fleet at once.
+
+        Args:
+            kind: 'gemm', 'nccl' or 'thermal'
+            path: Cluster path: gemm CSV (hostname,gpu0,...), or a thermal CSV /
+                directory of thermal_results.*.csv
+            values: name -> metric instead of path (e.g. rack -> busbw GB/s)
+            sku: NCCL config name for thresholds ('graceblackwell', 'hopper')
+            scope: NCCL baseline scope ('intra_rack', 'inter_rack', 'full')
+            since: nccl without values: use stored runs from this date (YYYY-MM-DD)
+            z_threshold: z / modified z below which a result is a warning (-2.0)
+            limit: Maximum outliers returned (default 50)
+
+        Returns:
+            Structured JSON dict with version, timestamp, kind, sku, fleet (count,
+            mean, std, min, max, median, mad), outliers[] worst first (name, value,
+            deviation_pct, z, modified_z, status), summary counts per status, error.
+
+        Notes:
+            - status is 'ghr' below the SKU GHR threshold (or missing / thermal
+              slowdown), 'warn' below the warn threshold or z < z_threshold,
+              'monitor' for z < -1.5
+            - Plain z-scores are only used with 10+ samples; MAD always applies
+            - gemm outliers include per-GPU GFlops, status and z for the node
+        """
+        return _detect_outliers_impl(
+            kind, path, values, sku, scope, since, z_threshold, limit
+        )
+
     return server
 
 
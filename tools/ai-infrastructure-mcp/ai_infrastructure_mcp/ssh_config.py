@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 
 import paramiko
 
@@ -88,3 +88,23 @@ def run_login_command(command: str) -> str:
         return out
     finally:
         client.close()
+
+
+def stream_login_command(command: str) -> Iterator[str]:
+    """Run a command on the login node and yield stdout line by line.
+
+    Output is never buffered as a whole, so large files can be consumed with
+    constant memory. Raises RuntimeError with stderr when the command exits
+    non-zero (after the lines it did produce have been yielded).
+    """
+    client = get_ssh_client()
+    try:
+        _, stdout, stderr = client.exec_command(command)
+        for line in stdout:
+            yield line.rstrip("\r\n")
+        status = stdout.channel.recv_exit_status()
+        if status != 0:
+            err = stderr.read().decode().strip()
+            raise RuntimeError(err or f"command exited with status {status}")
+    finally:
+        client.close()
@@ -1,5 +1,24 @@
+import json
+
 import pytest
-from ai_infrastructure_mcp.tools.azure_vm import get_physical_hostnames, get_vmss_id
+from ai_infrastructure_mcp.tools import azure_vm
+from ai_infrastructure_mcp.tools.azure_vm import (
+    get_physical_hostnames,
+    get_vm_metadata,
+    get_vmss_id,
+)
+
+
+def imds_doc(name, **compute):
+    """Single-line IMDS instance document as printed by curl."""
+    return json.dumps({"compute": {"name": name, **compute}, "network": {}})
+
+
+@pytest.fixture(autouse=True)
+def clear_imds_cache():
+    azure_vm._IMDS_CACHE.clear()
+    yield
+    azure_vm._IMDS_CACHE.clear()
 
 
 class DummyStd:
@@ -17,6 +36,7 @@ class DummyClient:
         self.expected_fragment = expected_fragment
         self.output = output
         self.closed = False
+        self.commands = []
 
     def set_missing_host_key_policy(self, *_):
         pass
@@ -26,6 +46,7 @@ class DummyClient:
 
     def exec_command(self, cmd):
         assert self.expected_fragment in cmd
+        self.commands.append(cmd)
         return (None, DummyStd(self.output), DummyStd(""))
 
     def close(self):
@@ -109,10 +130,10 @@ def test_get_vmss_id_multi(monkeypatch):
     """Test get_vmss_id with multiple hosts returning VMSS IDs."""
     from ai_infrastructure_mcp import ssh_config as mod
 
-    sample_output = """[1] 12:00:00 [SUCCESS] vmA
-login-sinvqvly6zhmb_0
+    sample_output = f"""[1] 12:00:00 [SUCCESS] vmA
+{imds_doc("login-sinvqvly6zhmb_0")}
 [2] 12:00:00 [SUCCESS] vmB
-compute-abc123_5
+{imds_doc("compute-abc123_5")}
 [3] 12:00:00 [SUCCESS] vmC
 """
     dummy_client = DummyClient(
@@ -136,10 +157,10 @@ def test_get_vmss_id_with_curl_error(monkeypatch):
     """Test handling of curl errors in the command output."""
     from ai_infrastructure_mcp import ssh_config as mod
 
-    sample_output = """[1] 12:00:00 [SUCCESS] vmA
+    sample_output = f"""[1] 12:00:00 [SUCCESS] vmA
 curl: (7) Failed to connect to 169.254.169.254
 [2] 12:00:00 [SUCCESS] vmB
-compute-abc123_1
+{imds_doc("compute-abc123_1")}
 """
     dummy_client = DummyClient(
         expected_fragment='parallel-ssh -i -H "vmA vmB"',
@@ -157,14 +178,14 @@ compute-abc123_1
     assert "error" not in hosts["vmB"]
 
 
-def test_get_vmss_id_with_jq_null(monkeypatch):
-    """Test handling of jq returning null (metadata field not found)."""
+def test_get_vmss_id_with_null_name(monkeypatch):
+    """Test handling of a metadata document without compute.name."""
     from ai_infrastructure_mcp import ssh_config as mod
 
-    sample_output = """[1] 12:00:00 [SUCCESS] vmA
-null
+    sample_output = f"""[1] 12:00:00 [SUCCESS] vmA
+{imds_doc(None)}
 [2] 12:00:00 [SUCCESS] vmB
-compute-def456_2
+{imds_doc("compute-def456_2")}
 """
     dummy_client = DummyClient(
         expected_fragment='parallel-ssh -i -H "vmA vmB"',
@@ -203,3 +224,117 @@ def test_get_vmss_id_empty_hosts():
     """Test that get_vmss_id raises ValueError for empty host list."""
     with pytest.raises(ValueError):
         get_vmss_id([])
+
+
+def test_get_vm_metadata_fields(monkeypatch):
+    """All IMDS fields come from the single fetched document."""
+    from ai_infrastructure_mcp import ssh_config as mod
+
+    doc = imds_doc(
+        "compute-abc123_7",
+        vmSize="Standard_ND128isr_GB300_v6",
+        zone="2",
+        placementGroupId="pg-1",
+        tagsList=[{"name": "rack", "value": "r12"}],
+    )
+    dummy_client = DummyClient(
+        expected_fragment='parallel-ssh -i -H "vmA" -p 32',
+        output=f"[1] 12:00:00 [SUCCESS] vmA\n{doc}\n",
+    )
+    monkeypatch.setattr(mod, "get_ssh_client", lambda: dummy_client)
+    result = get_vm_metadata(["vmA"])
+    entry = result["hosts"][0]
+    assert entry["vmss_id"] == "compute-abc123_7"
+    assert entry["vm_size"] == "Standard_ND128isr_GB300_v6"
+    assert entry["zone"] == "2"
+    assert entry["placement_group_id"] == "pg-1"
+    assert entry["tags"] == {"rack": "r12"}
+    assert entry["cached"] is False
+    assert "error" not in entry
+    assert result["summary"] == {"queried": 1, "cached": 0, "fetched": 1, "failed": 0}
+    assert len(dummy_client.commands) == 1
+    # Only one IMDS request per host: no jq, no per-field queries
+    assert "jq" not in dummy_client.commands[0]
+
+
+def test_get_vm_metadata_tags_string(monkeypatch):
+    from ai_infrastructure_mcp import ssh_config as mod
+
+    doc = imds_doc("vm_1", tags="env:prod;owner:hpc")
+    dummy_client = DummyClient(
+        expected_fragment="parallel-ssh",
+        output=f"[1] 12:00:00 [SUCCESS] vmA\n{doc}\n",
+    )
+    monkeypatch.setattr(mod, "get_ssh_client", lambda: dummy_client)
+    result = get_vm_metadata(["vmA"])
+    assert result["hosts"][0]["tags"] == {"env": "prod", "owner": "hpc"}
+
+
+def test_imds_cache_reused_across_tools(monkeypatch):
+    """A second call (even from a different tool) is served from the cache."""
+    from ai_infrastructure_mcp import ssh_config as mod
+
+    dummy_client = DummyClient(
+        expected_fragment='parallel-ssh -i -H "vmA vmB"',
+        output=f"""[1] 12:00:00 [SUCCESS] vmA
+{imds_doc("vm_1", vmSize="Standard_ND96isr_H100_v5")}
+[2] 12:00:00 [SUCCESS] vmB
+{imds_doc("vm_2")}
+""",
+    )
+    monkeypatch.setattr(mod, "get_ssh_client", lambda: dummy_client)
+    get_vmss_id(["vmA", "vmB"])
+    result = get_vm_metadata(["vmA", "vmB"])
+    assert len(dummy_client.commands) == 1
+    assert all(h["cached"] for h in result["hosts"])
+    assert result["hosts"][0]["vm_size"] == "Standard_ND96isr_H100_v5"
+    assert result["summary"]["cached"] == 2
+
+    get_vmss_id(["vmA", "vmB"], refresh=True)
+    assert len(dummy_client.commands) == 2
+
+
+def test_imds_cache_expires(monkeypatch):
+    from ai_infrastructure_mcp import ssh_config as mod
+
+    dummy_client = DummyClient(
+        expected_fragment="parallel-ssh",
+        output=f"[1] 12:00:00 [SUCCESS] vmA\n{imds_doc('vm_1')}\n",
+    )
+    monkeypatch.setattr(mod, "get_ssh_client", lambda: dummy_client)
+    now = [1000.0]
+    monkeypatch.setattr(azure_vm.time, "monotonic", lambda: now[0])
+    get_vmss_id(["vmA"])
+    now[0] += azure_vm.IMDS_CACHE_TTL_SECONDS + 1
+    get_vmss_id(["vmA"])
+    assert len(dummy_client.commands) == 2
+
+
+def test_imds_errors_not_cached(monkeypatch):
+    from ai_infrastructure_mcp import ssh_config as mod
+
+    dummy_client = DummyClient(
+        expected_fragment="parallel-ssh",
+        output="[1] 12:00:00 [SUCCESS] vmA\ncurl: (28) Operation timed out\n",
+    )
+    monkeypatch.setattr(mod, "get_ssh_client", lambda: dummy_client)
+    get_vmss_id(["vmA"])
+    get_vmss_id(["vmA"])
+    assert len(dummy_client.commands) == 2
+
+
+def test_imds_hosts_fetched_in_batches(monkeypatch):
+    """Large host lists are split into bounded parallel-ssh invocations."""
+    commands = []
+
+    def fake_run(cmd):
+        commands.append(cmd)
+        return ""
+
+    monkeypatch.setattr(azure_vm, "IMDS_BATCH_SIZE", 2)
+    monkeypatch.setattr(azure_vm, "run_login_command", fake_run)
+    result = get_vm_metadata(["h1", "h2", "h3", "h4", "h5"])
+    assert len(commands) == 3
+    assert all("-p 32" in c for c in commands)
+    assert result["summary"]["failed"] == 5
+    assert result["hosts"][0]["error"] == "No response from host"
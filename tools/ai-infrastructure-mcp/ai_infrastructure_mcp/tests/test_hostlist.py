@@ -0,0 +1,38 @@
+"""Tests for Slurm hostlist compression and expansion."""
+
+import pytest
+from ai_infrastructure_mcp.tools import hostlist
+
+
+def test_compress_ranges_and_singletons():
+    hosts = [f"ccw-gpu-{i}" for i in (7, 1, 2, 3, 10, 11, 3)]
+    assert hostlist.compress(hosts) == "ccw-gpu-[1-3,7,10-11]"
+    assert hostlist.compress(["ccw-gpu-5"]) == "ccw-gpu-5"
+    assert hostlist.compress(["login", "ccw-gpu-1", "ccw-gpu-2"]) == (
+        "login,ccw-gpu-[1-2]"
+    )
+
+
+def test_compress_keeps_zero_padding_separate():
+    hosts = ["node001", "node002", "node010", "node7"]
+    assert hostlist.compress(hosts) == "node[001-002,010],node7"
+
+
+def test_expand_round_trip():
+    hosts = [f"ccw-gpu-{i}" for i in range(1, 201) if i % 7]
+    expr = hostlist.compress(hosts)
+    assert expr.count("[") == 1
+    assert hostlist.expand(expr) == hosts
+    assert hostlist.expand("node[008-010],login") == [
+        "node008",
+        "node009",
+        "node010",
+        "login",
+    ]
+    assert hostlist.expand("r[1-2]-g[1-2]") == ["r1-g1", "r1-g2", "r2-g1", "r2-g2"]
+
+
+@pytest.mark.parametrize("expr", ["n[1-", "n[a-b]", "n[5-3]"])
+def test_expand_rejects_malformed(expr):
+    with pytest.raises(ValueError):
+        hostlist.expand(expr)
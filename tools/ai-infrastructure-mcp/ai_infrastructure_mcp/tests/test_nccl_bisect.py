@@ -0,0 +1,161 @@
+"""Tests for NCCL bisection and SKU baseline thresholds."""
+
+import shlex
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.slurm_jobs as slurm_jobs
+import pytest
+from ai_infrastructure_mcp.tools import nccl_bisect, nccl_results, sku_baselines
+
+HOSTS = [f"ccw-gpu-{i}" for i in range(1, 19)]
+
+
+class FakeRunner:
+    """Group busbw is healthy unless it contains a bad node."""
+
+    def __init__(self, bad):
+        self.bad = set(bad)
+        self.rounds = []
+
+    def __call__(self, groups):
+        self.rounds.append(groups)
+        return [300.0 if self.bad & set(g) else 937.0 for g in groups]
+
+
+@pytest.fixture(autouse=True)
+def result_store(monkeypatch, tmp_path):
+    store = nccl_results.NcclResultStore(str(tmp_path / "nccl.db"))
+    monkeypatch.setattr(nccl_results, "_STORE", store)
+    yield store
+    store.close()
+
+
+def test_classify_thresholds():
+    t = sku_baselines.nccl_threshold("graceblackwell")
+    assert t == sku_baselines.Threshold(937, 800, 600)
+    assert sku_baselines.classify(900, t) == "ok"
+    assert sku_baselines.classify(700, t) == "warn"
+    assert sku_baselines.classify(500, t) == "ghr"
+    assert sku_baselines.classify(None, t) == "ghr"
+    assert sku_baselines.nccl_threshold("hopper").warn == 400
+    with pytest.raises(ValueError):
+        sku_baselines.nccl_threshold("hopper", "intra_rack")
+    with pytest.raises(ValueError):
+        sku_baselines.get_baseline("ampere")
+
+
+def test_bisect_single_bad_node_in_rack():
+    runner = FakeRunner(["ccw-gpu-7"])
+    result = nccl_bisect.bisect(HOSTS, runner, min_busbw=800)
+
+    assert result["bad_nodes"] == ["ccw-gpu-7"]
+    assert result["unresolved"] == []
+    # log2(18) split rounds plus one pairwise round.
+    assert len(result["rounds"]) <= 5
+    assert result["rounds"][-1]["kind"] == "pairwise"
+    # Only failing halves are split again: two tests per split round.
+    for groups in runner.rounds[:-1]:
+        assert len(groups) == 2
+    assert "ccw-gpu-7" not in result["known_good"]
+
+
+def test_bisect_pairs_use_distinct_good_nodes():
+    runner = FakeRunner(["ccw-gpu-2"])
+    result = nccl_bisect.bisect(HOSTS[:8], runner, min_busbw=800)
+    pairs = runner.rounds[-1]
+    partners = [p[1] for p in pairs]
+    assert len(set(partners)) == len(partners)
+    assert all(p[0] not in partners for p in pairs)
+    assert result["bad_nodes"] == ["ccw-gpu-2"]
+
+
+def test_bisect_bad_nodes_in_both_halves():
+    runner = FakeRunner(["ccw-gpu-3", "ccw-gpu-15"])
+    result = nccl_bisect.bisect(HOSTS, runner, min_busbw=800)
+    assert sorted(result["bad_nodes"]) == ["ccw-gpu-15", "ccw-gpu-3"]
+    # Both halves recurse in the same rounds rather than one after another.
+    assert len(runner.rounds[1]) == 4
+
+
+def test_bisect_interaction_failure_when_halves_pass():
+    runner = FakeRunner([])
+    result = nccl_bisect.bisect(HOSTS[:4], runner, min_busbw=800)
+    assert result["bad_nodes"] == []
+    assert result["interaction_failures"] == [HOSTS[:4]]
+
+
+def test_bisect_small_group_without_known_good_is_unresolved():
+    runner = FakeRunner(["ccw-gpu-1"])
+    result = nccl_bisect.bisect(HOSTS[:3], runner, min_busbw=800)
+    assert result["unresolved"] == HOSTS[:3]
+    assert runner.rounds == []
+
+
+def test_bisect_job_without_result_is_unresolved_not_bad():
+    class FailingHalfRunner(FakeRunner):
+        def __call__(self, groups):
+            busbw = super().__call__(groups)
+            return [None if "ccw-gpu-10" in g else v for g, v in zip(groups, busbw)]
+
+    runner = FailingHalfRunner([])
+    result = nccl_bisect.bisect(HOSTS, runner, min_busbw=800)
+    first = result["rounds"][0]["tests"]
+    assert first[1]["passed"] is None
+    assert first[1]["error"] == "no result"
+    assert result["bad_nodes"] == []
+    assert sorted(result["unresolved"]) == sorted(HOSTS[9:])
+    assert result["known_good"] == HOSTS[:9]
+    # The half without a result is not split further.
+    assert len(runner.rounds) == 1
+
+
+def test_bisect_nccl_submits_jobs_per_round(monkeypatch):
+    bad = "ccw-gpu-3"
+    jobs = {}
+    commands = []
+
+    def fake(cmd):
+        commands.append(cmd)
+        argv = shlex.split(cmd)
+        if argv[0] == "mkdir":
+            return ""
+        if argv[0] == "bash":
+            job_id = str(100 + len(jobs))
+            jobs[job_id] = argv[argv.index("-w") + 1].split(",")
+            return f"Submitted batch job {job_id}\n"
+        if argv[0] == "squeue":
+            return ""
+        if argv[0] == "sacct":
+            ids = argv[argv.index("-j") + 1].split(",")
+            return "\n".join(
+                f"{j}|nccl-bisect|COMPLETED|0:0|00:05:00|x|/home/u|out/nccl_test.%j.out|"
+                for j in ids
+            )
+        if argv[0] == "cat":
+            job_id = argv[1].rsplit(".", 2)[1]
+            busbw = 300.0 if bad in jobs[job_id] else 930.0
+            return (
+                f" 17179869184 4294967296 float sum -1 18285.0 939.58 {busbw} 0 "
+                f"18292.6 939.19 {busbw} 0\n"
+            )
+        raise AssertionError(cmd)
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", fake)
+    monkeypatch.setattr(slurm_jobs, "_WATCHER", slurm_jobs.JobWatcher(0.01))
+
+    result = nccl_bisect.bisect_nccl(
+        HOSTS[:6], sku="graceblackwell", output_dir="out", timeout=10
+    )
+
+    assert result["bad_nodes"] == [bad]
+    assert result["min_busbw"] == 800
+    assert result["summary"]["jobs"] == len(jobs)
+    assert result["rounds"][0]["tests"][0]["status"] == "ghr"
+    submit = next(c for c in commands if c.startswith("bash"))
+    assert "--sku graceblackwell --begin-size 8G --end-size 16G --iters 20" in submit
+    assert sum(c.startswith("mkdir") for c in commands) == 1
+
+
+def test_bisect_nccl_requires_two_hosts():
+    with pytest.raises(ValueError):
+        nccl_bisect.bisect_nccl(["ccw-gpu-1"], sku="hopper")
@@ -0,0 +1,117 @@
+"""Tests for the nccl-tests streaming parser and the append-only result store."""
+
+import sqlite3
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.nccl_results as nccl_results
+import pytest
+
+SAMPLE = """\
+# nThread 1 nGpus 1 minBytes 1024 maxBytes 17179869184 step: 2(factor) warmup iters: 5 iters: 20 agg iters: 1 validation: 0 graph: 0
+#
+ccw-gpu-1:12345:12345 [0] NCCL INFO Bootstrap : Using eth0:10.0.0.4<0>
+#                                                              out-of-place                       in-place
+#       size         count      type   redop    root     time   algbw   busbw #wrong     time   algbw   busbw #wrong
+#        (B)    (elements)                               (us)  (GB/s)  (GB/s)            (us)  (GB/s)  (GB/s)
+        1024           256     float     sum      -1    17.94    0.06    0.11    N/A    17.90    0.06    0.11    N/A
+  8589934592    2147483648     float     sum      -1   9300.0  923.60  920.10    N/A   9301.0  923.50  920.00    N/A
+ 17179869184    4294967296     float     sum      -1  18285.0  939.58  936.93    N/A  18292.6  939.19  936.54    N/A
+ 17179869184    4294967296     float     sum      -1  18285.0  939
+# Out of bounds values : 0 OK
+# Avg bus bandwidth    : 487.265
+"""
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    s = nccl_results.NcclResultStore(str(tmp_path / "nccl.db"))
+    monkeypatch.setattr(nccl_results, "_STORE", s)
+    yield s
+    s.close()
+
+
+def test_parse_stream_typed_columns():
+    res = nccl_results.parse_nccl_stream(iter(SAMPLE.splitlines()))
+    assert len(res) == 3
+    assert list(res.size) == [1024, 8589934592, 17179869184]
+    assert res.size.typecode == "q"
+    assert res.oop_busbw.typecode == "d"
+    assert res.type == ["float"] * 3
+    assert list(res.oop_wrong) == [nccl_results.WRONG_NOT_CHECKED] * 3
+    assert res.avg_busbw == 487.265
+    assert res.out_of_bounds == 0
+    row = next(res.rows())
+    assert row["ip_time_us"] == 17.90
+    assert row["root"] == -1
+
+
+def test_parse_summary_counts_wrong():
+    text = (
+        "  1024  256  float  sum  -1  17.9  0.06  0.11  2  17.9  0.06  0.11  1\n"
+        "  2048  512  float  sum  -1  18.0  0.11  0.21  0  18.0  0.11  0.20  0\n"
+    )
+    summary = nccl_results.parse_nccl_output(text)
+    assert summary == {
+        "peak_size_bytes": 2048,
+        "peak_busbw_gbps": 0.21,
+        "avg_busbw_gbps": None,
+        "wrong": 3,
+    }
+
+
+def test_parse_empty_output():
+    assert nccl_results.parse_nccl_output("srun: error: node down\n") == {
+        "peak_size_bytes": None,
+        "peak_busbw_gbps": None,
+        "avg_busbw_gbps": None,
+        "wrong": 0,
+    }
+
+
+def test_store_append_and_query(store):
+    res = nccl_results.parse_nccl_stream(SAMPLE.splitlines())
+    first = store.append(res, ["n2", "n1"], "graceblackwell", "11", date="2025-01-01")
+    store.append(res, ["n1", "n2"], "graceblackwell", "12", date="2025-01-02")
+    store.append(res, ["n3", "n4"], "hopper", "13", date="2025-01-02")
+
+    rows = store.query(sku="graceblackwell")
+    assert [r["job_id"] for r in rows] == ["12", "11"]
+    assert rows[0]["node_set"] == "n1,n2"
+    assert rows[0]["size"] == 17179869184
+    assert rows[0]["busbw_gbps"] == 936.93
+
+    small = store.query(hosts=["n1", "n2"], size=1024, since="2025-01-02")
+    assert [r["job_id"] for r in small] == ["12"]
+    assert small[0]["busbw_gbps"] == 0.11
+
+    conn = sqlite3.connect(store.path)
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("DELETE FROM runs WHERE id = ?", (first,))
+    conn.close()
+
+
+def test_record_nccl_run_skips_empty(store):
+    empty = nccl_results.parse_nccl_stream([])
+    assert nccl_results.record_nccl_run(empty, ["n1"], "hopper") is None
+    assert store.query() == []
+
+
+def test_ingest_and_query_tools(monkeypatch, store):
+    monkeypatch.setattr(command_wrapper, "run_login_command", lambda cmd: SAMPLE)
+    result = nccl_results.ingest_nccl_output(
+        "/home/u/nccl_test.7.out", ["n1", "n2"], "graceblackwell", "7"
+    )
+    assert result["success"] is True
+    assert result["rows"] == 3
+    assert result["summary"]["peak_busbw_gbps"] == 936.93
+
+    report = nccl_results.query_nccl_results(sku="graceblackwell")
+    assert report["summary"]["runs"] == 1
+    assert report["runs"][0]["job_id"] == "7"
+
+
+def test_ingest_without_rows_fails(monkeypatch, store):
+    monkeypatch.setattr(command_wrapper, "run_login_command", lambda cmd: "empty")
+    result = nccl_results.ingest_nccl_output("/x.out", ["n1"], "hopper")
+    assert result["success"] is False
+    assert result["run_id"] is None
@@ -0,0 +1,137 @@
+"""Tests for structured NHC log ingestion."""
+
+import shlex
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.nhc as nhc
+import ai_infrastructure_mcp.tools.slurm_nodes as slurm_nodes
+import pytest
+
+PASS_LOG = """\
+Running health checks using /opt/azurehpc/test/azurehpc-health-checks/conf/nd-gb300-v6.conf
+SUCCESS:  nhc:  Health check passed:  check_gpu_count:  Expected 4 and found 4
+SUCCESS:  nhc:  Health check passed:  check_gpu_xid:  GPU Xid errors not detected
+Health checks completed with exit code: 0
+### Infiniband Firmware Version ###
+28.39.1002
+28.39.1002
+"""
+
+FAIL_LOG = """\
+Running health checks using /opt/azurehpc/test/azurehpc-health-checks/conf/nd-gb300-v6.conf
+SUCCESS:  nhc:  Health check passed:  check_gpu_count:  Expected 4 and found 4
+ERROR:  nhc:  Health check failed:  check_hw_ib:  No IB port mlx5_ib3:1 is ACTIVE (LinkUp 400 Gb/sec).
+Health checks completed with exit code: 1
+### Infiniband Firmware Version ###
+28.37.1014
+"""
+
+LOGS = {
+    "nhc/ccw-gpu-1.log": PASS_LOG,
+    "nhc/ccw-gpu-2.log": FAIL_LOG,
+    "nhc/ccw-gpu-3.log": PASS_LOG,
+    "nhc/ccw-gpu-4.log": "Error: nvidia-smi failed\n",
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(monkeypatch):
+    monkeypatch.setattr(nhc, "_NHC_CACHE", {})
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    calls = {"find": 0, "tail": [], "login": []}
+
+    def fake_login(cmd):
+        argv = shlex.split(cmd)
+        if argv[0] == "find":
+            calls["find"] += 1
+            return "\n".join(LOGS) + "\n"
+        calls["login"].append(cmd)
+        return ""
+
+    def fake_stream(cmd):
+        argv = shlex.split(cmd)
+        assert argv[:4] == ["tail", "-v", "-n", "+1"]
+        calls["tail"].append(argv[4:])
+        for path in argv[4:]:
+            yield f"==> {path} <=="
+            yield from LOGS[path].splitlines()
+            yield ""
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", fake_login)
+    monkeypatch.setattr(nhc, "run_login_command", fake_login)
+    monkeypatch.setattr(nhc, "stream_login_command", fake_stream)
+    return calls
+
+
+def test_parse_nhc_log():
+    node = nhc.parse_nhc_log(FAIL_LOG.splitlines())
+    assert node["status"] == "fail"
+    assert node["failed_checks"] == ["check_hw_ib"]
+    assert node["checks"][0] == {
+        "check": "check_gpu_count",
+        "result": "passed",
+        "message": "Expected 4 and found 4",
+    }
+    assert node["firmware"] == ["28.37.1014"]
+    assert nhc.parse_nhc_log(PASS_LOG.splitlines())["status"] == "pass"
+
+
+def test_report_ingests_once_in_parallel_batches(cluster):
+    report = nhc.nhc_report("nhc", parallelism=2)
+    assert sorted(sum(cluster["tail"], [])) == sorted(LOGS)
+    assert len(cluster["tail"]) == 2
+    assert [n["host"] for n in report["failed_nodes"]] == ["ccw-gpu-2", "ccw-gpu-4"]
+    assert report["check_failures"] == {"check_hw_ib": 1}
+    assert report["firmware_versions"] == {"28.39.1002": 2, "28.37.1014": 1}
+    assert report["summary"] == {"files": 4, "nodes": 4, "failed": 2, "passed": 2}
+    assert report["error"] is None
+
+    nhc.nhc_report("nhc")
+    assert cluster["find"] == 1
+    nhc.nhc_report("nhc", refresh=True)
+    assert cluster["find"] == 2
+
+
+def test_drain_uses_single_scontrol_call(cluster, monkeypatch):
+    commands = []
+
+    def fake_drain(cmd):
+        commands.append(cmd)
+        return (
+            "__scontrol_rc=0\n"
+            "ccw-gpu-2|drained|Health check failed\n"
+            "ccw-gpu-4|draining|Health check failed\n"
+        )
+
+    monkeypatch.setattr(slurm_nodes, "run_login_command", fake_drain)
+    report = nhc.nhc_report("nhc", action="drain")
+    assert len(commands) == 1
+    assert commands[0].startswith(
+        "scontrol update 'NodeName=ccw-gpu-[2,4]' State=DRAIN 'Reason=Health check failed';"
+    )
+    assert report["action"]["hosts"] == ["ccw-gpu-2", "ccw-gpu-4"]
+    assert report["action"]["success"] is True
+    assert report["action"]["not_applied"] == []
+
+
+def test_reboot_uses_single_parallel_ssh(cluster):
+    report = nhc.nhc_report("nhc", action="reboot")
+    assert len(cluster["login"]) == 1
+    assert cluster["login"][0].startswith('parallel-ssh -i -H "ccw-gpu-2 ccw-gpu-4"')
+    assert report["action"]["action"] == "reboot"
+
+
+def test_report_errors(monkeypatch):
+    with pytest.raises(ValueError):
+        nhc.nhc_report("nhc", action="replace")
+    monkeypatch.setattr(
+        command_wrapper,
+        "run_login_command",
+        lambda cmd: "\n[stderr]\nfind: 'nhc': No such file or directory",
+    )
+    report = nhc.nhc_report("nhc", action="drain")
+    assert "No such file" in report["error"]
+    assert report["action"] is None
@@ -0,0 +1,158 @@
+"""Tests for vectorized fleet outlier detection."""
+
+import time
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import numpy as np
+import pytest
+from ai_infrastructure_mcp.tools import nccl_results, outliers
+
+THERMAL_HEADER = (
+    "hostname,target,duration,serial,timestamp,name,index,temperature.gpu,"
+    "temperature.memory,temperature.gpu.tlimit,power.draw,clocks.sm,"
+    "clocks_throttle_reasons.active,utilization.gpu"
+)
+
+
+def _thermal_row(host, gpu, temp, tlimit, throttle):
+    return (
+        f"{host},1000,60, 1650, 2025/01/17 12:00:00.000, NVIDIA GB200, {gpu}, "
+        f"{temp}, 60, {tlimit}, 900.00 W, 1965 MHz, {throttle}, 100 %"
+    )
+
+
+@pytest.fixture(autouse=True)
+def result_store(monkeypatch, tmp_path):
+    store = nccl_results.NcclResultStore(str(tmp_path / "nccl.db"))
+    monkeypatch.setattr(nccl_results, "_STORE", store)
+    yield store
+    store.close()
+
+
+def test_score_fleet_methods():
+    values = [100.0, 100.5, 99.5] * 3 + [100.2, 98.0, 80.0]
+    t = outliers.Threshold(100, 96, 93)
+    scores = outliers.score_fleet(values, t)
+    assert scores.stats["count"] == 12
+    assert scores.stats["median"] == 100.0
+    assert scores.deviation_pct[-1] == pytest.approx(20.0)
+    assert scores.z[-1] < -3
+    assert outliers.STATUS_NAMES[scores.status[-1]] == "ghr"
+    assert scores.status[0] == outliers.OK
+    # 98 is only 2% below expected, but far from the median with a tight MAD.
+    assert scores.status[10] == outliers.WARN
+
+
+def test_score_fleet_small_fleet_skips_z_and_missing_is_ghr():
+    scores = outliers.score_fleet([10.0, 10.5, 9.5, 8.0, np.nan])
+    assert scores.status[-1] == outliers.GHR
+    # Below MIN_FLEET_FOR_Z only the modified z-score flags.
+    assert scores.status[3] == outliers.WARN
+    assert scores.status[1] == outliers.OK
+
+
+def test_rank_worst_first_lower_is_better():
+    scores = outliers.score_fleet([60.0, 61.0, 95.0, 62.0], higher_is_better=False)
+    assert scores.modified_z[2] < 0
+    assert outliers.rank(scores, higher_is_better=False)[0] == 2
+
+
+def test_gemm_csv_per_gpu_detail():
+    text = (
+        "hostname,gpu0,gpu1,gpu2,gpu3\n"
+        + "".join(
+            f"ccw-gpu-{i},1850000,1851000,1849000,1852000\n" for i in range(1, 12)
+        )
+        + "ccw-gpu-12,1850000,1700000,1849000,1852000\n"
+        + "ccw-gpu-13,1850000,1851000\n"
+    )
+    hosts, matrix = outliers.parse_gemm_csv(text)
+    assert matrix.shape == (13, 4)
+    report = outliers.analyze_gemm(hosts, matrix, "graceblackwell")
+    names = [o["name"] for o in report["outliers"]]
+    assert names[:2] == ["ccw-gpu-13", "ccw-gpu-12"]
+    bad = report["outliers"][1]
+    assert bad["status"] == "ghr"
+    assert bad["worst_gpu"] == 1
+    assert bad["gpu_status"] == ["ok", "ghr", "ok", "ok"]
+    assert report["outliers"][0]["gpu_gflops"][2] is None
+    assert report["summary"]["nodes"]["ghr"] == 2
+    assert report["summary"]["gpus"]["ghr"] == 3
+
+
+def test_gemm_values_are_scored_per_node():
+    values = {f"n{i}": 1_850_000 + i for i in range(10)}
+    values["n10"] = 769_000
+    values["n11"] = None
+    report = outliers.detect_outliers("gemm", values=values, sku="graceblackwell")
+    assert [o["name"] for o in report["outliers"]] == ["n11", "n10"]
+    assert [o["status"] for o in report["outliers"]] == ["ghr", "ghr"]
+    assert report["summary"]["nodes"]["ok"] == 10
+    assert report["fleet"]["count"] == 11
+
+
+def test_gemm_10k_gpus_is_fast():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(1_850_000, 5_000, size=(2500, 4))
+    matrix[17, 2] = 1_700_000
+    hosts = [f"ccw-gpu-{i}" for i in range(2500)]
+    start = time.perf_counter()
+    report = outliers.analyze_gemm(hosts, matrix, "graceblackwell")
+    assert time.perf_counter() - start < 1.0
+    assert report["outliers"][0]["name"] == "ccw-gpu-17"
+    assert report["gpu_fleet"]["count"] == 10000
+
+
+def test_nccl_values_and_store(result_store):
+    values = {f"rack-{i:03d}": 930.0 + i for i in range(6)}
+    values["rack-006"] = 700.0
+    values["rack-007"] = None
+    report = outliers.detect_outliers("nccl", values=values, sku="graceblackwell")
+    assert [o["name"] for o in report["outliers"]][:2] == ["rack-007", "rack-006"]
+    assert report["outliers"][1]["status"] == "warn"
+    assert report["summary"]["ghr"] == 1
+
+    row = " 17179869184 4294967296 float sum -1 18285.0 939.58 {} 0 18292.6 939.19 {} 0"
+    for hosts, busbw in ((["n1", "n2"], 936.0), (["n3", "n4"], 500.0)):
+        res = nccl_results.parse_nccl_stream([row.format(busbw, busbw)])
+        result_store.append(res, hosts, "graceblackwell", "1")
+    report = outliers.detect_outliers("nccl", sku="graceblackwell")
+    assert report["outliers"][0]["name"] == "n3,n4"
+    assert report["outliers"][0]["status"] == "ghr"
+
+
+def test_thermal_from_cluster_path(monkeypatch):
+    rows = [THERMAL_HEADER]
+    for host in ("n1", "n2"):
+        for gpu in range(4):
+            rows.append(_thermal_row(host, gpu, 60 + gpu, 25, "0x0000000000000000"))
+    rows.append(_thermal_row("n2", 3, 84, 0, "0x0000000000000020"))
+    commands = []
+
+    def fake(cmd):
+        commands.append(cmd)
+        return "\n".join(rows)
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", fake)
+    report = outliers.detect_outliers("thermal", path="validation/thermal")
+    assert commands[0].startswith("find validation/thermal -maxdepth 1")
+    top = report["outliers"][0]
+    assert top["name"] == "n2/gpu3"
+    assert top["status"] == "ghr"
+    assert top["thermal_slowdown"] is True
+    assert top["samples"] == 2
+    assert report["fleet"]["count"] == 8
+
+
+def test_detect_outliers_errors(monkeypatch):
+    with pytest.raises(ValueError):
+        outliers.detect_outliers("power")
+    with pytest.raises(ValueError):
+        outliers.detect_outliers("thermal")
+    monkeypatch.setattr(
+        command_wrapper,
+        "run_login_command",
+        lambda cmd: (_ for _ in ()).throw(RuntimeError("ssh failed")),
+    )
+    report = outliers.detect_outliers("gemm", path="missing.csv")
+    assert report["error"]
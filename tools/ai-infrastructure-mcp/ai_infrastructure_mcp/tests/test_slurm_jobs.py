@@ -0,0 +1,201 @@
+"""Tests for sbatch submission and the shared Slurm job watcher."""
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.slurm_jobs as slurm_jobs
+import pytest
+
+
+class FakeCluster:
+    """Minimal squeue/sacct/sbatch responder keyed by job id."""
+
+    def __init__(self, next_id=100):
+        self.next_id = next_id
+        self.states = {}
+        self.records = {}
+        self.commands = []
+
+    def finish(self, job_id, state="COMPLETED", exit_code="0:0"):
+        self.states.pop(job_id, None)
+        self.records[job_id] = "|".join(
+            [
+                job_id,
+                "nccl",
+                state,
+                exit_code,
+                "00:01:00",
+                "node[1-2]",
+                "/home/user",
+                "nccl_test.%j.out",
+                "/tmp/%x-%j.err",
+            ]
+        )
+
+    def __call__(self, cmd: str):
+        self.commands.append(cmd)
+        parts = cmd.split()
+        if parts[0] == "sbatch":
+            job_id = str(self.next_id)
+            self.next_id += 1
+            self.states[job_id] = "PENDING"
+            return f"Submitted batch job {job_id}\n"
+        ids = parts[parts.index("-j") + 1].split(",")
+        if parts[0] == "squeue":
+            return "".join(f"{j}|{self.states[j]}\n" for j in ids if j in self.states)
+        if parts[0] == "sacct":
+            return "".join(f"{self.records[j]}\n" for j in ids if j in self.records)
+        raise AssertionError(f"unexpected command {cmd}")
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    fake = FakeCluster()
+    monkeypatch.setattr(command_wrapper, "run_login_command", fake)
+    return fake
+
+
+@pytest.fixture
+def watcher(monkeypatch):
+    w = slurm_jobs.JobWatcher(poll_interval=0.01)
+    monkeypatch.setattr(slurm_jobs, "_WATCHER", w)
+    return w
+
+
+def test_parse_job_id_variants():
+    assert slurm_jobs.parse_job_id("Submitted batch job 42\n") == "42"
+    assert slurm_jobs.parse_job_id("42;cluster1\n") == "42"
+    assert slurm_jobs.parse_job_id("Running on 16 nodes\nSubmitted batch job 7") == "7"
+    assert slurm_jobs.parse_job_id("sbatch: error: invalid partition") is None
+
+
+def test_poll_once_batches_all_jobs(cluster):
+    w = slurm_jobs.JobWatcher()
+    cluster.states.update({"1": "RUNNING", "2": "PENDING", "3": "RUNNING"})
+    # Register futures without starting the background thread.
+    for j in ("1", "2", "3"):
+        w._futures[j] = slurm_jobs.Future()
+        w._states[j] = "PENDING"
+
+    w.poll_once()
+    assert cluster.commands == ["squeue -h -j 1,2,3 -o '%i|%T'"]
+    assert w.state("2") == "PENDING"
+
+    cluster.finish("1")
+    cluster.finish("3", state="FAILED", exit_code="2:0")
+    cluster.commands.clear()
+    w.poll_once()
+
+    assert len(cluster.commands) == 2
+    assert cluster.commands[1].startswith("sacct -X -n -P -j 1,3 ")
+    assert list(w._futures) == ["2"]
+
+
+def test_submit_and_watch_returns_exit_code_and_paths(monkeypatch, cluster, watcher):
+    cluster.next_id = 555
+
+    def complete_soon(cmd):
+        out = cluster(cmd)
+        if cmd.startswith("squeue") and "555" in cluster.states:
+            cluster.finish("555", state="FAILED", exit_code="1:0")
+        return out
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", complete_soon)
+    result = slurm_jobs.submit_and_watch(["--nodes=2", "nccl.slurm"], timeout=5)
+
+    assert result["success"] is True
+    assert result["job_id"] == "555"
+    assert result["command"] == "sbatch --nodes=2 nccl.slurm"
+    job = result["job"]
+    assert job["done"] is True
+    assert job["state"] == "FAILED"
+    assert job["exit_code"] == 1
+    assert job["stdout"] == "/home/user/nccl_test.555.out"
+    assert job["stderr"] == "/tmp/nccl-555.err"
+
+
+def test_submit_and_watch_unparsable_output(monkeypatch, watcher):
+    monkeypatch.setattr(
+        command_wrapper, "run_login_command", lambda cmd: "sbatch: error: bad"
+    )
+    result = slurm_jobs.submit_and_watch(["job.sh"])
+    assert result["success"] is False
+    assert result["job_id"] is None
+    assert "parse job id" in result["error"]
+
+
+def test_submit_without_wait_keeps_tracking(cluster, watcher):
+    result = slurm_jobs.submit_and_watch(["job.sh"], wait=False)
+    assert result["job"] == {"job_id": "100", "state": "PENDING", "done": False}
+
+    cluster.finish("100")
+    summary = slurm_jobs.watch_jobs(["100"], timeout=5)
+    assert summary["summary"] == {"watched": 1, "done": 1, "running": 0, "failed": 0}
+    assert summary["jobs"][0]["state"] == "COMPLETED"
+    assert summary["jobs"][0]["exit_code"] == 0
+
+
+def test_watch_jobs_timeout_reports_current_state(cluster, watcher):
+    cluster.states["9"] = "RUNNING"
+    result = slurm_jobs.watch_jobs(["9"], timeout=0.1)
+    assert result["summary"]["running"] == 1
+    assert result["jobs"][0] == {"job_id": "9", "state": "RUNNING", "done": False}
+    cluster.finish("9")
+    assert watcher.wait(["9"], timeout=5)["9"]["done"] is True
+
+
+def test_callback_notified_on_completion(cluster, watcher):
+    seen = []
+    cluster.states["11"] = "RUNNING"
+    future = watcher.watch("11", callback=seen.append)
+    cluster.finish("11", state="TIMEOUT", exit_code="0:15")
+    future.result(timeout=5)
+    assert seen[0]["state"] == "TIMEOUT"
+    assert seen[0]["signal"] == 15
+
+
+def test_missing_job_resolves_unknown(cluster, watcher, monkeypatch):
+    monkeypatch.setattr(slurm_jobs, "MAX_MISSING_POLLS", 2)
+    result = watcher.wait(["77"], timeout=5)["77"]
+    assert result == {"job_id": "77", "state": "UNKNOWN", "done": True}
+
+
+def test_squeue_failure_keeps_jobs_watched(cluster, monkeypatch):
+    w = slurm_jobs.JobWatcher()
+    w._futures["5"] = slurm_jobs.Future()
+    w._states["5"] = "RUNNING"
+    cluster.states["5"] = "RUNNING"
+    cluster.records["5"] = "5|nccl|RUNNING|0:0|00:00:10|node1|/home/user||"
+
+    def failing_squeue(cmd):
+        if cmd.startswith("squeue"):
+            return "\n[stderr]\nslurm_load_jobs error: Socket timed out"
+        return cluster(cmd)
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", failing_squeue)
+    w.poll_once()
+    assert not w._futures["5"].done()
+    assert not any(c.startswith("sacct") for c in cluster.commands)
+
+    # Even if squeue misses the job, a non-terminal sacct state is not final.
+    cluster.states.pop("5")
+    monkeypatch.setattr(command_wrapper, "run_login_command", cluster)
+    w.poll_once()
+    assert not w._futures["5"].done()
+    assert w.state("5") == "RUNNING"
+
+    cluster.finish("5")
+    w.poll_once()
+    assert w._futures.get("5") is None
+
+
+def test_purged_job_invalid_id_is_not_a_squeue_failure(monkeypatch):
+    monkeypatch.setattr(
+        command_wrapper,
+        "run_login_command",
+        lambda cmd: "\n[stderr]\nslurm_load_jobs error: Invalid job id specified",
+    )
+    assert slurm_jobs.query_active_jobs(["9"]) == {}
+
+
+def test_invalid_job_id_rejected(watcher):
+    with pytest.raises(ValueError):
+        slurm_jobs.watch_jobs(["12; rm -rf /"])
@@ -0,0 +1,66 @@
+"""Tests for batched drain / resume."""
+
+import ai_infrastructure_mcp.tools.slurm_nodes as slurm_nodes
+import pytest
+
+HOSTS = [f"ccw-gpu-{i}" for i in range(1, 201)]
+
+
+@pytest.fixture
+def login(monkeypatch):
+    calls = []
+
+    def install(output):
+        def fake(cmd):
+            calls.append(cmd)
+            return output
+
+        monkeypatch.setattr(slurm_nodes, "run_login_command", fake)
+        return calls
+
+    return install
+
+
+def test_drain_200_nodes_in_one_round_trip(login):
+    states = "".join(f"{h}|drained|NHC_fail_20250117\n" for h in HOSTS)
+    calls = login("__scontrol_rc=0\n" + states + HOSTS[0] + "|drained|dup\n")
+    result = slurm_nodes.drain_nodes(HOSTS, "NHC_fail_20250117")
+    assert len(calls) == 1
+    assert (
+        "'NodeName=ccw-gpu-[1-200]' State=DRAIN Reason=NHC_fail_20250117;" in calls[0]
+    )
+    assert "sinfo -h -N -n 'ccw-gpu-[1-200]'" in calls[0]
+    assert result["hostlist"] == "ccw-gpu-[1-200]"
+    assert result["success"] is True
+    assert result["summary"] == {"requested": 200, "applied": 200, "not_applied": 0}
+    assert result["nodes"][0]["reason"] == "NHC_fail_20250117"
+
+
+def test_drain_reports_nodes_not_drained(login):
+    login(
+        "__scontrol_rc=1\n"
+        "ccw-gpu-1|draining*|x\n"
+        "ccw-gpu-2|idle|none\n"
+        "\n[stderr]\nslurm_update error: Invalid node name specified"
+    )
+    result = slurm_nodes.drain_nodes(HOSTS[:3], "x")
+    assert result["success"] is False
+    assert result["not_applied"] == ["ccw-gpu-2", "ccw-gpu-3"]
+    assert result["nodes"][2]["state"] is None
+    assert "Invalid node name" in result["error"]
+
+
+def test_resume_nodes(login):
+    calls = login("__scontrol_rc=0\nccw-gpu-1|idle|none\nccw-gpu-2|mixed|none\n")
+    result = slurm_nodes.resume_nodes(HOSTS[:2])
+    assert "State=RESUME;" in calls[0]
+    assert "Reason" not in calls[0]
+    assert result["success"] is True
+    assert result["nodes"][0]["reason"] == ""
+
+
+def test_validation():
+    with pytest.raises(ValueError):
+        slurm_nodes.drain_nodes(HOSTS, " ")
+    with pytest.raises(ValueError):
+        slurm_nodes.resume_nodes(["bad host;rm"])
@@ -0,0 +1,115 @@
+"""Tests for the streaming thermal stress CSV analyzer."""
+
+import shlex
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.thermal as thermal
+import pytest
+
+HEADER = (
+    "{host},1004,900,serial, name, timestamp, index, temperature.gpu, "
+    "temperature.memory, temperature.gpu.tlimit, power.draw [W], "
+    "clocks.current.sm [MHz], clocks_throttle_reasons.active, utilization.gpu [%]"
+)
+
+
+def _row(host, gpu, second, temp=60, tlimit=25, sm=1965, throttle=0x0):
+    return (
+        f"{host},1004,900,1650923000001, NVIDIA GB200, 2025/01/17 12:00:{second:02d}.000, "
+        f"{gpu}, {temp}, 55, {tlimit}, 1100.50 W, {sm} MHz, 0x{throttle:016x}, 100 %"
+    )
+
+
+def _csv(host, rows):
+    return [HEADER.format(host=host)] + rows
+
+
+def test_stream_detects_intervals_and_clock_drops():
+    lines = _csv(
+        "n1",
+        [
+            _row("n1", 0, 0, throttle=0x1, sm=345),  # idle, ignored for clocks
+            _row("n1", 0, 1),
+            _row("n1", 0, 2, throttle=0x20, tlimit=3, sm=1700),
+            _row("n1", 0, 3, throttle=0x20, tlimit=1, sm=1500),
+            _row("n1", 0, 4),
+            _row("n1", 0, 5, throttle=0x40, tlimit=0),
+            _row("n1", 1, 1, throttle=0x4),
+        ],
+    )
+    gpus = thermal.analyze_thermal_stream(lines)
+    gpu0 = gpus[("n1", 0)].to_dict()
+    assert gpu0["samples"] == 6
+    assert gpu0["status"] == "fail"
+    assert gpu0["min_tlimit_c"] == 0
+    assert gpu0["min_sm_mhz"] == 1500
+    assert gpu0["clock_drop_samples"] == 2
+    assert gpu0["max_clock_drop_pct"] == pytest.approx(23.7)
+    assert gpu0["throttle_seconds"]["thermal"] == 3
+    assert gpu0["throttle_intervals"]["thermal"] == 2
+    first = gpu0["intervals"]["thermal"][0]
+    assert first["samples"] == 2
+    assert first["start"].endswith("12:00:02.000")
+    assert first["reasons"] == ["sw_thermal_slowdown"]
+    assert gpus[("n1", 1)].status == "warn"
+
+
+def test_interval_list_is_bounded():
+    rows = [
+        _row("n1", 0, s, throttle=0x8 if s % 2 else 0x0)
+        for s in range(2 * thermal.MAX_INTERVALS + 6)
+    ]
+    state = thermal.analyze_thermal_stream(rows)[("n1", 0)]
+    assert len(state.intervals["hw_slowdown"]) == thermal.MAX_INTERVALS
+    assert state.interval_counts["hw_slowdown"] == thermal.MAX_INTERVALS + 3
+
+
+def test_analyze_thermal_results_streams_files_in_parallel(monkeypatch):
+    files = {
+        "out/thermal_results.n1.csv": _csv("n1", [_row("n1", 0, 1), _row("n1", 1, 1)]),
+        "out/thermal_results.n2.csv": _csv(
+            "n2", [_row("n2", 0, 1, temp=91, throttle=0x40), _row("n2", 1, 1)]
+        ),
+        "out/thermal_results.n3.csv": None,
+    }
+    streamed = []
+
+    def fake_find(cmd):
+        assert shlex.split(cmd)[:2] == ["find", "out"]
+        return "\n".join(files) + "\n"
+
+    def fake_stream(cmd):
+        path = shlex.split(cmd)[1]
+        streamed.append(path)
+        if files[path] is None:
+            raise RuntimeError("cat: Permission denied")
+        yield from files[path]
+
+    monkeypatch.setattr(command_wrapper, "run_login_command", fake_find)
+    monkeypatch.setattr(thermal, "stream_login_command", fake_stream)
+
+    report = thermal.analyze_thermal_results("out", parallelism=2)
+
+    assert sorted(streamed) == sorted(files)
+    assert report["gpus"][0]["host"] == "n2"
+    assert report["gpus"][0]["status"] == "fail"
+    summary = report["summary"]
+    assert summary["files"] == 3
+    assert summary["file_errors"] == 1
+    assert summary["gpus"] == 4
+    assert summary["fail"] == 1
+    assert summary["pass"] == 3
+    assert summary["failed_hosts"] == ["n2"]
+    assert summary["max_temp_c"] == 91
+
+
+def test_analyze_thermal_results_no_files(monkeypatch):
+    monkeypatch.setattr(
+        command_wrapper,
+        "run_login_command",
+        lambda cmd: "\n[stderr]\nfind: 'missing': No such file or directory",
+    )
+    report = thermal.analyze_thermal_results("missing")
+    assert "No such file" in report["error"]
+    with pytest.raises(ValueError):
+        thermal.analyze_thermal_results("out", parallelism=0)
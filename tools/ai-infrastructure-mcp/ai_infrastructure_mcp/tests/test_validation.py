@@ -0,0 +1,254 @@
+"""Tests for the per-rack validation sweep orchestrator."""
+
+import shlex
+
+import ai_infrastructure_mcp.tools.command_wrapper as command_wrapper
+import ai_infrastructure_mcp.tools.nccl_results as nccl_results
+import ai_infrastructure_mcp.tools.slurm_jobs as slurm_jobs
+import ai_infrastructure_mcp.tools.validation as validation
+import pytest
+
+RACK_A = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
+RACK_B = "b2c3d4e5-f6a7-8901-bcde-f12345678901"
+
+NCCL_OUT = """\
+#       size         count      type   redop    root     time   algbw   busbw #wrong     time   algbw   busbw #wrong
+  8589934592    2147483648     float     sum      -1   9300.0  923.60  920.10      0   9301.0  923.50  920.00      0
+ 17179869184    4294967296     float     sum      -1  18285.0  939.58  936.93      0  18292.6  939.19  936.54      0
+# Out of bounds values : 0 OK
+# Avg bus bandwidth    : 487.265
+"""
+
+
+class FakeCluster:
+    """Responds to discovery, sinfo, submission, squeue/sacct and output reads."""
+
+    def __init__(self, uuids, idle=100, gpu_name="NVIDIA GB300"):
+        self.uuids = uuids
+        self.idle = idle
+        self.gpu_name = gpu_name
+        self.next_id = 1000
+        self.jobs = {}
+        self.commands = []
+        self.max_running = 0
+
+    def _discovery(self, cmd):
+        hosts = cmd.split('-H "', 1)[1].split('"', 1)[0].split()
+        out = []
+        for i, host in enumerate(hosts, start=1):
+            out.append(f"[{i}] 12:00:00 [SUCCESS] {host}")
+            out.append(f"name={self.gpu_name}")
+            out.append("gpus=4")
+            if self.uuids.get(host):
+                out.append(f"uuid={self.uuids[host]}")
+        return "\n".join(out)
+
+    def _submit(self, argv):
+        job_id = str(self.next_id)
+        self.next_id += 1
+        name = next(a for a in argv if a.startswith("--job-name=")).split("=", 1)[1]
+        chdir = next(a for a in argv if a.startswith("--chdir=")).split("=", 1)[1]
+        hosts = argv[argv.index("-w") + 1].split(",")
+        self.jobs[job_id] = {"name": name, "chdir": chdir, "hosts": hosts, "argv": argv}
+        running = sum(1 for j in self.jobs.values() if "done" not in j)
+        self.max_running = max(self.max_running, running)
+        if argv[0] == "bash":
+            return (
+                f"=== NCCL all_reduce test launcher ===\nSubmitted batch job {job_id}\n"
+            )
+        return f"Submitted batch job {job_id}\n"
+
+    def __call__(self, cmd):
+        self.commands.append(cmd)
+        if cmd.startswith("parallel-ssh"):
+            return self._discovery(cmd)
+        argv = shlex.split(cmd)
+        if argv[0] == "sinfo":
+            return f"{self.idle}|idle\n3|drain\n"
+        if argv[0] == "mkdir":
+            return ""
+        if argv[0] in ("sbatch", "bash"):
+            return self._submit(argv)
+        if argv[0] == "squeue":
+            # Every job finishes as soon as it is polled.
+            for job_id in argv[argv.index("-j") + 1].split(","):
+                self.jobs[job_id]["done"] = True
+            return ""
+        if argv[0] == "sacct":
+            rows = []
+            for job_id in argv[argv.index("-j") + 1].split(","):
+                job = self.jobs[job_id]
+                rows.append(
+                    f"{job_id}|{job['name']}|COMPLETED|0:0|00:02:00|x|/home/u|"
+                    f"/home/u/{job['chdir']}/out.{job_id}|"
+                )
+            return "\n".join(rows)
+        if argv[0] == "cat":
+            job_id = argv[1].rsplit(".", 1)[1]
+            job = self.jobs[job_id]
+            if "validate-nccl" in job["name"]:
+                return NCCL_OUT
+            header = "hostname," + ",".join(f"gpu{i}_gflops" for i in range(4))
+            rows = [f"{h},1850000,1849000,1700000,1851000" for h in job["hosts"]]
+            return "\n".join([header, *rows])
+        if argv[0] == "find":
+            return (
+                "==> thermal_results.n1.csv <==\n"
+                "n1,1004,900,serial, name, timestamp, index, temperature.gpu, "
+                "temperature.memory, temperature.gpu.tlimit, power.draw [W], "
+                "clocks.current.sm [MHz], clocks_throttle_reasons.active, utilization.gpu [%]\n"
+                "n1,1004,900,123, NVIDIA GB300, 2025/01/01 00:00:00, 0, 70, 60, 18, "
+                "1100.5 W, 1980 MHz, 0x0000000000000000, 100 %\n"
+                "n1,1004,900,123, NVIDIA GB300, 2025/01/01 00:00:01, 0, 82, 61, 6, "
+                "1180.0 W, 1800 MHz, 0x0000000000000020, 100 %\n"
+            )
+        raise AssertionError(f"unexpected command {cmd}")
+
+
+@pytest.fixture
+def watcher(monkeypatch):
+    w = slurm_jobs.JobWatcher(poll_interval=0.01)
+    monkeypatch.setattr(slurm_jobs, "_WATCHER", w)
+    return w
+
+
+@pytest.fixture(autouse=True)
+def result_store(monkeypatch, tmp_path):
+    store = nccl_results.NcclResultStore(str(tmp_path / "nccl.db"))
+    monkeypatch.setattr(nccl_results, "_STORE", store)
+    yield store
+    store.close()
+
+
+def install(monkeypatch, cluster):
+    monkeypatch.setattr(validation, "run_login_command", cluster)
+    monkeypatch.setattr(command_wrapper, "run_login_command", cluster)
+
+
+def test_parse_nccl_output_peak_and_average():
+    parsed = validation.parse_nccl_output(NCCL_OUT)
+    assert parsed == {
+        "peak_size_bytes": 17179869184,
+        "peak_busbw_gbps": 936.93,
+        "avg_busbw_gbps": 487.265,
+        "wrong": 0,
+    }
+
+
+def test_discover_nodes_rejects_zero_uuid(monkeypatch):
+    cluster = FakeCluster({"n1": RACK_A, "n2": "00000000-0000-0000-0000-000000000000"})
+    install(monkeypatch, cluster)
+    nodes = validation.discover_nodes(["n1", "n2", "n3"])
+    assert nodes["n1"]["cluster_uuid"] == RACK_A
+    assert nodes["n1"]["sku"] == "graceblackwell"
+    assert nodes["n2"]["cluster_uuid"] is None
+    assert len(cluster.commands) == 1
+
+
+def test_sweep_groups_by_rack_and_collects_results(monkeypatch, watcher, result_store):
+    uuids = {"n1": RACK_A, "n2": RACK_A, "n3": RACK_B, "n4": RACK_B, "n5": None}
+    cluster = FakeCluster(uuids)
+    install(monkeypatch, cluster)
+
+    report = validation.run_validation_sweep(
+        ["n1", "n2", "n3", "n4", "n5"], tests=["nccl", "gpu"], output_dir="out"
+    )
+
+    racks = {r["label"]: r for r in report["racks"]}
+    assert set(racks) == {"rack-001", "rack-002", "unassigned"}
+    assert racks["rack-001"]["hosts"] == ["n1", "n2"]
+    assert racks["rack-001"]["rack_id"] == RACK_A
+    assert racks["rack-001"]["expected_size"] == 18
+
+    nccl = racks["rack-001"]["tests"]["nccl"]
+    assert nccl["state"] == "COMPLETED"
+    assert nccl["peak_busbw_gbps"] == 936.93
+    assert nccl["status"] == "ok"
+    assert "--sku graceblackwell" in nccl["command"]
+    assert "-w n1,n2" in nccl["command"]
+
+    gpu = racks["rack-002"]["tests"]["gpu"]
+    assert [n["host"] for n in gpu["nodes"]] == ["n3", "n4"]
+    assert gpu["nodes"][0]["min_gflops"] == 1700000
+    # 1700 TFlops is below the GB300 GHR threshold (1720 TFlops).
+    assert gpu["nodes"][0]["status"] == "ghr"
+    assert "--gpus-per-node=4" in gpu["command"]
+
+    # No NCCL for nodes outside an MNNVL domain, but per-node tests still run.
+    assert racks["unassigned"]["tests"]["nccl"]["state"] == "SKIPPED"
+    assert racks["unassigned"]["tests"]["gpu"]["state"] == "COMPLETED"
+
+    assert report["summary"]["jobs_submitted"] == 5
+    assert report["summary"]["jobs_completed"] == 5
+    assert report["summary"]["jobs_failed"] == 0
+    assert report["summary"]["partition_capacity"] == 100
+    mkdirs = [c for c in cluster.commands if c.startswith("mkdir")]
+    assert len(mkdirs) == 1
+
+    # NCCL runs are appended to the result store keyed by node set and SKU.
+    stored = result_store.query(sku="graceblackwell")
+    assert sorted(r["node_set"] for r in stored) == ["n1,n2", "n3,n4"]
+    assert stored[0]["busbw_gbps"] == 936.93
+
+
+def test_sweep_respects_concurrency_cap(monkeypatch, watcher):
+    uuids = {f"n{i}": f"{i // 2 + 1:08d}-0000-0000-0000-000000000000" for i in range(8)}
+    cluster = FakeCluster(uuids)
+    install(monkeypatch, cluster)
+
+    report = validation.run_validation_sweep(
+        list(uuids), tests=["gpu"], max_concurrent_jobs=2, output_dir="out"
+    )
+    assert report["summary"]["jobs_completed"] == 4
+    assert cluster.max_running <= 2
+
+
+def test_sweep_respects_partition_capacity(monkeypatch, watcher):
+    uuids = {f"n{i}": f"{i // 2 + 1:08d}-0000-0000-0000-000000000000" for i in range(6)}
+    cluster = FakeCluster(uuids, idle=2)
+    install(monkeypatch, cluster)
+
+    report = validation.run_validation_sweep(
+        list(uuids), tests=["gpu"], output_dir="out"
+    )
+    assert report["summary"]["jobs_completed"] == 3
+    # Each rack uses 2 nodes, so only one job fits at a time.
+    assert cluster.max_running == 1
+
+
+def test_sweep_thermal_summary(monkeypatch, watcher):
+    cluster = FakeCluster({"n1": RACK_A})
+    install(monkeypatch, cluster)
+    report = validation.run_validation_sweep(
+        ["n1"], tests=["thermal"], output_dir="out"
+    )
+    thermal = report["racks"][0]["tests"]["thermal"]
+    assert thermal["nodes"] == [
+        {
+            "host": "n1",
+            "samples": 2,
+            "max_temp_c": 82.0,
+            "min_tlimit_c": 6.0,
+            "max_power_w": 1180.0,
+            "slowdown_samples": 1,
+            "status": "fail",
+        }
+    ]
+
+
+def test_sweep_rejects_unknown_test():
+    with pytest.raises(ValueError):
+        validation.run_validation_sweep(["n1"], tests=["hpl"])
+
+
+def test_thermal_power_cap_alone_is_not_a_failure():
+    text = (
+        "n1,1004,900,123, NVIDIA GB300, 2025/01/01 00:00:00, 0, 75, 60, 10, "
+        "1200.0 W, 1900 MHz, 0x0000000000000004, 100 %\n"
+        "n1,1004,900,123, NVIDIA GB300, 2025/01/01 00:00:00, 1, 70, 60, 12, "
+        "1100.0 W, 1980 MHz, 0x0000000000000000, 100 %\n"
+    )
+    (node,) = validation.parse_thermal_output(text)
+    assert node["samples"] == 2
+    assert node["slowdown_samples"] == 0
+    assert node["status"] == "warn"
@@ -1,5 +1,8 @@
+import json
+import threading
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
 from ai_infrastructure_mcp.ssh_config import run_login_command
 
@@ -15,9 +18,41 @@ from .command_wrapper import (
 # - Simplified approach using grep and cut instead of complex sed
 _INNER_PHYSICAL_HOST_CMD = 'test -f /var/lib/hyperv/.kvp_pool_3 && tr -d "\\0" < /var/lib/hyperv/.kvp_pool_3 | grep -o "Qualified[^V]*VirtualMachineDynamic" | sed "s/Qualified//;s/VirtualMachineDynamic//" | head -1 || echo ""'
 
-# Command to extract the VMSS ID from Azure Instance Metadata Service
-# Uses curl to query the metadata endpoint and jq to extract the compute.name field
-_INNER_VMSS_ID_CMD = 'curl -H "Metadata: true" "http://169.254.169.254/metadata/instance?api-version=2025-04-07&format=json" 2>/dev/null | jq -r .compute.name 2>/dev/null || echo ""'
+# Azure Instance Metadata Service (IMDS) instance document endpoint.
+_IMDS_URL = (
+    "http://169.254.169.254/metadata/instance?api-version=2025-04-07&format=json"
+)
+
+# Command to fetch the full IMDS instance document in a single request. Every
+# metadata field is read from this one document, so callers never need a second
+# round trip per field. curl errors are kept on stdout so they can be reported.
+_INNER_IMDS_CMD = (
+    f'curl -sS --noproxy "*" -H "Metadata: true" "{_IMDS_URL}" 2>&1 || echo ""'
+)
+
+# Seconds a fetched IMDS document is reused before the host is queried again.
+IMDS_CACHE_TTL_SECONDS = 300
+
+# Hosts per parallel-ssh invocation and concurrent SSH connections per
+# invocation. Batches run one after another, so at most IMDS_PARALLELISM hosts
+# are contacted at once even when sweeping thousands of hosts.
+IMDS_BATCH_SIZE = 256
+IMDS_PARALLELISM = 32
+
+# host -> (monotonic fetch time, IMDS instance document)
+_IMDS_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_IMDS_CACHE_LOCK = threading.Lock()
+
+# Output field -> path inside the IMDS instance document.
+_IMDS_FIELDS = {
+    "vmss_id": ("compute", "name"),
+    "vm_size": ("compute", "vmSize"),
+    "zone": ("compute", "zone"),
+    "placement_group_id": ("compute", "placementGroupId"),
+    "vm_scale_set_name": ("compute", "vmScaleSetName"),
+    "location": ("compute", "location"),
+    "resource_id": ("compute", "resourceId"),
+}
 
 
 def get_physical_hostnames(hosts: List[str]) -> Dict[str, Any]:
@@ -78,64 +113,188 @@ def get_physical_hostnames(hosts: List[str]) -> Dict[str, Any]:
         }
 
 
-def get_vmss_id(hosts: List[str]) -> Dict[str, Any]:
-    """Retrieve the Azure VMSS (Virtual Machine Scale Set) ID for the given list of VM hosts via parallel-ssh.
+def _imds_field(doc: Dict[str, Any], path: Tuple[str, ...]) -> str:
+    value: Any = doc
+    for key in path:
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(key)
+    return "" if value is None else str(value)
+
+
+def _imds_tags(doc: Dict[str, Any]) -> Dict[str, str]:
+    """Return compute tags as a dict, preferring the structured tagsList."""
+    compute = doc.get("compute") or {}
+    tags_list = compute.get("tagsList")
+    if isinstance(tags_list, list):
+        return {
+            str(t.get("name")): str(t.get("value", ""))
+            for t in tags_list
+            if isinstance(t, dict) and t.get("name")
+        }
+    tags: Dict[str, str] = {}
+    for item in str(compute.get("tags") or "").split(";"):
+        if item:
+            name, _, value = item.partition(":")
+            tags[name] = value
+    return tags
+
+
+def _parse_imds_response(lines: List[str]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Parse one host's parallel-ssh output into (document, error)."""
+    text = "".join(lines).strip()
+    if not text:
+        return None, "Empty response from metadata service"
+    if not text.startswith("{"):
+        return None, text
+    try:
+        doc = json.loads(text)
+    except ValueError as e:
+        return None, f"Invalid metadata document: {e}"
+    if not isinstance(doc, dict):
+        return None, "Invalid metadata document"
+    return doc, ""
+
+
+class _ImdsFetch(NamedTuple):
+    docs: Dict[str, Dict[str, Any]]  # host -> IMDS instance document
+    errors: Dict[str, str]  # host -> error message
+    cached: Set[str]  # hosts served from the cache
+    responded: Set[str]  # hosts that answered (from cache or live)
+    fatal: Optional[str]  # parallel-ssh / SSH failure, if any
 
-    Queries the Azure Instance Metadata Service endpoint to extract the compute.name field,
-    which contains the VMSS instance name that can be used to correlate with Azure Monitor data.
+
+def _fetch_imds_documents(hosts: List[str], refresh: bool = False) -> _ImdsFetch:
+    """Return IMDS documents for hosts, querying only hosts without a fresh cache entry.
+
+    Stale or missing hosts are fetched in batches of IMDS_BATCH_SIZE with at most
+    IMDS_PARALLELISM concurrent SSH connections. Only successful documents are cached.
+    """
+    now = time.monotonic()
+    docs: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    cached: Set[str] = set()
+    responded: Set[str] = set()
+    to_fetch: List[str] = []
+    with _IMDS_CACHE_LOCK:
+        for h in dict.fromkeys(hosts):
+            entry = _IMDS_CACHE.get(h)
+            if entry and not refresh and now - entry[0] < IMDS_CACHE_TTL_SECONDS:
+                docs[h] = entry[1]
+                cached.add(h)
+            else:
+                to_fetch.append(h)
+
+    fatal: Optional[str] = None
+    for i in range(0, len(to_fetch), IMDS_BATCH_SIZE):
+        batch = to_fetch[i : i + IMDS_BATCH_SIZE]
+        full_cmd = build_parallel_ssh_command(
+            batch, _INNER_IMDS_CMD, parallelism=IMDS_PARALLELISM
+        )
+        try:
+            parsed = parse_parallel_ssh_output(run_login_command(full_cmd))
+        except Exception as e:
+            fatal = str(e)
+            for h in batch:
+                errors[h] = fatal
+            continue
+        fetched_at = time.monotonic()
+        for h in batch:
+            if h not in parsed:
+                errors[h] = "No response from host"
+                continue
+            responded.add(h)
+            doc, err = _parse_imds_response(parsed[h])
+            if doc is None:
+                errors[h] = err
+                continue
+            docs[h] = doc
+            with _IMDS_CACHE_LOCK:
+                _IMDS_CACHE[h] = (fetched_at, doc)
+    return _ImdsFetch(docs, errors, cached, responded | cached, fatal)
+
+
+def get_vm_metadata(hosts: List[str], refresh: bool = False) -> Dict[str, Any]:
+    """Retrieve Azure instance metadata (IMDS) fields for the given list of VM hosts.
+
+    The full IMDS instance document is fetched once per host via parallel-ssh and
+    cached for IMDS_CACHE_TTL_SECONDS; all fields are read from that cached copy.
 
     Args:
         hosts: List of VM hostnames to query (must be non-empty, validated)
+        refresh: Ignore cached documents and query IMDS again.
 
     Returns:
-        Dict with version, timestamp, hosts[], summary similar to pkeys tool.
-        Each host entry: { "host": <name>, "vmss_id": <string or empty>, "error": <optional error> }
+        Dict with version, timestamp, hosts[], summary.
+        Each host entry: { "host", "vmss_id", "vm_size", "zone", "placement_group_id",
+        "vm_scale_set_name", "location", "resource_id", "tags", "cached", "error"? }
     """
     _validate_hosts(hosts)
-    full_cmd = build_parallel_ssh_command(hosts, _INNER_VMSS_ID_CMD)
+    fetch = _fetch_imds_documents(hosts, refresh)
+    docs, errors, cached = fetch.docs, fetch.errors, fetch.cached
 
-    try:
-        raw = run_login_command(full_cmd)
-        parsed = parse_parallel_ssh_output(raw)
-        host_entries = []
+    host_entries = []
+    for h in dict.fromkeys(hosts):
+        doc = docs.get(h)
+        entry: Dict[str, Any] = {"host": h}
+        for field, path in _IMDS_FIELDS.items():
+            entry[field] = _imds_field(doc, path) if doc else ""
+        entry["tags"] = _imds_tags(doc) if doc else {}
+        entry["cached"] = h in cached
+        if h in errors:
+            entry["error"] = errors[h]
+        host_entries.append(entry)
 
-        for h, lines in parsed.items():
-            # Expect either one (possibly empty) line; join just in case multiple lines produced
-            vmss_id = "".join(lines).strip()
-            entry = {
-                "host": h,
-                "vmss_id": vmss_id,
-            }
-            # If the result contains error indicators, note them
-            if (
-                "curl:" in vmss_id.lower()
-                or "jq:" in vmss_id.lower()
-                or vmss_id == "null"
-            ):
-                entry["error"] = (
-                    vmss_id
-                    if vmss_id != "null"
-                    else "Failed to retrieve VMSS ID from metadata service"
-                )
-                entry["vmss_id"] = ""
-            host_entries.append(entry)
+    ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    summary: Dict[str, Any] = {
+        "queried": len(fetch.responded),
+        "cached": len(cached),
+        "fetched": len(docs) - len(cached),
+        "failed": len(errors),
+    }
+    if fetch.fatal:
+        summary["error"] = fetch.fatal
+    return {
+        "version": 1,
+        "timestamp": ts,
+        "hosts": host_entries,
+        "summary": summary,
+    }
 
-        ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        return {
-            "version": 1,
-            "timestamp": ts,
-            "hosts": host_entries,
-            "summary": {"queried": len(parsed)},
-        }
-    except Exception as e:
-        # If the command fails entirely, return error info
-        ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        return {
-            "version": 1,
-            "timestamp": ts,
-            "hosts": [{"host": h, "vmss_id": "", "error": str(e)} for h in hosts],
-            "summary": {"queried": 0, "error": str(e)},
-        }
+
+def get_vmss_id(hosts: List[str], refresh: bool = False) -> Dict[str, Any]:
+    """Retrieve the Azure VMSS (Virtual Machine Scale Set) ID for the given list of VM hosts via parallel-ssh.
+
+    Reads the compute.name field from the (cached) Azure Instance Metadata Service
+    instance document, which contains the VMSS instance name that can be used to
+    correlate with Azure Monitor data.
+
+    Args:
+        hosts: List of VM hostnames to query (must be non-empty, validated)
+        refresh: Ignore cached documents and query IMDS again.
+
+    Returns:
+        Dict with version, timestamp, hosts[], summary similar to pkeys tool.
+        Each host entry: { "host": <name>, "vmss_id": <string or empty>, "error": <optional error> }
+    """
+    metadata = get_vm_metadata(hosts, refresh)
+    host_entries = []
+    for m in metadata["hosts"]:
+        entry = {"host": m["host"], "vmss_id": m["vmss_id"]}
+        if "error" in m:
+            entry["error"] = m["error"]
+        elif not m["vmss_id"]:
+            entry["error"] = "Failed to retrieve VMSS ID from metadata service"
+        host_entries.append(entry)
+    summary = {"queried": metadata["summary"]["queried"]}
+    if "error" in metadata["summary"]:
+        summary["error"] = metadata["summary"]["error"]
+    return {
+        "version": 1,
+        "timestamp": metadata["timestamp"],
+        "hosts": host_entries,
+        "summary": summary,
+    }
 
 
-__all__ = ["get_physical_hostnames", "get_vmss_id"]
+__all__ = ["get_physical_hostnames", "get_vm_metadata", "get_vmss_id"]
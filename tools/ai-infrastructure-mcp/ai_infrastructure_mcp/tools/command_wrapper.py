@@ -47,18 +47,28 @@ def parse_parallel_ssh_output(output: str) -> Dict[str, List[str]]:
     return result
 
 
-def build_parallel_ssh_command(hosts: List[str], inner_command: str) -> str:
+def build_parallel_ssh_command(
+    hosts: List[str], inner_command: str, parallelism: Optional[int] = None
+) -> str:
     """Build a safe parallel-ssh invocation string.
 
     Hosts are validated against a conservative regex. The inner command is assumed
     to be a trusted string (callers should not pass user input that includes shell
     metacharacters unless it is from a constant).
+
+    parallelism caps the number of concurrent SSH connections (parallel-ssh -p);
+    when omitted the parallel-ssh default applies.
     """
     safe_hosts = _validate_hosts(hosts)
     host_str = " ".join(safe_hosts)
     # Escape any embedded double quotes in inner command
     inner_escaped = inner_command.replace('"', '\\"')
-    return f'parallel-ssh -i -H "{host_str}" "{inner_escaped}"'
+    par_opt = ""
+    if parallelism is not None:
+        if parallelism < 1:
+            raise ValueError("parallelism must be >= 1")
+        par_opt = f" -p {int(parallelism)}"
+    return f'parallel-ssh -i -H "{host_str}"{par_opt} "{inner_escaped}"'
 
 
 def run_parallel_ssh(hosts: List[str], cmd_parts: List[str]) -> Dict[str, Any]:
@@ -0,0 +1,101 @@
+"""Slurm hostlist expressions: compress host names into ccw-gpu-[1-4,7] and back.
+
+Implements the subset of Slurm's hostlist syntax produced and accepted by
+scontrol/sinfo for flat node names: a prefix followed by one bracketed list of
+numbers and ranges, zero padding preserved (node[001-003]).
+"""
+
+import re
+from itertools import groupby
+from typing import Dict, List, Tuple
+
+_NUMBERED_RE = re.compile(r"^(?P<prefix>.*?)(?P<num>\d+)$")
+_RANGE_RE = re.compile(r"^(?P<lo>\d+)(?:-(?P<hi>\d+))?$")
+
+
+def _ranges(numbers: List[int]) -> List[Tuple[int, int]]:
+    ranges: List[Tuple[int, int]] = []
+    # Consecutive numbers share the same (value - position) key.
+    for _, run in groupby(enumerate(numbers), key=lambda p: p[1] - p[0]):
+        values = [v for _, v in run]
+        ranges.append((values[0], values[-1]))
+    return ranges
+
+
+def compress(hosts: List[str]) -> str:
+    """Compress host names into a Slurm hostlist expression.
+
+    Hosts are grouped by prefix and zero-padded width; duplicates are dropped.
+    compress(["ccw-gpu-1", "ccw-gpu-2", "ccw-gpu-3", "ccw-gpu-7"]) returns
+    "ccw-gpu-[1-3,7]".
+    """
+    groups: Dict[Tuple[str, int], List[int]] = {}
+    plain: List[str] = []
+    for host in dict.fromkeys(hosts):
+        m = _NUMBERED_RE.match(host)
+        if not m:
+            plain.append(host)
+            continue
+        digits = m.group("num")
+        width = len(digits) if digits.startswith("0") and len(digits) > 1 else 0
+        groups.setdefault((m.group("prefix"), width), []).append(int(digits))
+
+    parts = list(plain)
+    for (prefix, width), numbers in groups.items():
+        numbers = sorted(set(numbers))
+        fmt = f"{{:0{width}d}}" if width else "{}"
+        if len(numbers) == 1:
+            parts.append(prefix + fmt.format(numbers[0]))
+            continue
+        spans = [
+            fmt.format(lo) if lo == hi else f"{fmt.format(lo)}-{fmt.format(hi)}"
+            for lo, hi in _ranges(numbers)
+        ]
+        parts.append(f"{prefix}[{','.join(spans)}]")
+    return ",".join(parts)
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(expr):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return [p for p in parts if p]
+
+
+def expand(expr: str) -> List[str]:
+    """Expand a Slurm hostlist expression into host names, in order.
+
+    Raises ValueError for malformed expressions.
+    """
+    hosts: List[str] = []
+    for part in _split_top_level(expr.strip()):
+        if "[" not in part:
+            hosts.append(part)
+            continue
+        prefix, _, rest = part.partition("[")
+        body, sep, suffix = rest.partition("]")
+        if not sep:
+            raise ValueError(f"unbalanced brackets in hostlist: {expr}")
+        for span in body.split(","):
+            m = _RANGE_RE.match(span.strip())
+            if not m:
+                raise ValueError(f"invalid range '{span}' in hostlist: {expr}")
+            lo, hi = m.group("lo"), m.group("hi") or m.group("lo")
+            if int(hi) < int(lo):
+                raise ValueError(f"descending range '{span}' in hostlist: {expr}")
+            width = len(lo) if lo.startswith("0") and len(lo) > 1 else 0
+            for n in range(int(lo), int(hi) + 1):
+                # A suffix may hold further brackets (rack[1-2]-gpu[1-4]).
+                for tail in expand(suffix) if suffix else [""]:
+                    hosts.append(f"{prefix}{n:0{width}d}{tail}")
+    return hosts
+
+
+__all__ = ["compress", "expand"]
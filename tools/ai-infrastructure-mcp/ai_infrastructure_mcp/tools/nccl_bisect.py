@@ -0,0 +1,266 @@
+"""Automated NCCL bisection to isolate bad nodes in a failing group.
+
+Implements the algorithm from skills/slurm/nccl_performance_diagnosis/SKILL.md:
+split the failing group in two, test both halves concurrently, keep passing
+halves as known-good and recurse only into failing halves. Groups of 2-3 nodes
+become suspects, and every suspect is paired with a different known-good node in
+one final parallel round. Every round submits all of its NCCL jobs at once, so
+an 18-node rack is resolved in about log2(N) + 1 rounds.
+"""
+
+import posixpath
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .command_wrapper import _validate_hosts, run_simple_command
+from .nccl_results import parse_nccl_stream, record_nccl_run
+from .sku_baselines import classify, nccl_threshold
+from .slurm_jobs import get_job_watcher, parse_job_id
+from .validation import _validations_dir, discover_nodes
+
+# Bisection test settings (nccl_allreduce_test skill, "Bisection test").
+NCCL_BISECT_ARGS = ["--begin-size", "8G", "--end-size", "16G", "--iters", "20"]
+
+# Groups at or below this size are not split further but tested pairwise.
+MAX_SUSPECT_GROUP = 3
+
+# Runs one NCCL test per node group concurrently and returns the peak busbw
+# (GB/s) for each group, or None when the job failed or produced no result.
+TestRunner = Callable[[List[List[str]]], List[Optional[float]]]
+
+
+class SlurmNcclRunner:
+    """Submit nccl_test.sh jobs for a round of groups and wait for all of them."""
+
+    def __init__(
+        self,
+        sku: str,
+        partition: str = "gpu",
+        output_dir: Optional[str] = None,
+        timeout: Optional[float] = 1800,
+    ):
+        self.sku = sku
+        self.partition = partition
+        self.output_dir = output_dir or (
+            "nccl-bisect-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        )
+        self.timeout = timeout
+        self.jobs: List[Dict[str, Any]] = []
+        self._dir_ready = False
+
+    def _ensure_output_dir(self) -> None:
+        if self._dir_ready:
+            return
+        result = run_simple_command("mkdir", ["-p", self.output_dir])
+        if not result["success"]:
+            raise RuntimeError(f"Failed to create {self.output_dir}: {result['error']}")
+        self._dir_ready = True
+
+    def __call__(self, groups: List[List[str]]) -> List[Optional[float]]:
+        self._ensure_output_dir()
+        script = posixpath.join(_validations_dir(), "NCCL", "nccl_test.sh")
+        watcher = get_job_watcher()
+        futures = []
+        for group in groups:
+            result = run_simple_command(
+                "bash",
+                [
+                    script,
+                    "--sku",
+                    self.sku,
+                    *NCCL_BISECT_ARGS,
+                    "-p",
+                    self.partition,
+                    "-N",
+                    str(len(group)),
+                    "-w",
+                    ",".join(group),
+                    f"--chdir={self.output_dir}",
+                    "--job-name=nccl-bisect",
+                ],
+            )
+            job_id = parse_job_id(result["raw_output"]) if result["success"] else None
+            self.jobs.append({"hosts": group, "job_id": job_id})
+            futures.append(watcher.watch(job_id) if job_id else None)
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        busbw: List[Optional[float]] = []
+        for group, future in zip(groups, futures):
+            if future is None:
+                busbw.append(None)
+                continue
+            remaining = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                job = future.result(timeout=remaining)
+            except Exception:
+                busbw.append(None)
+                continue
+            if job.get("state") != "COMPLETED" or not job.get("stdout"):
+                busbw.append(None)
+                continue
+            out = run_simple_command("cat", [job["stdout"]])
+            if not out["success"]:
+                busbw.append(None)
+                continue
+            parsed = parse_nccl_stream(out["raw_output"].splitlines())
+            record_nccl_run(parsed, group, self.sku, job["job_id"], job["stdout"])
+            busbw.append(parsed.summary()["peak_busbw_gbps"])
+        return busbw
+
+
+def _split(group: List[str]) -> List[List[str]]:
+    mid = len(group) // 2
+    return [group[:mid], group[mid:]]
+
+
+def bisect(hosts: List[str], runner: TestRunner, min_busbw: float) -> Dict[str, Any]:
+    """Isolate nodes that make NCCL busbw drop below min_busbw.
+
+    Args:
+        hosts: The failing group, in the order it should be split
+        runner: Runs one round of concurrent group tests (see TestRunner)
+        min_busbw: A group passes when its busbw is >= this value
+
+    Returns:
+        Dict with rounds[] (groups tested and their busbw/pass), bad_nodes,
+        known_good, unresolved (suspects that could not be paired, and hosts
+        of groups whose test produced no result) and interaction_failures
+        (groups whose halves both passed).
+
+    A test that returns no busbw (job failed, timed out or wrote no output)
+    says nothing about the nodes: its group is neither recursed into nor
+    blamed, and its hosts are reported as unresolved.
+    """
+    rounds: List[Dict[str, Any]] = []
+    known_good: List[str] = []
+    suspects: List[str] = []
+    unresolved: List[str] = []
+    interaction_failures: List[List[str]] = []
+
+    def run_round(kind: str, groups: List[List[str]]) -> List[Optional[bool]]:
+        busbw = runner(groups)
+        passed = [None if v is None else v >= min_busbw for v in busbw]
+        tests = []
+        for g, v, p in zip(groups, busbw, passed):
+            test = {"hosts": g, "busbw_gbps": v, "passed": p}
+            if p is None:
+                test["error"] = "no result"
+            tests.append(test)
+        rounds.append({"round": len(rounds) + 1, "kind": kind, "tests": tests})
+        return passed
+
+    frontier = [list(hosts)]
+    while frontier:
+        halves: List[List[str]] = []
+        for group in frontier:
+            if len(group) <= MAX_SUSPECT_GROUP:
+                suspects.extend(group)
+            else:
+                halves.extend(_split(group))
+        if not halves:
+            break
+        passed = run_round("split", halves)
+        frontier = []
+        for i in range(0, len(halves), 2):
+            pair = halves[i : i + 2]
+            for half, ok in zip(pair, passed[i : i + 2]):
+                if ok is None:
+                    unresolved.extend(half)
+                elif ok:
+                    known_good.extend(half)
+                else:
+                    frontier.append(half)
+            if all(ok is True for ok in passed[i : i + 2]):
+                interaction_failures.append(pair[0] + pair[1])
+
+    bad_nodes: List[str] = []
+    if suspects and known_good:
+        # Each suspect gets a different known-good partner where possible.
+        pairs = [[s, known_good[i % len(known_good)]] for i, s in enumerate(suspects)]
+        passed = run_round("pairwise", pairs)
+        for (suspect, _), ok in zip(pairs, passed):
+            if ok is None:
+                unresolved.append(suspect)
+            elif ok:
+                known_good.append(suspect)
+            else:
+                bad_nodes.append(suspect)
+    else:
+        unresolved.extend(suspects)
+
+    return {
+        "rounds": rounds,
+        "bad_nodes": bad_nodes,
+        "known_good": known_good,
+        "unresolved": unresolved,
+        "interaction_failures": interaction_failures,
+    }
+
+
+def bisect_nccl(
+    hosts: List[str],
+    sku: Optional[str] = None,
+    partition: str = "gpu",
+    scope: Optional[str] = None,
+    min_busbw: Optional[float] = None,
+    output_dir: Optional[str] = None,
+    timeout: Optional[float] = 1800,
+) -> Dict[str, Any]:
+    """Bisect a failing NCCL group on the cluster and report the bad nodes.
+
+    Args:
+        hosts: Nodes of the failing group (e.g. one MNNVL rack)
+        sku: NCCL config name (graceblackwell, hopper); detected when omitted
+        partition: Slurm partition for the test jobs
+        scope: Baseline scope (intra_rack, inter_rack, full); default per SKU
+        min_busbw: Pass threshold in GB/s; default is the SKU warn threshold
+        output_dir: Cluster directory for job outputs
+        timeout: Seconds to wait for each round of jobs
+
+    Returns:
+        Dict with version, timestamp, sku, min_busbw, rounds[], bad_nodes,
+        known_good, unresolved, interaction_failures, jobs[] and summary.
+    """
+    safe_hosts = _validate_hosts(hosts)
+    if len(safe_hosts) < 2:
+        raise ValueError("bisection needs at least 2 hosts")
+    if sku is None:
+        skus = {n["sku"] for n in discover_nodes(safe_hosts).values() if n["sku"]}
+        if len(skus) != 1:
+            raise ValueError("could not detect a single SKU for hosts; pass sku")
+        sku = skus.pop()
+    threshold = nccl_threshold(sku, scope)
+    if min_busbw is None:
+        min_busbw = threshold.warn
+
+    ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    runner = SlurmNcclRunner(sku, partition, output_dir, timeout)
+    result = bisect(safe_hosts, runner, min_busbw)
+    for rnd in result["rounds"]:
+        for test in rnd["tests"]:
+            if test["passed"] is None:
+                test["status"] = None
+            else:
+                test["status"] = classify(test["busbw_gbps"], threshold)
+    return {
+        "version": 1,
+        "timestamp": ts,
+        "sku": sku,
+        "min_busbw": min_busbw,
+        "output_dir": runner.output_dir,
+        **result,
+        "jobs": runner.jobs,
+        "summary": {
+            "hosts": len(safe_hosts),
+            "rounds": len(result["rounds"]),
+            "jobs": len(runner.jobs),
+            "bad": len(result["bad_nodes"]),
+            "unresolved": len(result["unresolved"]),
+        },
+    }
+
+
+__all__ = ["SlurmNcclRunner", "bisect", "bisect_nccl"]
@@ -0,0 +1,443 @@
+"""nccl-tests output parsing and an append-only busbw result store.
+
+parse_nccl_stream reads all_reduce_perf (or any nccl-tests binary) output one
+line at a time into typed columns, so large sweeps never need the full text in
+memory. NcclResultStore appends parsed runs to SQLite, keyed by node set, SKU
+config, date and message size, for fleet-wide trend and regression queries.
+"""
+
+import os
+import sqlite3
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .command_wrapper import _validate_hosts, run_simple_command
+
+# Path of the SQLite result store on the machine running the MCP server.
+ENV_NCCL_RESULTS_DB = "NCCL_RESULTS_DB"
+DEFAULT_NCCL_RESULTS_DB = os.path.join("~", ".ai-infrastructure-mcp", "nccl_results.db")
+
+# Value stored in the #wrong columns when data checking is off (nccl-tests "N/A").
+WRONG_NOT_CHECKED = -1
+
+
+# Per-size columns, in nccl-tests output order.
+RESULT_COLUMNS = (
+    "size",
+    "count",
+    "type",
+    "redop",
+    "root",
+    "oop_time_us",
+    "oop_algbw",
+    "oop_busbw",
+    "oop_wrong",
+    "ip_time_us",
+    "ip_algbw",
+    "ip_busbw",
+    "ip_wrong",
+)
+
+
+class NcclResults:
+    """Columnar nccl-tests results: one entry per message size row.
+
+    Numeric columns are array.array instances (int64 "q" / float64 "d");
+    out-of-place columns are prefixed oop_, in-place columns ip_.
+    """
+
+    def __init__(self) -> None:
+        self.size = array("q")
+        self.count = array("q")
+        self.type: List[str] = []
+        self.redop: List[str] = []
+        self.root = array("q")
+        self.oop_time_us = array("d")
+        self.oop_algbw = array("d")
+        self.oop_busbw = array("d")
+        self.oop_wrong = array("q")
+        self.ip_time_us = array("d")
+        self.ip_algbw = array("d")
+        self.ip_busbw = array("d")
+        self.ip_wrong = array("q")
+        self.avg_busbw: Optional[float] = None
+        self.out_of_bounds: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.size)
+
+    def columns(self) -> List[Sequence[Any]]:
+        """Columns in RESULT_COLUMNS order."""
+        return [getattr(self, name) for name in RESULT_COLUMNS]
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Yield one dict per message size row."""
+        for row in zip(*self.columns()):
+            yield dict(zip(RESULT_COLUMNS, row))
+
+    def summary(self) -> Dict[str, Any]:
+        """Peak busbw at the largest message size, average busbw and total #wrong."""
+        peak_size: Optional[int] = None
+        peak_busbw: Optional[float] = None
+        if self.size:
+            peak_size = max(self.size)
+            peak_busbw = max(
+                max(oop, ip)
+                for size, oop, ip in zip(self.size, self.oop_busbw, self.ip_busbw)
+                if size == peak_size
+            )
+        wrong = sum(w for w in self.oop_wrong if w > 0)
+        wrong += sum(w for w in self.ip_wrong if w > 0)
+        return {
+            "peak_size_bytes": peak_size,
+            "peak_busbw_gbps": peak_busbw,
+            "avg_busbw_gbps": self.avg_busbw,
+            "wrong": wrong,
+        }
+
+
+def _wrong(value: str) -> int:
+    return WRONG_NOT_CHECKED if value == "N/A" else int(value)
+
+
+def parse_nccl_stream(lines: Iterable[str]) -> NcclResults:
+    """Parse nccl-tests output from any iterable of lines (file, socket, list).
+
+    Data rows have 13 columns: size count type redop root, then time, algbw,
+    busbw and #wrong for out-of-place and in-place. Rows that do not match
+    (NCCL INFO/WARN lines, srun prefixes, truncated output) are skipped.
+    """
+    res = NcclResults()
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        if line[0] == "#":
+            if line.startswith("# Avg bus bandwidth"):
+                try:
+                    res.avg_busbw = float(line.rsplit(":", 1)[1])
+                except (IndexError, ValueError):
+                    pass
+            elif line.startswith("# Out of bounds values"):
+                try:
+                    res.out_of_bounds = int(line.split(":", 1)[1].split()[0])
+                except (IndexError, ValueError):
+                    pass
+            continue
+        if not line[0].isdigit():
+            continue
+        parts = line.split()
+        if len(parts) != 13:
+            continue
+        try:
+            values = (
+                int(parts[0]),
+                int(parts[1]),
+                int(parts[4]),
+                float(parts[5]),
+                float(parts[6]),
+                float(parts[7]),
+                _wrong(parts[8]),
+                float(parts[9]),
+                float(parts[10]),
+                float(parts[11]),
+                _wrong(parts[12]),
+            )
+        except ValueError:
+            continue
+        res.size.append(values[0])
+        res.count.append(values[1])
+        res.type.append(parts[2])
+        res.redop.append(parts[3])
+        res.root.append(values[2])
+        res.oop_time_us.append(values[3])
+        res.oop_algbw.append(values[4])
+        res.oop_busbw.append(values[5])
+        res.oop_wrong.append(values[6])
+        res.ip_time_us.append(values[7])
+        res.ip_algbw.append(values[8])
+        res.ip_busbw.append(values[9])
+        res.ip_wrong.append(values[10])
+    return res
+
+
+def parse_nccl_output(text: str) -> Dict[str, Any]:
+    """Summarize nccl-tests output text (see NcclResults.summary)."""
+    return parse_nccl_stream(text.splitlines()).summary()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    node_set TEXT NOT NULL,
+    num_nodes INTEGER NOT NULL,
+    job_id TEXT,
+    source TEXT,
+    avg_busbw REAL,
+    wrong INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    size INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    redop TEXT NOT NULL,
+    root INTEGER NOT NULL,
+    oop_time_us REAL NOT NULL,
+    oop_algbw REAL NOT NULL,
+    oop_busbw REAL NOT NULL,
+    oop_wrong INTEGER NOT NULL,
+    ip_time_us REAL NOT NULL,
+    ip_algbw REAL NOT NULL,
+    ip_busbw REAL NOT NULL,
+    ip_wrong INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_sku_date ON runs (sku, date);
+CREATE INDEX IF NOT EXISTS runs_node_set ON runs (node_set, date);
+CREATE INDEX IF NOT EXISTS results_size ON results (size, run_id);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE TRIGGER IF NOT EXISTS runs_no_update BEFORE UPDATE ON runs
+    BEGIN SELECT RAISE(ABORT, 'nccl result store is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS runs_no_delete BEFORE DELETE ON runs
+    BEGIN SELECT RAISE(ABORT, 'nccl result store is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS results_no_update BEFORE UPDATE ON results
+    BEGIN SELECT RAISE(ABORT, 'nccl result store is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS results_no_delete BEFORE DELETE ON results
+    BEGIN SELECT RAISE(ABORT, 'nccl result store is append-only'); END;
+"""
+
+
+def node_set_key(hosts: List[str]) -> str:
+    """Canonical node set key: sorted, de-duplicated, comma-joined host names."""
+    return ",".join(sorted(set(hosts)))
+
+
+class NcclResultStore:
+    """Append-only SQLite store of parsed nccl-tests runs."""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.getenv(ENV_NCCL_RESULTS_DB) or DEFAULT_NCCL_RESULTS_DB
+        self.path = os.path.expanduser(path)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(
+        self,
+        results: NcclResults,
+        hosts: List[str],
+        sku: str,
+        job_id: Optional[str] = None,
+        source: Optional[str] = None,
+        date: Optional[str] = None,
+    ) -> int:
+        """Store one run and its per-size rows; returns the run id."""
+        now = datetime.now(timezone.utc)
+        summary = results.summary()
+        names = RESULT_COLUMNS
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (recorded_at, date, sku, node_set, num_nodes,"
+                " job_id, source, avg_busbw, wrong) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    now.isoformat().replace("+00:00", "Z"),
+                    date or now.strftime("%Y-%m-%d"),
+                    sku,
+                    node_set_key(hosts),
+                    len(set(hosts)),
+                    job_id,
+                    source,
+                    summary["avg_busbw_gbps"],
+                    summary["wrong"],
+                ),
+            )
+            run_id = int(cur.lastrowid)
+            self._conn.executemany(
+                f"INSERT INTO results (run_id, {', '.join(names)}) "
+                f"VALUES (?{', ?' * len(names)})",
+                ((run_id, *row) for row in zip(*results.columns())),
+            )
+        return run_id
+
+    def query(
+        self,
+        sku: Optional[str] = None,
+        hosts: Optional[List[str]] = None,
+        size: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Return per-run busbw rows (newest first) matching the filters.
+
+        When size is omitted each run reports its largest message size.
+        busbw is the better of out-of-place and in-place at that size.
+        """
+        where = []
+        params: List[Any] = []
+        if sku:
+            where.append("r.sku = ?")
+            params.append(sku)
+        if hosts:
+            where.append("r.node_set = ?")
+            params.append(node_set_key(hosts))
+        if since:
+            where.append("r.date >= ?")
+            params.append(since)
+        if until:
+            where.append("r.date <= ?")
+            params.append(until)
+        if size is not None:
+            where.append("x.size = ?")
+            params.append(size)
+        else:
+            where.append("x.size = (SELECT MAX(size) FROM results WHERE run_id = r.id)")
+        sql = (
+            "SELECT r.id, r.date, r.recorded_at, r.sku, r.node_set, r.num_nodes,"
+            " r.job_id, x.size, MAX(x.oop_busbw, x.ip_busbw), x.oop_algbw,"
+            " r.avg_busbw, r.wrong"
+            " FROM runs r JOIN results x ON x.run_id = r.id"
+            f" WHERE {' AND '.join(where)}"
+            " ORDER BY r.date DESC, r.id DESC LIMIT ?"
+        )
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = (
+            "run_id",
+            "date",
+            "recorded_at",
+            "sku",
+            "node_set",
+            "num_nodes",
+            "job_id",
+            "size",
+            "busbw_gbps",
+            "algbw_gbps",
+            "avg_busbw_gbps",
+            "wrong",
+        )
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_STORE: Optional[NcclResultStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store() -> NcclResultStore:
+    """Return the process-wide result store (opened on first use)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = NcclResultStore()
+        return _STORE
+
+
+def record_nccl_run(
+    results: NcclResults,
+    hosts: List[str],
+    sku: Optional[str],
+    job_id: Optional[str] = None,
+    source: Optional[str] = None,
+) -> Optional[str]:
+    """Append a run to the shared store; returns an error message instead of raising."""
+    if not sku or not len(results):
+        return None
+    try:
+        get_result_store().append(results, hosts, sku, job_id, source)
+    except Exception as e:  # The store must never break a test run.
+        return f"Failed to record NCCL results: {e}"
+    return None
+
+
+def ingest_nccl_output(
+    path: str, hosts: List[str], sku: str, job_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Parse an nccl-tests output file on the cluster and append it to the store.
+
+    Args:
+        path: Output file on the cluster (e.g. nccl_test.1234.out)
+        hosts: Node set the test ran on
+        sku: NCCL config name (graceblackwell, hopper)
+        job_id: Optional Slurm job id for reference
+    """
+    safe_hosts = _validate_hosts(hosts)
+    result = run_simple_command("cat", [path])
+    response: Dict[str, Any] = {
+        "version": 1,
+        "success": False,
+        "path": path,
+        "run_id": None,
+        "rows": 0,
+        "summary": None,
+        "error": result["error"],
+    }
+    if not result["success"]:
+        return response
+    parsed = parse_nccl_stream(
+        result["raw_output"].split("[stderr]", 1)[0].splitlines()
+    )
+    response["rows"] = len(parsed)
+    response["summary"] = parsed.summary()
+    if not len(parsed):
+        response["error"] = "No nccl-tests result rows found"
+        return response
+    try:
+        response["run_id"] = get_result_store().append(
+            parsed, safe_hosts, sku, job_id, source=path
+        )
+    except Exception as e:
+        response["error"] = str(e)
+        return response
+    response["success"] = True
+    return response
+
+
+def query_nccl_results(
+    sku: Optional[str] = None,
+    hosts: Optional[List[str]] = None,
+    size: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """Query stored NCCL runs (see NcclResultStore.query)."""
+    if hosts:
+        _validate_hosts(hosts)
+    runs = get_result_store().query(sku, hosts, size, since, until, limit)
+    busbw = [r["busbw_gbps"] for r in runs if r["busbw_gbps"] is not None]
+    return {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "runs": runs,
+        "summary": {
+            "runs": len(runs),
+            "min_busbw_gbps": min(busbw) if busbw else None,
+            "max_busbw_gbps": max(busbw) if busbw else None,
+            "mean_busbw_gbps": sum(busbw) / len(busbw) if busbw else None,
+        },
+    }
+
+
+__all__ = [
+    "NcclResultStore",
+    "NcclResults",
+    "get_result_store",
+    "ingest_nccl_output",
+    "parse_nccl_output",
+    "parse_nccl_stream",
+    "query_nccl_results",
+    "record_nccl_run",
+]
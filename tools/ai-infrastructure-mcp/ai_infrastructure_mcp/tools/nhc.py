@@ -0,0 +1,272 @@
+"""Structured ingestion of Node Health Check (NHC) logs.
+
+infrastructure_validations/slurm/NHC/nhc.slurm writes one `<hostname>.log` per
+node containing the azurehpc-health-checks output followed by an
+"### Infiniband Firmware Version ###" section. All logs are read once (a few
+SSH sessions, each streaming a batch of files) into a per-node table of check
+results, error lines and firmware versions. Failed-node lists, firmware
+histograms and per-check failure counts are all answered from that table, and
+drain / reboot actions are issued for all failed nodes in a single call.
+"""
+
+import posixpath
+import re
+import shlex
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ai_infrastructure_mcp.ssh_config import run_login_command, stream_login_command
+
+from .command_wrapper import build_parallel_ssh_command, run_simple_command
+from .slurm_nodes import drain_nodes
+
+DEFAULT_LOG_PATTERN = "*.log"
+DEFAULT_PARALLELISM = 4
+DEFAULT_DRAIN_REASON = "Health check failed"
+NHC_ACTIONS = ("drain", "reboot")
+
+# Seconds an ingested log directory is reused before it is read again.
+NHC_CACHE_TTL_SECONDS = 300
+
+FIRMWARE_MARKER = "### Infiniband Firmware Version ###"
+
+# e.g. "ERROR:  nhc:  Health check failed:  check_hw_ib:  No IB port is ACTIVE"
+_CHECK_RE = re.compile(
+    r"^\s*(?:[A-Z]+:\s+)?nhc:\s+Health check (?P<result>passed|failed):\s+"
+    r"(?:(?P<check>check_[\w.-]+):\s*)?(?P<message>.*)$"
+)
+_FIRMWARE_RE = re.compile(r"^\d+\.\d+\.\d+$")
+# Same failure criterion as collect_failed.sh.
+_ERROR_RE = re.compile(r"ERROR|Error")
+_BANNER_RE = re.compile(r"^==> (?P<path>.+) <==$")
+
+# directory -> (monotonic ingest time, ingest result)
+_NHC_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_NHC_CACHE_LOCK = threading.Lock()
+
+
+def parse_nhc_log(lines: Iterable[str]) -> Dict[str, Any]:
+    """Parse one node's NHC log into checks, error lines and firmware versions."""
+    checks: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    firmware: List[str] = []
+    in_firmware = False
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        if line == FIRMWARE_MARKER:
+            in_firmware = True
+            continue
+        if in_firmware and _FIRMWARE_RE.match(line):
+            firmware.append(line)
+            continue
+        m = _CHECK_RE.match(line)
+        if m:
+            checks.append(
+                {
+                    "check": m.group("check") or "nhc",
+                    "result": m.group("result"),
+                    "message": m.group("message").strip(),
+                }
+            )
+        if _ERROR_RE.search(line):
+            errors.append(line)
+    failed_checks = sorted({c["check"] for c in checks if c["result"] == "failed"})
+    return {
+        "status": "fail" if errors or failed_checks else "pass",
+        "checks": checks,
+        "failed_checks": failed_checks,
+        "errors": errors,
+        "firmware": sorted(set(firmware)),
+    }
+
+
+def _host_from_path(path: str) -> str:
+    name = posixpath.basename(path)
+    return name[:-4] if name.endswith(".log") else name
+
+
+def _stream_batch(files: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
+    """Stream a batch of logs through one `tail -v` and parse them per file."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    current: Optional[str] = None
+    lines: List[str] = []
+
+    def flush() -> None:
+        if current is not None:
+            nodes[_host_from_path(current)] = {"log": current, **parse_nhc_log(lines)}
+
+    cmd = " ".join(["tail", "-v", "-n", "+1", *(shlex.quote(f) for f in files)])
+    try:
+        for line in stream_login_command(cmd):
+            m = _BANNER_RE.match(line)
+            if m:
+                flush()
+                current, lines = m.group("path"), []
+            else:
+                lines.append(line)
+    except Exception as e:
+        flush()
+        return nodes, str(e)
+    flush()
+    return nodes, None
+
+
+def ingest_nhc_logs(
+    path: str,
+    pattern: str = DEFAULT_LOG_PATTERN,
+    parallelism: int = DEFAULT_PARALLELISM,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Read every NHC log in a directory once into a per-node table.
+
+    Returns a dict with path, nodes (host -> log, status, checks, failed_checks,
+    errors, firmware), files, errors and ingested_at. Results are cached per
+    directory for NHC_CACHE_TTL_SECONDS unless refresh is set.
+    """
+    if parallelism < 1:
+        raise ValueError("parallelism must be >= 1")
+    key = f"{path}\0{pattern}"
+    now = time.monotonic()
+    if not refresh:
+        with _NHC_CACHE_LOCK:
+            cached = _NHC_CACHE.get(key)
+        if cached and now - cached[0] < NHC_CACHE_TTL_SECONDS:
+            return cached[1]
+
+    listing = run_simple_command("find", [path, "-maxdepth", "1", "-name", pattern])
+    if not listing["success"]:
+        return {"path": path, "nodes": {}, "files": 0, "errors": [listing["error"]]}
+    out, _, err = listing["raw_output"].partition("\n[stderr]\n")
+    files = sorted(line.strip() for line in out.splitlines() if line.strip())
+    if not files:
+        message = err.strip() or f"no {pattern} files found in {path}"
+        return {"path": path, "nodes": {}, "files": 0, "errors": [message]}
+
+    batches = [files[i::parallelism] for i in range(min(parallelism, len(files)))]
+    nodes: Dict[str, Dict[str, Any]] = {}
+    errors: List[str] = []
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        for batch_nodes, error in pool.map(_stream_batch, batches):
+            nodes.update(batch_nodes)
+            if error:
+                errors.append(error)
+
+    result = {
+        "path": path,
+        "nodes": dict(sorted(nodes.items())),
+        "files": len(files),
+        "errors": errors,
+        "ingested_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    }
+    if not errors:
+        with _NHC_CACHE_LOCK:
+            _NHC_CACHE[key] = (now, result)
+    return result
+
+
+def failed_nodes(nodes: Dict[str, Dict[str, Any]]) -> List[str]:
+    return [h for h, n in nodes.items() if n["status"] == "fail"]
+
+
+def firmware_histogram(nodes: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """Number of nodes reporting each InfiniBand firmware version."""
+    counts = Counter(v for n in nodes.values() for v in n["firmware"])
+    return dict(counts.most_common())
+
+
+def check_failure_counts(nodes: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """Number of nodes failing each NHC check."""
+    counts = Counter(c for n in nodes.values() for c in n["failed_checks"])
+    return dict(counts.most_common())
+
+
+def reboot_failed(hosts: List[str]) -> Dict[str, Any]:
+    """Reboot all hosts with a single parallel-ssh invocation."""
+    cmd = build_parallel_ssh_command(hosts, "sudo reboot")
+    try:
+        raw = run_login_command(cmd)
+    except Exception as e:
+        return {"success": False, "command": cmd, "raw_output": "", "error": str(e)}
+    return {"success": True, "command": cmd, "raw_output": raw, "error": None}
+
+
+def nhc_report(
+    path: str,
+    action: Optional[str] = None,
+    reason: str = DEFAULT_DRAIN_REASON,
+    pattern: str = DEFAULT_LOG_PATTERN,
+    parallelism: int = DEFAULT_PARALLELISM,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Summarize NHC logs and optionally drain or reboot the failed nodes.
+
+    Args:
+        path: Directory with the per-node NHC logs (nhc.slurm working directory)
+        action: None, "drain" or "reboot" (applied to all failed nodes at once)
+        reason: Slurm drain reason
+        pattern: Log file glob inside path
+        parallelism: SSH sessions used to stream the logs
+        refresh: Re-read logs even if this directory was ingested recently
+
+    Returns:
+        Dict with version, timestamp, path, failed_nodes[] (host, failed_checks,
+        errors), check_failures, firmware_versions, action, summary and error.
+    """
+    if action is not None and action not in NHC_ACTIONS:
+        raise ValueError(f"unsupported action: {action}. Supported: drain, reboot")
+    table = ingest_nhc_logs(path, pattern, parallelism, refresh)
+    nodes = table["nodes"]
+    failed = failed_nodes(nodes)
+    response: Dict[str, Any] = {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "path": path,
+        "failed_nodes": [
+            {
+                "host": h,
+                "failed_checks": nodes[h]["failed_checks"],
+                "errors": nodes[h]["errors"],
+            }
+            for h in failed
+        ],
+        "check_failures": check_failure_counts(nodes),
+        "firmware_versions": firmware_histogram(nodes),
+        "action": None,
+        "summary": {
+            "files": table["files"],
+            "nodes": len(nodes),
+            "failed": len(failed),
+            "passed": len(nodes) - len(failed),
+        },
+        "error": "; ".join(table["errors"]) or None,
+    }
+    if action and failed:
+        result = (
+            drain_nodes(failed, reason) if action == "drain" else reboot_failed(failed)
+        )
+        response["action"] = {
+            "action": action,
+            "hosts": failed,
+            "success": result["success"],
+            "command": result["command"],
+            "error": result["error"],
+        }
+        if action == "drain":
+            response["action"]["not_applied"] = result["not_applied"]
+    return response
+
+
+__all__ = [
+    "check_failure_counts",
+    "failed_nodes",
+    "firmware_histogram",
+    "ingest_nhc_logs",
+    "nhc_report",
+    "parse_nhc_log",
+]
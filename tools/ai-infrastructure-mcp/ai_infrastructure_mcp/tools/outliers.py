@@ -0,0 +1,406 @@
+"""Vectorized fleet outlier detection for GEMM, NCCL and thermal results.
+
+Implements the methods from skills/slurm/cluster_outlier_detection/SKILL.md
+(absolute threshold, z-score, median/MAD modified z-score and deviation from
+expected) with NumPy so a fleet of 10k+ GPUs is scored in a few milliseconds.
+Thresholds come from sku_baselines.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .command_wrapper import run_simple_command
+from .nccl_results import get_result_store
+from .sku_baselines import BASELINES, Threshold, get_baseline, nccl_threshold
+from .thermal import analyze_thermal_stream
+
+# Status codes, ordered by severity.
+STATUS_NAMES = ("ok", "monitor", "warn", "ghr")
+OK, MONITOR, WARN, GHR = range(4)
+
+# z-score bands from the skill: monitor below -1.5, investigate below -2.0.
+MONITOR_Z = -1.5
+DEFAULT_Z_THRESHOLD = -2.0
+
+# Plain z-scores need enough samples to be meaningful; smaller fleets rely on
+# the median/MAD modified z-score only.
+MIN_FLEET_FOR_Z = 10
+
+KINDS = ("gemm", "nccl", "thermal")
+
+
+class FleetScores(NamedTuple):
+    value: np.ndarray
+    deviation_pct: np.ndarray
+    z: np.ndarray
+    modified_z: np.ndarray
+    status: np.ndarray
+    stats: Dict[str, Optional[float]]
+
+
+def score_fleet(
+    values: Sequence[float],
+    threshold: Optional[Threshold] = None,
+    higher_is_better: bool = True,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+) -> FleetScores:
+    """Score every value against the fleet and an optional SKU threshold.
+
+    z and modified_z are oriented so that negative always means worse than the
+    fleet, whatever the metric direction. Missing values (NaN) are GHR.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    sign = 1.0 if higher_is_better else -1.0
+    valid = np.isfinite(x)
+    xv = x[valid]
+    n = int(xv.size)
+
+    stats: Dict[str, Optional[float]] = {
+        "count": n,
+        "mean": None,
+        "std": None,
+        "min": None,
+        "max": None,
+        "median": None,
+        "mad": None,
+    }
+    z = np.zeros_like(x)
+    mz = np.zeros_like(x)
+    if n:
+        mean = float(xv.mean())
+        std = float(xv.std(ddof=1)) if n > 1 else 0.0
+        median = float(np.median(xv))
+        mad = float(np.median(np.abs(xv - median)))
+        stats.update(
+            mean=mean,
+            std=std,
+            min=float(xv.min()),
+            max=float(xv.max()),
+            median=median,
+            mad=mad,
+        )
+        if std > 0:
+            z = sign * (x - mean) / std
+        if mad > 0:
+            mz = sign * 0.6745 * (x - median) / mad
+
+    status = np.zeros(x.shape, dtype=np.int8)
+    if n >= MIN_FLEET_FOR_Z:
+        status[z < MONITOR_Z] = MONITOR
+        status[z < z_threshold] = WARN
+    status[mz < z_threshold] = WARN
+
+    deviation = np.full(x.shape, np.nan)
+    if threshold is not None:
+        deviation = sign * (threshold.expected - x) / threshold.expected * 100.0
+        worse_than = (lambda t: x < t) if higher_is_better else (lambda t: x > t)
+        status = np.maximum(status, np.where(worse_than(threshold.warn), WARN, OK))
+        status = np.maximum(status, np.where(worse_than(threshold.ghr), GHR, OK))
+    status[~valid] = GHR
+    return FleetScores(x, deviation, z, mz, status.astype(np.int8), stats)
+
+
+def rank(scores: FleetScores, higher_is_better: bool = True) -> np.ndarray:
+    """Indices ordered worst first: by status, then by oriented value."""
+    oriented = scores.value if higher_is_better else -scores.value
+    oriented = np.where(np.isfinite(oriented), oriented, -np.inf)
+    return np.lexsort((oriented, -scores.status))
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def _entries(
+    names: Sequence[str],
+    scores: FleetScores,
+    higher_is_better: bool,
+    limit: Optional[int],
+    include_ok: bool = False,
+) -> List[Dict[str, Any]]:
+    order = rank(scores, higher_is_better)
+    if not include_ok:
+        order = order[scores.status[order] > OK]
+    if limit is not None:
+        order = order[:limit]
+    return [
+        {
+            "name": names[i],
+            "value": _finite(scores.value[i]),
+            "deviation_pct": _finite(scores.deviation_pct[i]),
+            "z": round(float(scores.z[i]), 3),
+            "modified_z": round(float(scores.modified_z[i]), 3),
+            "status": STATUS_NAMES[scores.status[i]],
+        }
+        for i in order
+    ]
+
+
+def _counts(status: np.ndarray) -> Dict[str, int]:
+    counts = np.bincount(status.astype(np.intp), minlength=len(STATUS_NAMES))
+    return {name: int(c) for name, c in zip(STATUS_NAMES, counts)}
+
+
+def _stdout(raw: str) -> str:
+    return raw.split("[stderr]", 1)[0]
+
+
+def parse_gemm_csv(text: str) -> Tuple[List[str], np.ndarray]:
+    """Parse gpu_test.slurm CSV (hostname,gpu0,...) into hosts and a node x GPU matrix.
+
+    Header rows and non-CSV lines are skipped. Nodes with fewer GPUs than the
+    widest row are padded with NaN (a missing GPU counts as a failure).
+    """
+    hosts: List[str] = []
+    rows: List[List[float]] = []
+    for line in text.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or parts[0] == "hostname":
+            continue
+        try:
+            rows.append([float(v) for v in parts[1:]])
+        except ValueError:
+            continue
+        hosts.append(parts[0])
+    width = max((len(r) for r in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan)
+    for i, r in enumerate(rows):
+        matrix[i, : len(r)] = r
+    return hosts, matrix
+
+
+def analyze_gemm(
+    hosts: List[str],
+    matrix: np.ndarray,
+    sku: Optional[str] = None,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    limit: Optional[int] = 50,
+) -> Dict[str, Any]:
+    """Score per-node minimum GFlops and per-GPU GFlops across the fleet."""
+    threshold = get_baseline(sku).gemm_gflops if sku else None
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if sku and matrix.shape[1] < BASELINES[sku].gpus_per_node:
+        pad = BASELINES[sku].gpus_per_node - matrix.shape[1]
+        matrix = np.pad(matrix, ((0, 0), (0, pad)), constant_values=np.nan)
+    # np.min propagates NaN, so a node with a missing GPU scores as GHR.
+    node_min = matrix.min(axis=1) if matrix.size else np.empty(0)
+    nodes = score_fleet(node_min, threshold, True, z_threshold)
+    gpus = score_fleet(matrix.ravel(), threshold, True, z_threshold)
+    gpu_status = gpus.status.reshape(matrix.shape)
+    gpu_z = gpus.z.reshape(matrix.shape)
+
+    outliers = _entries(hosts, nodes, True, limit)
+    index = {h: i for i, h in enumerate(hosts)}
+    for entry in outliers:
+        i = index[entry["name"]]
+        entry["gpu_gflops"] = [_finite(v) for v in matrix[i]]
+        entry["gpu_status"] = [STATUS_NAMES[s] for s in gpu_status[i]]
+        entry["gpu_z"] = [round(float(v), 3) for v in gpu_z[i]]
+        entry["worst_gpu"] = int(np.argmin(np.nan_to_num(matrix[i], nan=-np.inf)))
+    return {
+        "fleet": nodes.stats,
+        "gpu_fleet": gpus.stats,
+        "outliers": outliers,
+        "summary": {
+            "nodes": _counts(nodes.status),
+            "gpus": _counts(gpus.status),
+        },
+    }
+
+
+def analyze_gemm_nodes(
+    values: Dict[str, Optional[float]],
+    sku: Optional[str] = None,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    limit: Optional[int] = 50,
+) -> Dict[str, Any]:
+    """Score already-reduced per-node GFlops (e.g. each node's minimum GPU).
+
+    Unlike analyze_gemm there is no per-GPU matrix, so nothing is padded to the
+    SKU's GPU count; a missing value (None) is GHR.
+    """
+    names = list(values)
+    data = [np.nan if values[n] is None else values[n] for n in names]
+    threshold = get_baseline(sku).gemm_gflops if sku else None
+    scores = score_fleet(data, threshold, True, z_threshold)
+    return {
+        "fleet": scores.stats,
+        "outliers": _entries(names, scores, True, limit),
+        "summary": {"nodes": _counts(scores.status)},
+    }
+
+
+def analyze_nccl(
+    values: Dict[str, Optional[float]],
+    sku: Optional[str] = None,
+    scope: Optional[str] = None,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    limit: Optional[int] = 50,
+) -> Dict[str, Any]:
+    """Score busbw per rack / node set against the fleet and the SKU baseline."""
+    names = list(values)
+    data = [np.nan if values[n] is None else values[n] for n in names]
+    threshold = nccl_threshold(sku, scope) if sku else None
+    scores = score_fleet(data, threshold, True, z_threshold)
+    return {
+        "fleet": scores.stats,
+        "outliers": _entries(names, scores, True, limit),
+        "summary": _counts(scores.status),
+    }
+
+
+def parse_thermal_csv(text: str) -> Dict[str, np.ndarray]:
+    """Fold thermal_test.sh CSV rows into per-GPU column arrays.
+
+    Rows are parsed by thermal.analyze_thermal_stream, so header rows, `tail -v`
+    banners and malformed rows are skipped the same way as in
+    analyze_thermal_results. GPUs are ordered by host, then index.
+    """
+    gpus = analyze_thermal_stream(text.splitlines())
+    states = [gpus[key] for key in sorted(gpus)]
+
+    def column(attr: str, missing: float) -> np.ndarray:
+        values = [getattr(g, attr) for g in states]
+        return np.array([missing if v is None else v for v in values], np.float64)
+
+    return {
+        "host": np.asarray([g.host for g in states], dtype=object),
+        "gpu": np.asarray([g.gpu for g in states], dtype=np.int64),
+        "max_temp": column("max_temp_c", np.nan),
+        "min_tlimit": column("min_tlimit_c", np.nan),
+        "slowdown": np.asarray([g.slowdown_samples > 0 for g in states], bool),
+        "samples": np.asarray([g.samples for g in states], dtype=np.int64),
+    }
+
+
+def analyze_thermal(
+    columns: Dict[str, np.ndarray],
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    limit: Optional[int] = 50,
+) -> Dict[str, Any]:
+    """Score per-GPU peak temperature and flag GPUs that hit a thermal slowdown.
+
+    A GPU fails (GHR) when any sample shows a thermal/hardware slowdown throttle
+    reason (THERMAL_FAIL_MASK) or its temperature.gpu.tlimit headroom reaches 0.
+    """
+    if not columns["host"].size:
+        return {
+            "fleet": score_fleet([]).stats,
+            "outliers": [],
+            "summary": _counts(np.empty(0)),
+        }
+    names = [f"{h}/gpu{g}" for h, g in zip(columns["host"], columns["gpu"])]
+    min_tlimit = columns["min_tlimit"]
+    slowdown = columns["slowdown"]
+
+    scores = score_fleet(columns["max_temp"], None, False, z_threshold)
+    failed = slowdown | (min_tlimit <= 0)
+    status = np.where(failed, GHR, scores.status).astype(np.int8)
+    scores = scores._replace(status=status)
+
+    outliers = _entries(names, scores, False, limit)
+    index = {name: i for i, name in enumerate(names)}
+    for entry in outliers:
+        i = index[entry["name"]]
+        entry["min_tlimit_c"] = _finite(min_tlimit[i])
+        entry["thermal_slowdown"] = bool(slowdown[i])
+        entry["samples"] = int(columns["samples"][i])
+    return {
+        "fleet": scores.stats,
+        "outliers": outliers,
+        "summary": _counts(status),
+    }
+
+
+def _read_remote(kind: str, path: str) -> Tuple[Optional[str], Optional[str]]:
+    if kind == "thermal":
+        # Accept a single CSV or a directory of thermal_results.*.csv files.
+        args = [path, "-maxdepth", "1", "-name", "thermal_results.*.csv"]
+        args += ["-exec", "cat", "{}", "+"]
+        result = run_simple_command("find", args)
+    else:
+        result = run_simple_command("cat", [path])
+    if not result["success"]:
+        return None, result["error"]
+    return _stdout(result["raw_output"]), None
+
+
+def detect_outliers(
+    kind: str,
+    path: Optional[str] = None,
+    values: Optional[Dict[str, Optional[float]]] = None,
+    sku: Optional[str] = None,
+    scope: Optional[str] = None,
+    since: Optional[str] = None,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """Rank fleet outliers for GEMM, NCCL or thermal results.
+
+    Args:
+        kind: "gemm", "nccl" or "thermal"
+        path: Cluster path to read (gemm CSV; thermal CSV file or directory)
+        values: name -> metric, instead of path (e.g. rack -> busbw)
+        sku: NCCL config name for baseline thresholds (graceblackwell, hopper)
+        scope: NCCL baseline scope (intra_rack, inter_rack, full)
+        since: For nccl without values: earliest date of stored runs to use
+        z_threshold: z / modified-z score below which a result is a warning
+        limit: Maximum outliers returned
+
+    Returns:
+        Dict with version, timestamp, kind, sku, fleet stats, ranked outliers
+        (worst first, with status ok/monitor/warn/ghr) and summary counts.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unsupported kind: {kind}. Supported: {', '.join(KINDS)}")
+    response: Dict[str, Any] = {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "kind": kind,
+        "sku": sku,
+        "error": None,
+    }
+
+    text = None
+    if path is not None:
+        text, error = _read_remote(kind, path)
+        if error:
+            response["error"] = error
+            return response
+
+    if kind == "gemm":
+        if text is not None:
+            hosts, matrix = parse_gemm_csv(text)
+            response.update(analyze_gemm(hosts, matrix, sku, z_threshold, limit))
+        elif values:
+            response.update(analyze_gemm_nodes(values, sku, z_threshold, limit))
+        else:
+            raise ValueError("gemm needs path or values")
+    elif kind == "nccl":
+        if values is None:
+            if text is not None:
+                raise ValueError("nccl takes values or stored runs, not a path")
+            # Latest stored run per node set.
+            values = {}
+            for run in get_result_store().query(sku=sku, since=since, limit=100000):
+                values.setdefault(run["node_set"], run["busbw_gbps"])
+        response.update(analyze_nccl(values, sku, scope, z_threshold, limit))
+    else:
+        if text is None:
+            raise ValueError("thermal needs path")
+        response.update(analyze_thermal(parse_thermal_csv(text), z_threshold, limit))
+    return response
+
+
+__all__ = [
+    "analyze_gemm",
+    "analyze_gemm_nodes",
+    "analyze_nccl",
+    "analyze_thermal",
+    "detect_outliers",
+    "parse_gemm_csv",
+    "parse_thermal_csv",
+    "score_fleet",
+]
@@ -0,0 +1,78 @@
+"""Per-SKU performance baselines and thresholds.
+
+Values mirror skills/slurm/sku_performance_baseline/SKILL.md. SKUs are keyed by
+the NCCL config name used by infrastructure_validations/slurm/NCCL
+(configs/<sku>.conf). GEMM values are in GFlops per GPU as printed by
+gpu_test.slurm; NCCL values are busbw in GB/s at 16 G message size.
+"""
+
+from typing import Dict, NamedTuple, Optional
+
+
+class Threshold(NamedTuple):
+    expected: float
+    warn: float
+    ghr: float
+
+
+class SkuBaseline(NamedTuple):
+    vm_size: str
+    gpus_per_node: int
+    rack_size: Optional[int]
+    gemm_gflops: Threshold
+    nccl_busbw: Dict[str, Threshold]
+
+
+BASELINES: Dict[str, SkuBaseline] = {
+    "graceblackwell": SkuBaseline(
+        vm_size="Standard_ND128isr_GB300_v6",
+        gpus_per_node=4,
+        rack_size=18,
+        gemm_gflops=Threshold(1_850_000, 1_785_000, 1_720_000),
+        nccl_busbw={
+            "intra_rack": Threshold(937, 800, 600),
+            "inter_rack": Threshold(200, 180, 150),
+        },
+    ),
+    "hopper": SkuBaseline(
+        vm_size="Standard_ND96isr_H100_v5",
+        gpus_per_node=8,
+        rack_size=None,
+        gemm_gflops=Threshold(769_000, 742_000, 715_000),
+        nccl_busbw={"full": Threshold(450, 400, 300)},
+    ),
+}
+
+# NCCL scope used when the caller does not pick one.
+DEFAULT_NCCL_SCOPE = {"graceblackwell": "intra_rack", "hopper": "full"}
+
+
+def get_baseline(sku: str) -> SkuBaseline:
+    """Return the baseline for an NCCL config name, raising ValueError if unknown."""
+    try:
+        return BASELINES[sku]
+    except KeyError:
+        raise ValueError(
+            f"unknown sku: {sku}. Known: {', '.join(sorted(BASELINES))}"
+        ) from None
+
+
+def nccl_threshold(sku: str, scope: Optional[str] = None) -> Threshold:
+    """Return the busbw threshold for sku and scope (default scope per SKU)."""
+    baseline = get_baseline(sku)
+    scope = scope or DEFAULT_NCCL_SCOPE[sku]
+    if scope not in baseline.nccl_busbw:
+        raise ValueError(
+            f"unknown NCCL scope for {sku}: {scope}. "
+            f"Known: {', '.join(sorted(baseline.nccl_busbw))}"
+        )
+    return baseline.nccl_busbw[scope]
+
+
+def classify(value: Optional[float], threshold: Threshold) -> str:
+    """Classify a measurement as "ok", "warn" or "ghr" (missing values are "ghr")."""
+    if value is None or value < threshold.ghr:
+        return "ghr"
+    if value < threshold.warn:
+        return "warn"
+    return "ok"
@@ -0,0 +1,404 @@
+"""Slurm job submission and completion tracking.
+
+A single JobWatcher polls the state of every watched job with one batched
+``squeue -j id1,id2,...`` call per interval, and resolves finished jobs with one
+batched ``sacct`` call. Any number of callers can wait on jobs without adding
+polling traffic of their own.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ai_infrastructure_mcp.tools.command_wrapper import run_simple_command
+
+# Seconds between batched squeue polls.
+JOB_POLL_INTERVAL_SECONDS = 10.0
+
+# Polls a job may be missing from both squeue and sacct (e.g. slurmdbd lag)
+# before it is reported with state UNKNOWN.
+MAX_MISSING_POLLS = 6
+
+# Default seconds submit_and_watch / watch_jobs block before returning.
+DEFAULT_WAIT_TIMEOUT_SECONDS = 600.0
+
+_JOB_ID_RE = re.compile(r"^\d+(_\d+)?$")
+_SUBMITTED_RE = re.compile(r"Submitted batch job (\d+)")
+_PARSABLE_RE = re.compile(r"^(\d+)(;\S+)?$")
+
+# squeue/sacct states after which a job will not run again.
+TERMINAL_STATES = {
+    "BOOT_FAIL",
+    "CANCELLED",
+    "COMPLETED",
+    "DEADLINE",
+    "FAILED",
+    "NODE_FAIL",
+    "OUT_OF_MEMORY",
+    "PREEMPTED",
+    "REVOKED",
+    "TIMEOUT",
+}
+
+_SACCT_FIELDS = [
+    "JobID",
+    "JobName",
+    "State",
+    "ExitCode",
+    "Elapsed",
+    "NodeList",
+    "WorkDir",
+    "StdOut",
+    "StdErr",
+]
+
+
+def _validate_job_ids(job_ids: List[str]) -> List[str]:
+    if not job_ids:
+        raise ValueError("job_ids list must not be empty")
+    cleaned = []
+    for j in job_ids:
+        j = str(j).strip()
+        if not _JOB_ID_RE.match(j):
+            raise ValueError(f"invalid job id: {j}")
+        cleaned.append(j)
+    return cleaned
+
+
+def _stdout_part(raw: str) -> str:
+    """Drop the stderr section that run_login_command appends to output."""
+    return raw.split("[stderr]", 1)[0]
+
+
+def parse_job_id(output: str) -> Optional[str]:
+    """Extract the job id from sbatch (plain or --parsable) or a launcher script's output."""
+    match = _SUBMITTED_RE.search(output)
+    if match:
+        return match.group(1)
+    for line in _stdout_part(output).splitlines():
+        match = _PARSABLE_RE.match(line.strip())
+        if match:
+            return match.group(1)
+    return None
+
+
+def _expand_output_path(pattern: str, record: Dict[str, str]) -> str:
+    """Expand the common sbatch filename patterns in a StdOut/StdErr path."""
+    if not pattern:
+        return ""
+    job_id = record.get("JobID", "")
+    base_id = job_id.split("_", 1)[0]
+    path = (
+        pattern.replace("%%", "\0")
+        .replace("%j", job_id)
+        .replace("%J", job_id)
+        .replace("%A", base_id)
+        .replace("%x", record.get("JobName", ""))
+        .replace("\0", "%")
+    )
+    workdir = record.get("WorkDir", "")
+    if workdir and not path.startswith("/"):
+        path = f"{workdir.rstrip('/')}/{path}"
+    return path
+
+
+def _parse_exit_code(value: str) -> Dict[str, Optional[int]]:
+    code, _, signal = value.partition(":")
+    try:
+        return {"exit_code": int(code), "signal": int(signal or 0)}
+    except ValueError:
+        return {"exit_code": None, "signal": None}
+
+
+def _job_result(record: Dict[str, str]) -> Dict[str, Any]:
+    state = (record.get("State") or "UNKNOWN").split()[0]
+    codes = _parse_exit_code(record.get("ExitCode", ""))
+    return {
+        "job_id": record.get("JobID", ""),
+        "job_name": record.get("JobName", ""),
+        "state": state,
+        "exit_code": codes["exit_code"],
+        "signal": codes["signal"],
+        "elapsed": record.get("Elapsed", ""),
+        "nodes": record.get("NodeList", ""),
+        "stdout": _expand_output_path(record.get("StdOut", ""), record),
+        "stderr": _expand_output_path(record.get("StdErr", ""), record),
+        "done": True,
+    }
+
+
+def query_active_jobs(job_ids: List[str]) -> Dict[str, str]:
+    """Return job id -> state for jobs still known to the controller (one squeue call).
+
+    run_login_command does not raise on a non-zero exit, so stderr with no
+    job lines (squeue timed out, controller down) raises RuntimeError rather
+    than reporting every job as gone. squeue's "Invalid job id" error for jobs
+    already purged from the controller is an empty answer, not a failure.
+    """
+    result = run_simple_command(
+        "squeue", ["-h", "-j", ",".join(job_ids), "-o", "%i|%T"]
+    )
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    stdout, _, stderr = result["raw_output"].partition("[stderr]")
+    states: Dict[str, str] = {}
+    for line in stdout.splitlines():
+        job_id, sep, state = line.strip().partition("|")
+        if sep:
+            states[job_id] = state.strip()
+    stderr = stderr.strip()
+    if not states and stderr and "invalid job id" not in stderr.lower():
+        raise RuntimeError(f"squeue failed: {stderr}")
+    return states
+
+
+def query_job_results(job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Return job id -> final result for jobs recorded in accounting (one sacct call)."""
+    result = run_simple_command(
+        "sacct",
+        [
+            "-X",
+            "-n",
+            "-P",
+            "-j",
+            ",".join(job_ids),
+            f"--format={','.join(_SACCT_FIELDS)}",
+        ],
+    )
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    results: Dict[str, Dict[str, Any]] = {}
+    for line in _stdout_part(result["raw_output"]).splitlines():
+        parts = line.strip().split("|")
+        if len(parts) != len(_SACCT_FIELDS):
+            continue
+        record = dict(zip(_SACCT_FIELDS, parts))
+        results[record["JobID"]] = _job_result(record)
+    return results
+
+
+class JobWatcher:
+    """Shared poller that resolves one Future per watched Slurm job.
+
+    The background thread only runs while at least one job is being watched.
+    Every poll issues a single squeue for all watched jobs and, if any finished,
+    a single sacct to collect their state, exit code and output paths.
+    """
+
+    def __init__(self, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._states: Dict[str, str] = {}
+        self._missing: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(
+        self,
+        job_id: str,
+        callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Future:
+        """Start tracking job_id; the returned Future resolves to its final result."""
+        (job_id,) = _validate_job_ids([job_id])
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None:
+                future = Future()
+                self._futures[job_id] = future
+                self._states[job_id] = "PENDING"
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="slurm-job-watcher", daemon=True
+                )
+                self._thread.start()
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def state(self, job_id: str) -> Optional[str]:
+        """Last observed state of a watched job, or None if it is not watched."""
+        with self._lock:
+            return self._states.get(job_id)
+
+    def wait(
+        self, job_ids: List[str], timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Block until all jobs finish or timeout elapses; unfinished jobs report done=False."""
+        futures = {j: self.watch(j) for j in _validate_job_ids(job_ids)}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results: Dict[str, Dict[str, Any]] = {}
+        for job_id, future in futures.items():
+            remaining = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                results[job_id] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                results[job_id] = {
+                    "job_id": job_id,
+                    "state": self.state(job_id) or "UNKNOWN",
+                    "done": False,
+                }
+        return results
+
+    def poll_once(self) -> None:
+        """Run one batched squeue (+ sacct for finished jobs) round and resolve futures."""
+        with self._lock:
+            job_ids = list(self._futures)
+        if not job_ids:
+            return
+        try:
+            active = query_active_jobs(job_ids)
+        except Exception:
+            # Controller unreachable: keep waiting, the next poll retries.
+            return
+        finished = [j for j in job_ids if active.get(j, "COMPLETED") in TERMINAL_STATES]
+        results: Dict[str, Dict[str, Any]] = {}
+        if finished:
+            try:
+                results = query_job_results(finished)
+            except Exception:
+                results = {}
+
+        resolved = []
+        with self._lock:
+            for job_id, state in active.items():
+                if job_id in self._states:
+                    self._states[job_id] = state
+            for job_id in finished:
+                result = results.get(job_id)
+                if result is not None and result["state"] not in TERMINAL_STATES:
+                    # Gone from squeue but accounting still has it running
+                    # (e.g. squeue raced the job start); keep watching.
+                    self._states[job_id] = result["state"]
+                    continue
+                if result is None:
+                    self._missing[job_id] = self._missing.get(job_id, 0) + 1
+                    if self._missing[job_id] < MAX_MISSING_POLLS:
+                        continue
+                    result = {
+                        "job_id": job_id,
+                        "state": active.get(job_id) or "UNKNOWN",
+                        "done": True,
+                    }
+                future = self._futures.pop(job_id, None)
+                self._states.pop(job_id, None)
+                self._missing.pop(job_id, None)
+                if future is not None:
+                    resolved.append((future, result))
+        # Resolve outside the lock so done-callbacks may call watch() again.
+        for future, result in resolved:
+            if not future.done():
+                future.set_result(result)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._futures:
+                    self._thread = None
+                    return
+            self.poll_once()
+            time.sleep(self.poll_interval)
+
+
+_WATCHER = JobWatcher()
+
+
+def get_job_watcher() -> JobWatcher:
+    """Return the process-wide JobWatcher shared by all tools."""
+    return _WATCHER
+
+
+def submit_and_watch(
+    args: List[str],
+    wait: bool = True,
+    timeout: Optional[float] = DEFAULT_WAIT_TIMEOUT_SECONDS,
+) -> Dict[str, Any]:
+    """Submit a batch job with sbatch and track it until completion.
+
+    Args:
+        args: sbatch arguments (options followed by the script and its arguments)
+        wait: Block until the job finishes or timeout elapses
+        timeout: Maximum seconds to block when wait is True (None = no limit)
+
+    Returns:
+        Structured dict with version, success, command, job_id, submit_output,
+        job (state, exit_code, signal, stdout, stderr, nodes, elapsed, done) and
+        error. When the job has not finished in time job.done is False and the
+        job keeps being tracked; call watch_jobs to wait for it again.
+    """
+    if not args:
+        raise ValueError("args must not be empty")
+    submit = run_simple_command("sbatch", list(args))
+    response: Dict[str, Any] = {
+        "version": 1,
+        "success": False,
+        "command": submit["command"],
+        "job_id": None,
+        "submit_output": submit["raw_output"],
+        "job": None,
+        "error": submit["error"],
+    }
+    if not submit["success"]:
+        return response
+    job_id = parse_job_id(submit["raw_output"])
+    if job_id is None:
+        response["error"] = "Could not parse job id from sbatch output"
+        return response
+
+    watcher = get_job_watcher()
+    response["success"] = True
+    response["job_id"] = job_id
+    if wait:
+        response["job"] = watcher.wait([job_id], timeout)[job_id]
+    else:
+        watcher.watch(job_id)
+        response["job"] = {"job_id": job_id, "state": "PENDING", "done": False}
+    return response
+
+
+def watch_jobs(
+    job_ids: List[str], timeout: Optional[float] = DEFAULT_WAIT_TIMEOUT_SECONDS
+) -> Dict[str, Any]:
+    """Wait for already-submitted jobs using the shared watcher.
+
+    Args:
+        job_ids: Slurm job ids to track (e.g. ["1234", "1235_7"])
+        timeout: Maximum seconds to block (None = no limit; 0 = report current state)
+
+    Returns:
+        Structured dict with version, timestamp, jobs[] and summary
+        (watched, done, running, failed).
+    """
+    results = get_job_watcher().wait(job_ids, timeout)
+    jobs = list(results.values())
+    done = [j for j in jobs if j.get("done")]
+    failed = [
+        j
+        for j in done
+        if j.get("state") != "COMPLETED" or j.get("exit_code") not in (0, None)
+    ]
+    return {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "jobs": jobs,
+        "summary": {
+            "watched": len(jobs),
+            "done": len(done),
+            "running": len(jobs) - len(done),
+            "failed": len(failed),
+        },
+    }
+
+
+__all__ = [
+    "JobWatcher",
+    "get_job_watcher",
+    "parse_job_id",
+    "submit_and_watch",
+    "watch_jobs",
+]
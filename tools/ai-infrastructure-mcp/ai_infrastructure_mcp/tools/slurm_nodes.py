@@ -0,0 +1,131 @@
+"""Batched Slurm node state changes (drain / resume).
+
+The whole host set is compressed into one hostlist expression and changed with a
+single `scontrol update`; the resulting states are read back with one `sinfo`
+in the same SSH session. Draining 200 nodes is one round trip instead of 200.
+"""
+
+import re
+import shlex
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ai_infrastructure_mcp.ssh_config import run_login_command
+
+from .command_wrapper import _validate_hosts
+from .hostlist import compress
+
+# sinfo appends these flags to a state name (e.g. "drained*" = not responding).
+_STATE_FLAGS = "*~#!%$@^-+"
+_RC_MARKER = "__scontrol_rc="
+_RC_RE = re.compile(rf"^{_RC_MARKER}(\d+)$", re.M)
+
+
+def _base_state(state: str) -> str:
+    return state.rstrip(_STATE_FLAGS).lower()
+
+
+def parse_node_states(output: str) -> Dict[str, Dict[str, str]]:
+    """Parse `sinfo -h -N -o %N|%T|%E` into host -> {state, reason}.
+
+    Nodes in several partitions are listed once per partition; the first wins.
+    """
+    nodes: Dict[str, Dict[str, str]] = {}
+    for line in output.splitlines():
+        parts = line.strip().split("|", 2)
+        if len(parts) < 2 or not parts[0]:
+            continue
+        reason = parts[2].strip() if len(parts) > 2 else ""
+        nodes.setdefault(
+            parts[0], {"state": parts[1], "reason": "" if reason == "none" else reason}
+        )
+    return nodes
+
+
+def _join(parts: List[str]) -> str:
+    return " ".join(shlex.quote(p) for p in parts)
+
+
+def _update_nodes(
+    hosts: List[str],
+    state: str,
+    reason: Optional[str],
+    applied: Callable[[str], bool],
+) -> Dict[str, Any]:
+    safe_hosts = list(dict.fromkeys(_validate_hosts(hosts)))
+    expr = compress(safe_hosts)
+    update = ["scontrol", "update", f"NodeName={expr}", f"State={state}"]
+    if reason:
+        update.append(f"Reason={reason}")
+    verify = ["sinfo", "-h", "-N", "-n", expr, "-o", "%N|%T|%E"]
+    # One SSH session: update, record its exit code, then read back the states.
+    cmd = f'{_join(update)}; echo "{_RC_MARKER}$?"; {_join(verify)}'
+
+    response: Dict[str, Any] = {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "success": False,
+        "command": cmd,
+        "hostlist": expr,
+        "nodes": [],
+        "not_applied": [],
+        "error": None,
+        "summary": {"requested": len(safe_hosts), "applied": 0, "not_applied": 0},
+    }
+    try:
+        raw = run_login_command(cmd)
+    except Exception as e:
+        response["error"] = str(e)
+        return response
+
+    out, _, err = raw.partition("\n[stderr]\n")
+    m = _RC_RE.search(out)
+    rc = int(m.group(1)) if m else None
+    states = parse_node_states(out[m.end() :] if m else out)
+    for host in safe_hosts:
+        info = states.get(host)
+        ok = info is not None and applied(_base_state(info["state"]))
+        response["nodes"].append(
+            {
+                "host": host,
+                "state": info["state"] if info else None,
+                "reason": info["reason"] if info else None,
+                "applied": ok,
+            }
+        )
+        if not ok:
+            response["not_applied"].append(host)
+    response["summary"]["not_applied"] = len(response["not_applied"])
+    response["summary"]["applied"] = len(safe_hosts) - len(response["not_applied"])
+    if rc != 0:
+        response["error"] = err.strip() or f"scontrol update exited with {rc}"
+    response["success"] = rc == 0 and not response["not_applied"]
+    return response
+
+
+def drain_nodes(hosts: List[str], reason: str) -> Dict[str, Any]:
+    """Drain hosts with one `scontrol update` and verify with one `sinfo`.
+
+    Args:
+        hosts: Nodes to drain
+        reason: Drain reason (required), ideally "<issue>_<YYYYMMDD>"
+
+    Returns:
+        Dict with version, timestamp, success, command, hostlist, nodes[] (host,
+        state, reason, applied), not_applied[], error and summary.
+    """
+    if not reason or not reason.strip():
+        raise ValueError("a drain reason is required")
+    return _update_nodes(hosts, "DRAIN", reason, lambda s: s.startswith("drain"))
+
+
+def resume_nodes(hosts: List[str], reason: Optional[str] = None) -> Dict[str, Any]:
+    """Return drained hosts to service with one `scontrol update` and one `sinfo`.
+
+    A node counts as resumed once it is no longer drained/draining (it may be
+    idle, mixed or allocated, or still down if it is unreachable).
+    """
+    return _update_nodes(hosts, "RESUME", reason, lambda s: not s.startswith("drain"))
+
+
+__all__ = ["drain_nodes", "parse_node_states", "resume_nodes"]
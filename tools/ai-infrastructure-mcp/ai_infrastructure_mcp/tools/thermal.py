@@ -0,0 +1,356 @@
+"""Streaming analyzer for thermal_test.sh telemetry CSVs.
+
+thermal_test.sh samples nvidia-smi once per second for the whole stress run and
+writes one CSV per host with rows of
+
+    hostname,target,duration,serial,name,timestamp,index,temperature.gpu,
+    temperature.memory,temperature.gpu.tlimit,power.draw,clocks.current.sm,
+    clocks_throttle_reasons.active,utilization.gpu
+
+Files are streamed over SSH line by line, several hosts in parallel, and folded
+into constant-size per-GPU state, so a full-cluster sweep (hundreds of MB of CSV)
+is never held in memory.
+"""
+
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ai_infrastructure_mcp.ssh_config import stream_login_command
+
+from .command_wrapper import run_simple_command
+
+# clocks_throttle_reasons.active bits (nvmlClocksThrottleReasons).
+THROTTLE_REASONS = {
+    0x01: "gpu_idle",
+    0x02: "applications_clocks_setting",
+    0x04: "sw_power_cap",
+    0x08: "hw_slowdown",
+    0x10: "sync_boost",
+    0x20: "sw_thermal_slowdown",
+    0x40: "hw_thermal_slowdown",
+    0x80: "hw_power_brake_slowdown",
+}
+
+# Throttle interval categories reported per GPU.
+THROTTLE_CATEGORIES = {
+    "thermal": 0x20 | 0x40,
+    "power": 0x04,
+    "hw_slowdown": 0x08 | 0x80,
+}
+
+# Any of these bits during the stress run fails the GPU; a software power cap
+# alone is only a warning.
+THERMAL_FAIL_MASK = THROTTLE_CATEGORIES["thermal"] | THROTTLE_CATEGORIES["hw_slowdown"]
+
+# An SM clock below this fraction of the GPU's peak clock under load is a drop.
+CLOCK_DROP_FRACTION = 0.90
+
+# Intervals kept per GPU and category; further intervals are only counted.
+MAX_INTERVALS = 10
+
+DEFAULT_PARALLELISM = 8
+
+STATUS_ORDER = {"fail": 0, "warn": 1, "pass": 2}
+
+
+def _number(field: str) -> Optional[float]:
+    """Parse an nvidia-smi value such as '912.35 W', '1980 MHz' or '[N/A]'."""
+    try:
+        return float(field.split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+class GpuThermalState:
+    """Constant-size running state for one GPU's telemetry samples."""
+
+    __slots__ = (
+        "host",
+        "gpu",
+        "samples",
+        "max_temp_c",
+        "min_tlimit_c",
+        "max_power_w",
+        "peak_sm_mhz",
+        "min_sm_mhz",
+        "clock_drop_samples",
+        "slowdown_samples",
+        "throttle_samples",
+        "intervals",
+        "interval_counts",
+        "_open",
+    )
+
+    def __init__(self, host: str, gpu: int):
+        self.host = host
+        self.gpu = gpu
+        self.samples = 0
+        self.max_temp_c: Optional[float] = None
+        self.min_tlimit_c: Optional[float] = None
+        self.max_power_w: Optional[float] = None
+        self.peak_sm_mhz: Optional[float] = None
+        self.min_sm_mhz: Optional[float] = None
+        self.clock_drop_samples = 0
+        self.slowdown_samples = 0
+        self.throttle_samples = {c: 0 for c in THROTTLE_CATEGORIES}
+        self.intervals: Dict[str, List[Dict[str, Any]]] = {
+            c: [] for c in THROTTLE_CATEGORIES
+        }
+        self.interval_counts = {c: 0 for c in THROTTLE_CATEGORIES}
+        self._open: Dict[str, Optional[Dict[str, Any]]] = {
+            c: None for c in THROTTLE_CATEGORIES
+        }
+
+    def add(
+        self,
+        timestamp: str,
+        temp: Optional[float],
+        tlimit: Optional[float],
+        power: Optional[float],
+        sm_mhz: Optional[float],
+        throttle: int,
+    ) -> None:
+        self.samples += 1
+        if temp is not None and (self.max_temp_c is None or temp > self.max_temp_c):
+            self.max_temp_c = temp
+        if tlimit is not None and (
+            self.min_tlimit_c is None or tlimit < self.min_tlimit_c
+        ):
+            self.min_tlimit_c = tlimit
+        if power is not None and (self.max_power_w is None or power > self.max_power_w):
+            self.max_power_w = power
+        # Clock drops only count under load (GPU idle bit clear).
+        if sm_mhz is not None and not throttle & 0x01:
+            if self.peak_sm_mhz is None or sm_mhz > self.peak_sm_mhz:
+                self.peak_sm_mhz = sm_mhz
+            if self.min_sm_mhz is None or sm_mhz < self.min_sm_mhz:
+                self.min_sm_mhz = sm_mhz
+            if sm_mhz < self.peak_sm_mhz * CLOCK_DROP_FRACTION:
+                self.clock_drop_samples += 1
+        if throttle & THERMAL_FAIL_MASK:
+            self.slowdown_samples += 1
+        for category, mask in THROTTLE_CATEGORIES.items():
+            current = self._open[category]
+            if throttle & mask:
+                self.throttle_samples[category] += 1
+                if current is None:
+                    current = {
+                        "start": timestamp,
+                        "end": timestamp,
+                        "samples": 0,
+                        "reasons": 0,
+                    }
+                    self._open[category] = current
+                    self.interval_counts[category] += 1
+                    if len(self.intervals[category]) < MAX_INTERVALS:
+                        self.intervals[category].append(current)
+                current["end"] = timestamp
+                current["samples"] += 1
+                current["reasons"] |= throttle & mask
+            elif current is not None:
+                self._open[category] = None
+
+    def merge(self, other: "GpuThermalState") -> None:
+        """Fold in state for the same GPU from another file (e.g. a re-run)."""
+        self.samples += other.samples
+        for attr, pick in (
+            ("max_temp_c", max),
+            ("min_tlimit_c", min),
+            ("max_power_w", max),
+            ("peak_sm_mhz", max),
+            ("min_sm_mhz", min),
+        ):
+            values = [
+                v for v in (getattr(self, attr), getattr(other, attr)) if v is not None
+            ]
+            setattr(self, attr, pick(values) if values else None)
+        self.clock_drop_samples += other.clock_drop_samples
+        self.slowdown_samples += other.slowdown_samples
+        for c in THROTTLE_CATEGORIES:
+            self.throttle_samples[c] += other.throttle_samples[c]
+            self.interval_counts[c] += other.interval_counts[c]
+            room = MAX_INTERVALS - len(self.intervals[c])
+            self.intervals[c].extend(other.intervals[c][:room])
+
+    @property
+    def status(self) -> str:
+        failed = self.slowdown_samples or (
+            self.min_tlimit_c is not None and self.min_tlimit_c <= 0
+        )
+        if failed:
+            return "fail"
+        if self.throttle_samples["power"] or self.clock_drop_samples:
+            return "warn"
+        return "pass"
+
+    def to_dict(self) -> Dict[str, Any]:
+        drop_pct = None
+        if self.peak_sm_mhz and self.min_sm_mhz is not None:
+            drop_pct = round((1 - self.min_sm_mhz / self.peak_sm_mhz) * 100, 1)
+        intervals = {
+            c: [
+                {**i, "reasons": _reason_names(i["reasons"])} for i in self.intervals[c]
+            ]
+            for c in THROTTLE_CATEGORIES
+        }
+        return {
+            "host": self.host,
+            "gpu": self.gpu,
+            "status": self.status,
+            "samples": self.samples,
+            "max_temp_c": self.max_temp_c,
+            "min_tlimit_c": self.min_tlimit_c,
+            "max_power_w": self.max_power_w,
+            "peak_sm_mhz": self.peak_sm_mhz,
+            "min_sm_mhz": self.min_sm_mhz,
+            "max_clock_drop_pct": drop_pct,
+            "clock_drop_samples": self.clock_drop_samples,
+            "throttle_seconds": dict(self.throttle_samples),
+            "throttle_intervals": dict(self.interval_counts),
+            "intervals": intervals,
+        }
+
+
+def _reason_names(bits: int) -> List[str]:
+    return [name for bit, name in THROTTLE_REASONS.items() if bits & bit]
+
+
+def analyze_thermal_stream(
+    lines: Iterable[str],
+    gpus: Optional[Dict[Tuple[str, int], GpuThermalState]] = None,
+) -> Dict[Tuple[str, int], GpuThermalState]:
+    """Fold thermal CSV lines into per-(host, gpu) state.
+
+    Header rows, `tail -v` banners and malformed rows are skipped. Pass an
+    existing mapping to keep accumulating across files.
+    """
+    gpus = {} if gpus is None else gpus
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) < 14:
+            continue
+        try:
+            index = int(parts[6])
+            throttle = int(parts[12], 16)
+        except ValueError:
+            continue
+        key = (parts[0], index)
+        state = gpus.get(key)
+        if state is None:
+            state = gpus[key] = GpuThermalState(parts[0], index)
+        state.add(
+            parts[5].strip(),
+            _number(parts[7]),
+            _number(parts[9]),
+            _number(parts[10]),
+            _number(parts[11]),
+            throttle,
+        )
+    return gpus
+
+
+def _list_files(path: str) -> Tuple[List[str], Optional[str]]:
+    result = run_simple_command(
+        "find", [path, "-maxdepth", "1", "-name", "thermal_results.*.csv"]
+    )
+    if not result["success"]:
+        return [], result["error"]
+    out, _, err = result["raw_output"].partition("\n[stderr]\n")
+    files = sorted(line.strip() for line in out.splitlines() if line.strip())
+    return files, (err.strip() or None) if not files else None
+
+
+def _analyze_file(
+    path: str,
+) -> Tuple[str, Dict[Tuple[str, int], GpuThermalState], Optional[str]]:
+    gpus: Dict[Tuple[str, int], GpuThermalState] = {}
+    try:
+        analyze_thermal_stream(stream_login_command(f"cat {shlex.quote(path)}"), gpus)
+    except Exception as e:
+        return path, gpus, str(e)
+    return path, gpus, None
+
+
+def analyze_thermal_results(
+    path: str,
+    parallelism: int = DEFAULT_PARALLELISM,
+    limit: Optional[int] = 100,
+) -> Dict[str, Any]:
+    """Analyze thermal_test.sh CSVs on the cluster into a per-GPU fleet table.
+
+    Args:
+        path: A thermal_results.*.csv file or a directory containing them
+        parallelism: Number of files streamed concurrently (one SSH session each)
+        limit: Maximum GPU rows returned, worst first (None for all)
+
+    Returns:
+        Dict with version, timestamp, path, files[] (path, error), gpus[] sorted
+        fail/warn/pass then by tlimit headroom, summary and error.
+    """
+    if parallelism < 1:
+        raise ValueError("parallelism must be >= 1")
+    response: Dict[str, Any] = {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "path": path,
+        "files": [],
+        "gpus": [],
+        "summary": {},
+        "error": None,
+    }
+    files, error = _list_files(path)
+    if error or not files:
+        response["error"] = error or f"no thermal_results.*.csv found at {path}"
+        return response
+
+    merged: Dict[Tuple[str, int], GpuThermalState] = {}
+    with ThreadPoolExecutor(max_workers=min(parallelism, len(files))) as pool:
+        for file_path, gpus, file_error in pool.map(_analyze_file, files):
+            response["files"].append({"path": file_path, "error": file_error})
+            for key, state in gpus.items():
+                if key in merged:
+                    merged[key].merge(state)
+                else:
+                    merged[key] = state
+
+    rows = [s.to_dict() for s in merged.values()]
+    rows.sort(
+        key=lambda r: (
+            STATUS_ORDER[r["status"]],
+            r["min_tlimit_c"] if r["min_tlimit_c"] is not None else float("inf"),
+            r["host"],
+            r["gpu"],
+        )
+    )
+    counts = {s: 0 for s in STATUS_ORDER}
+    for r in rows:
+        counts[r["status"]] += 1
+    temps = [r["max_temp_c"] for r in rows if r["max_temp_c"] is not None]
+    tlimits = [r["min_tlimit_c"] for r in rows if r["min_tlimit_c"] is not None]
+    response["gpus"] = rows if limit is None else rows[:limit]
+    response["summary"] = {
+        "files": len(files),
+        "file_errors": sum(1 for f in response["files"] if f["error"]),
+        "hosts": len({r["host"] for r in rows}),
+        "gpus": len(rows),
+        **counts,
+        "failed_hosts": sorted({r["host"] for r in rows if r["status"] == "fail"}),
+        "max_temp_c": max(temps) if temps else None,
+        "min_tlimit_c": min(tlimits) if tlimits else None,
+        "throttle_seconds": {
+            c: sum(r["throttle_seconds"][c] for r in rows) for c in THROTTLE_CATEGORIES
+        },
+    }
+    return response
+
+
+__all__ = [
+    "GpuThermalState",
+    "STATUS_ORDER",
+    "THERMAL_FAIL_MASK",
+    "THROTTLE_REASONS",
+    "analyze_thermal_results",
+    "analyze_thermal_stream",
+]
@@ -0,0 +1,464 @@
+"""Fleet validation sweeps: per-rack NCCL, GPU GEMM and thermal jobs.
+
+Nodes are grouped by MNNVL domain (nvidia-smi ClusterUUID) and the scripts from
+infrastructure_validations/slurm are submitted for every group in parallel. Each
+group runs one test at a time (the jobs are exclusive on the same nodes), while
+different groups run concurrently up to a job cap and the partition's usable
+node count. Finished jobs are tracked through the shared JobWatcher and their
+outputs are parsed into a single fleet report.
+"""
+
+import os
+import posixpath
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait as futures_wait
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ai_infrastructure_mcp.ssh_config import run_login_command
+
+from .command_wrapper import (
+    _validate_hosts,
+    build_parallel_ssh_command,
+    parse_parallel_ssh_output,
+    run_simple_command,
+)
+from .nccl_results import parse_nccl_output, parse_nccl_stream, record_nccl_run
+from .sku_baselines import BASELINES, classify, nccl_threshold
+from .slurm_jobs import get_job_watcher, parse_job_id
+from .thermal import STATUS_ORDER, analyze_thermal_stream
+
+# Location of infrastructure_validations/slurm on the cluster's shared
+# filesystem. Relative paths are resolved from the SSH user's home directory.
+ENV_VALIDATIONS_DIR = "CLUSTER_VALIDATIONS_DIR"
+DEFAULT_VALIDATIONS_DIR = "ai-infrastructure-on-azure/infrastructure_validations/slurm"
+
+SUPPORTED_TESTS = ("nccl", "gpu", "thermal")
+
+# One SSH round trip per host returns GPU model, GPU count and ClusterUUID.
+# Each value is tagged so empty results do not shift the others.
+_INNER_DISCOVERY_CMD = (
+    "nvidia-smi --query-gpu=name --format=csv,noheader 2>/dev/null | head -1 | sed 's/^/name=/'; "
+    "nvidia-smi -L 2>/dev/null | grep -c '^GPU' | sed 's/^/gpus=/'; "
+    "nvidia-smi -q 2>/dev/null | sed -n 's/^ *ClusterUUID *: */uuid=/p' | head -1"
+)
+
+# sinfo node states that can run validation jobs.
+_USABLE_NODE_STATES = {"idle", "mix", "alloc", "comp"}
+
+# Quick NCCL check settings (nccl_allreduce_test skill, "Quick check").
+NCCL_QUICK_ARGS = ["--begin-size", "16G", "--end-size", "16G", "--iters", "10"]
+
+
+class _Group(NamedTuple):
+    label: str
+    rack_id: Optional[str]
+    hosts: List[str]
+    sku: Optional[str]
+    gpus_per_node: Optional[int]
+
+
+def _validations_dir() -> str:
+    return os.getenv(ENV_VALIDATIONS_DIR) or DEFAULT_VALIDATIONS_DIR
+
+
+def _sku_from_gpu_name(name: str) -> Optional[str]:
+    # Same mapping as nccl_test.sh auto-detection.
+    if "H100" in name or "H200" in name:
+        return "hopper"
+    if "GB200" in name or "GB300" in name:
+        return "graceblackwell"
+    return None
+
+
+def _valid_cluster_uuid(value: str) -> bool:
+    stripped = value.replace("-", "").replace("0", "")
+    return bool(stripped) and value.upper() != "N/A"
+
+
+def discover_nodes(hosts: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Return host -> {gpu_name, gpus, sku, cluster_uuid} for responding hosts."""
+    safe_hosts = _validate_hosts(hosts)
+    cmd = build_parallel_ssh_command(safe_hosts, _INNER_DISCOVERY_CMD)
+    parsed = parse_parallel_ssh_output(run_login_command(cmd))
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for host in safe_hosts:
+        if host not in parsed:
+            continue
+        values = {}
+        for line in parsed[host]:
+            key, sep, value = line.partition("=")
+            if sep:
+                values[key] = value.strip()
+        uuid = values.get("uuid", "")
+        try:
+            gpus = int(values.get("gpus", "0"))
+        except ValueError:
+            gpus = 0
+        nodes[host] = {
+            "gpu_name": values.get("name", ""),
+            "gpus": gpus,
+            "sku": _sku_from_gpu_name(values.get("name", "")),
+            "cluster_uuid": uuid if _valid_cluster_uuid(uuid) else None,
+        }
+    return nodes
+
+
+def _build_groups(
+    hosts: List[str], nodes: Dict[str, Dict[str, Any]], group_by_rack: bool
+) -> List[_Group]:
+    def make(label: str, rack_id: Optional[str], members: List[str]) -> _Group:
+        skus = {nodes[h]["sku"] for h in members if nodes[h]["sku"]}
+        gpus = [nodes[h]["gpus"] for h in members if nodes[h]["gpus"]]
+        return _Group(
+            label=label,
+            rack_id=rack_id,
+            hosts=members,
+            sku=skus.pop() if len(skus) == 1 else None,
+            gpus_per_node=min(gpus) if gpus else None,
+        )
+
+    responding = [h for h in hosts if h in nodes]
+    if not group_by_rack:
+        return [make("all", None, responding)] if responding else []
+
+    racks: Dict[str, List[str]] = {}
+    unassigned: List[str] = []
+    for host in responding:
+        uuid = nodes[host]["cluster_uuid"]
+        if uuid:
+            racks.setdefault(uuid, []).append(host)
+        else:
+            unassigned.append(host)
+    groups = [
+        make(f"rack-{i:03d}", uuid, members)
+        for i, (uuid, members) in enumerate(racks.items(), start=1)
+    ]
+    if unassigned:
+        groups.append(make("unassigned", None, unassigned))
+    return groups
+
+
+def partition_capacity(partition: str) -> Optional[int]:
+    """Number of nodes in the partition that can currently run jobs (one sinfo call)."""
+    result = run_simple_command("sinfo", ["-h", "-p", partition, "-o", "%D|%t"])
+    if not result["success"]:
+        return None
+    total = 0
+    for line in result["raw_output"].split("[stderr]", 1)[0].splitlines():
+        count, sep, state = line.strip().partition("|")
+        if sep and state.rstrip("*~#!%$@^-") in _USABLE_NODE_STATES:
+            try:
+                total += int(count)
+            except ValueError:
+                continue
+    return total
+
+
+def _submit_args(
+    test: str,
+    group: _Group,
+    workdir: str,
+    partition: str,
+    validations_dir: str,
+) -> Optional[List[str]]:
+    """Return the command (as argv) that submits test for group, or None if not applicable."""
+    common = [
+        "-p",
+        partition,
+        "-N",
+        str(len(group.hosts)),
+        "-w",
+        ",".join(group.hosts),
+        f"--chdir={workdir}",
+        f"--job-name=validate-{test}-{group.label}",
+    ]
+    if test == "nccl":
+        # NCCL needs the MNNVL domain (or an explicit single group) and at least 2 nodes.
+        if group.label == "unassigned" or len(group.hosts) < 2:
+            return None
+        script = posixpath.join(validations_dir, "NCCL", "nccl_test.sh")
+        sku_args = ["--sku", group.sku] if group.sku else []
+        return ["bash", script, *sku_args, *NCCL_QUICK_ARGS, *common]
+    if not group.gpus_per_node:
+        return None
+    gpu_opt = f"--gpus-per-node={group.gpus_per_node}"
+    if test == "gpu":
+        script = posixpath.join(validations_dir, "gpu_test", "gpu_test.slurm")
+        return ["sbatch", gpu_opt, *common, script]
+    script = posixpath.join(validations_dir, "thermal_test", "thermal_test.slurm")
+    return ["sbatch", gpu_opt, *common, script]
+
+
+def parse_gpu_output(text: str, hosts: List[str]) -> List[Dict[str, Any]]:
+    """Parse gpu_test.slurm CSV rows into per-node GFlops with the minimum GPU."""
+    wanted = set(hosts)
+    nodes = []
+    for line in text.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or parts[0] not in wanted:
+            continue
+        try:
+            gflops = [float(v) for v in parts[1:]]
+        except ValueError:
+            continue
+        nodes.append(
+            {
+                "host": parts[0],
+                "gpu_gflops": gflops,
+                "min_gflops": min(gflops),
+            }
+        )
+    return nodes
+
+
+def parse_thermal_output(text: str) -> List[Dict[str, Any]]:
+    """Summarize thermal_test.sh CSV telemetry per host.
+
+    Rows are folded per GPU by thermal.analyze_thermal_stream; a host's status
+    is its worst GPU's (fail on a THERMAL_FAIL_MASK slowdown or tlimit <= 0,
+    warn on SW power capping or clock drops).
+    """
+    stats: Dict[str, Dict[str, Any]] = {}
+    for gpu in analyze_thermal_stream(text.splitlines()).values():
+        entry = stats.setdefault(
+            gpu.host,
+            {
+                "host": gpu.host,
+                "samples": 0,
+                "max_temp_c": None,
+                "min_tlimit_c": None,
+                "max_power_w": None,
+                "slowdown_samples": 0,
+                "status": "pass",
+            },
+        )
+        entry["samples"] += gpu.samples
+        entry["slowdown_samples"] += gpu.slowdown_samples
+        for key, pick in (
+            ("max_temp_c", max),
+            ("min_tlimit_c", min),
+            ("max_power_w", max),
+        ):
+            values = [v for v in (entry[key], getattr(gpu, key)) if v is not None]
+            entry[key] = pick(values) if values else None
+        entry["status"] = min(entry["status"], gpu.status, key=STATUS_ORDER.get)
+    return list(stats.values())
+
+
+def _collect_results(test: str, group: _Group, job: Dict[str, Any], workdir: str):
+    """Read a finished job's output and attach parsed metrics to job."""
+    if test == "thermal":
+        result = run_simple_command(
+            "find",
+            [
+                workdir,
+                "-maxdepth",
+                "1",
+                "-name",
+                "thermal_results.*.csv",
+                "-exec",
+                "tail",
+                "-v",
+                "-n",
+                "+1",
+                "{}",
+                "+",
+            ],
+        )
+    elif job.get("stdout"):
+        result = run_simple_command("cat", [job["stdout"]])
+    else:
+        job["parse_error"] = "No output path reported by sacct"
+        return
+    if not result["success"]:
+        job["parse_error"] = result["error"]
+        return
+    text = result["raw_output"]
+    baseline = BASELINES.get(group.sku or "")
+    if test == "nccl":
+        parsed = parse_nccl_stream(text.splitlines())
+        job.update(parsed.summary())
+        store_error = record_nccl_run(
+            parsed, group.hosts, group.sku, job.get("job_id"), job.get("stdout")
+        )
+        if store_error:
+            job["store_error"] = store_error
+        if baseline:
+            job["status"] = classify(job["peak_busbw_gbps"], nccl_threshold(group.sku))
+    elif test == "gpu":
+        job["nodes"] = parse_gpu_output(text, group.hosts)
+        if baseline:
+            for node in job["nodes"]:
+                node["status"] = classify(node["min_gflops"], baseline.gemm_gflops)
+    else:
+        job["nodes"] = parse_thermal_output(text)
+
+
+def run_validation_sweep(
+    hosts: List[str],
+    tests: Optional[List[str]] = None,
+    partition: str = "gpu",
+    group_by_rack: bool = True,
+    max_concurrent_jobs: int = 16,
+    output_dir: Optional[str] = None,
+    timeout: Optional[float] = 3600,
+) -> Dict[str, Any]:
+    """Run validation jobs over a node set, one group per MNNVL rack.
+
+    Args:
+        hosts: Nodes to validate (required, non-empty)
+        tests: Subset of ("nccl", "gpu", "thermal"); default ["nccl", "gpu"]
+        partition: Slurm partition to submit to
+        group_by_rack: Group nodes by ClusterUUID; when False all nodes form one group
+        max_concurrent_jobs: Upper bound on jobs submitted and not yet finished
+        output_dir: Directory (on the cluster) for job outputs; default
+            validation-<UTC timestamp> in the SSH user's home
+        timeout: Seconds to wait for all jobs; unfinished jobs keep running
+
+    Returns:
+        Dict with version, timestamp, output_dir, racks[] (hosts and per-test
+        job results), unreachable_hosts, summary.
+    """
+    safe_hosts = _validate_hosts(hosts)
+    tests = list(tests or ["nccl", "gpu"])
+    for test in tests:
+        if test not in SUPPORTED_TESTS:
+            raise ValueError(
+                f"unsupported test: {test}. Supported: {', '.join(SUPPORTED_TESTS)}"
+            )
+    if max_concurrent_jobs < 1:
+        raise ValueError("max_concurrent_jobs must be >= 1")
+
+    now = datetime.now(timezone.utc)
+    ts = now.isoformat().replace("+00:00", "Z")
+    output_dir = output_dir or f"validation-{now.strftime('%Y%m%dT%H%M%SZ')}"
+    validations_dir = _validations_dir()
+
+    nodes = discover_nodes(safe_hosts)
+    groups = _build_groups(safe_hosts, nodes, group_by_rack)
+    capacity = partition_capacity(partition)
+    node_budget = capacity if capacity else len(safe_hosts)
+
+    report_groups: Dict[str, Dict[str, Any]] = {}
+    workdirs: Dict[tuple, str] = {}
+    queue: Dict[str, List[str]] = {}
+    for group in groups:
+        baseline = BASELINES.get(group.sku or "")
+        expected = baseline.rack_size if baseline else None
+        report_groups[group.label] = {
+            "label": group.label,
+            "rack_id": group.rack_id,
+            "hosts": group.hosts,
+            "sku": group.sku,
+            "gpus_per_node": group.gpus_per_node,
+            "expected_size": expected if group.rack_id else None,
+            "tests": {},
+        }
+        queue[group.label] = list(tests)
+        for test in tests:
+            workdirs[(group.label, test)] = posixpath.join(
+                output_dir, group.label, test
+            )
+    if workdirs:
+        mkdir = run_simple_command("mkdir", ["-p", *sorted(set(workdirs.values()))])
+        if not mkdir["success"]:
+            raise RuntimeError(f"Failed to create output directories: {mkdir['error']}")
+
+    watcher = get_job_watcher()
+    by_label = {g.label: g for g in groups}
+    running: Dict[Any, tuple] = {}
+    busy_nodes = 0
+    deadline = None if timeout is None else time.monotonic() + timeout
+    submitted = 0
+
+    while True:
+        for group in groups:
+            if len(running) >= max_concurrent_jobs:
+                break
+            busy = any(label == group.label for label, _, _ in running.values())
+            if busy or not queue[group.label]:
+                continue
+            if running and busy_nodes + len(group.hosts) > node_budget:
+                continue
+            test = queue[group.label].pop(0)
+            workdir = workdirs[(group.label, test)]
+            entry: Dict[str, Any] = {"workdir": workdir}
+            report_groups[group.label]["tests"][test] = entry
+            argv = _submit_args(test, group, workdir, partition, validations_dir)
+            if argv is None:
+                entry["state"] = "SKIPPED"
+                continue
+            result = run_simple_command(argv[0], argv[1:])
+            entry["command"] = result["command"]
+            job_id = parse_job_id(result["raw_output"]) if result["success"] else None
+            if job_id is None:
+                entry["state"] = "SUBMIT_FAILED"
+                entry["error"] = result["error"] or result["raw_output"].strip()
+                continue
+            submitted += 1
+            entry["job_id"] = job_id
+            running[watcher.watch(job_id)] = (group.label, test, entry)
+            busy_nodes += len(group.hosts)
+
+        if not running:
+            if any(queue.values()):
+                continue
+            break
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+        done, _ = futures_wait(
+            list(running), timeout=remaining, return_when=FIRST_COMPLETED
+        )
+        for future in done:
+            label, test, entry = running.pop(future)
+            busy_nodes -= len(by_label[label].hosts)
+            entry.update(future.result())
+            _collect_results(test, by_label[label], entry, entry["workdir"])
+
+    # Timed out: these jobs keep running and can be followed with watch_jobs.
+    for _, _, entry in running.values():
+        entry["state"] = watcher.state(entry["job_id"]) or "UNKNOWN"
+        entry["done"] = False
+    for label, pending in queue.items():
+        for test in pending:
+            report_groups[label]["tests"][test] = {"state": "NOT_SUBMITTED"}
+
+    jobs = [t for g in report_groups.values() for t in g["tests"].values()]
+    finished = [j for j in jobs if j.get("done")]
+    failed = [
+        j
+        for j in jobs
+        if j.get("state") == "SUBMIT_FAILED"
+        or (j.get("done") and (j.get("state") != "COMPLETED" or j.get("exit_code")))
+    ]
+    return {
+        "version": 1,
+        "timestamp": ts,
+        "partition": partition,
+        "output_dir": output_dir,
+        "racks": list(report_groups.values()),
+        "unreachable_hosts": [h for h in safe_hosts if h not in nodes],
+        "summary": {
+            "hosts": len(safe_hosts),
+            "racks": sum(1 for g in groups if g.rack_id),
+            "partition_capacity": capacity,
+            "jobs_submitted": submitted,
+            "jobs_completed": len(finished),
+            "jobs_failed": len(failed),
+            "jobs_running": len(running),
+            "jobs_not_submitted": sum(len(p) for p in queue.values()),
+        },
+    }
+
+
+__all__ = [
+    "discover_nodes",
+    "parse_nccl_output",
+    "partition_capacity",
+    "run_validation_sweep",
+]